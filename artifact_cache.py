@@ -0,0 +1,169 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+
+import audio_cache
+
+# --- CONFIG ---
+CACHE_DIR = os.getenv("ARTIFACT_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "artifacts"))
+MAX_BYTES = int(float(os.getenv("ARTIFACT_CACHE_MAX_MB", "2048")) * 1024 * 1024)
+
+
+# --- Cache: JSON artifacts addressed by hash(inputs + model + prompt + params) ---
+class ArtifactCache:
+    """Content-addressed store for transcripts, LLM segments and render manifests.
+
+    Keys come from ``key()``, which hashes the input bytes together with every
+    parameter that affects the output, so a changed source, model size or
+    prompt simply misses instead of serving a stale entry. Writes are atomic
+    and reads refresh the entry's mtime, which drives size-based LRU eviction.
+    """
+
+    def __init__(self, root=CACHE_DIR, max_bytes=MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._size = None  # running total, computed on first write
+        os.makedirs(root, exist_ok=True)
+
+    def key(self, kind, files=(), texts=(), **params):
+        h = hashlib.sha256()
+        for path in files:
+            h.update(b"file:" + audio_cache.content_hash(path).encode())
+        for text in texts:
+            h.update(b"text:" + hashlib.sha256(text.encode("utf-8")).digest())
+        h.update(json.dumps(params, sort_keys=True, default=str).encode())
+        return f"{kind}/{h.hexdigest()}"
+
+    def path(self, key):
+        return os.path.join(self.root, f"{key}.json")
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            with open(path, "r") as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass  # evicted by a concurrent gc after the read; the value is still good
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def put(self, key, value):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(value, f)
+        old = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp, path)
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._total_bytes()
+            else:
+                self._size += os.path.getsize(path) - old
+            over = self.max_bytes and self._size > self.max_bytes
+        if over:
+            self.gc()
+        return value
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = self.put(key, compute())
+        return value
+
+    def _entries(self):
+        for dirpath, _, files in os.walk(self.root):
+            for name in files:
+                if name.endswith(".json"):
+                    path = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, st.st_size, st.st_mtime
+
+    def _total_bytes(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def stats(self):
+        kinds = {}
+        for path, size, _ in self._entries():
+            kind = os.path.relpath(os.path.dirname(path), self.root)
+            count, total = kinds.get(kind, (0, 0))
+            kinds[kind] = (count + 1, total + size)
+        return {
+            "root": self.root,
+            "entries": sum(c for c, _ in kinds.values()),
+            "bytes": sum(b for _, b in kinds.values()),
+            "max_bytes": self.max_bytes,
+            "kinds": {k: {"entries": c, "bytes": b} for k, (c, b) in sorted(kinds.items())},
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def gc(self, max_bytes=None, max_age_days=None):
+        """Evict least-recently-used entries until under ``max_bytes``; returns (removed, freed_bytes)."""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        cutoff = time.time() - max_age_days * 86400 if max_age_days else None
+        removed = freed = 0
+        for path, size, mtime in entries:
+            if total <= limit and (cutoff is None or mtime >= cutoff):
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+            freed += size
+        with self._lock:
+            self._size = total
+        return removed, freed
+
+
+_default = None
+
+def default_cache():
+    global _default
+    if _default is None:
+        _default = ArtifactCache()
+    return _default
+
+
+# --- CLI: python artifact_cache.py stats | gc [--max-mb N] [--max-age-days N] ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or trim the artifact cache.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="show entry counts and sizes per artifact kind")
+    gc = sub.add_parser("gc", help="evict least-recently-used entries")
+    gc.add_argument("--max-mb", type=float, default=None, help="target size (default: ARTIFACT_CACHE_MAX_MB)")
+    gc.add_argument("--max-age-days", type=float, default=None, help="also drop entries unused for this long")
+    args = parser.parse_args(argv)
+
+    cache = default_cache()
+    if args.command == "stats":
+        print(json.dumps(cache.stats(), indent=2))
+    else:
+        max_bytes = int(args.max_mb * 1024 * 1024) if args.max_mb is not None else None
+        removed, freed = cache.gc(max_bytes, args.max_age_days)
+        print(f"[+] Evicted {removed} artifact(s), freed {freed / 1024 / 1024:.1f} MB")
+
+if __name__ == "__main__":
+    sys.exit(main())
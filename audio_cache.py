@@ -0,0 +1,121 @@
+import os
+import json
+import hashlib
+import subprocess
+import threading
+
+import numpy as np
+
+import tracing
+
+# --- CONFIG ---
+CACHE_DIR = os.getenv("AUDIO_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "audio"))
+SAMPLE_RATE = 16000  # what Whisper expects
+HASH_BLOCK = 1 << 20
+INDEX_FILE = os.path.join(CACHE_DIR, "hashes.json")  # "path|size|mtime" -> content hash
+
+os.makedirs(CACHE_DIR, exist_ok=True)
+
+_index_lock = threading.Lock()
+_hash_memo = {}
+_extract_lock = threading.Lock()
+
+
+# --- Content hashing (memoized on path + size + mtime so big files are only read once) ---
+def _stat_key(path):
+    st = os.stat(path)
+    return f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}"
+
+def _load_index():
+    try:
+        with open(INDEX_FILE, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _write_atomic(path, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def content_hash(path):
+    """BLAKE2b digest of the file's bytes, cached in the index until the file changes."""
+    key = _stat_key(path)
+    with _index_lock:
+        if key in _hash_memo:
+            return _hash_memo[key]
+        index = _load_index()
+        if key in index:
+            _hash_memo[key] = index[key]
+            return index[key]
+
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            h.update(block)
+    digest = h.hexdigest()
+
+    with _index_lock:
+        index = _load_index()
+        index[key] = digest
+        _write_atomic(INDEX_FILE, json.dumps(index))
+        _hash_memo[key] = digest
+    return digest
+
+
+# --- Extraction: one ffmpeg decode per source, stored as raw mono 16 kHz int16 PCM ---
+def _pcm_file(path):
+    return os.path.join(CACHE_DIR, f"{content_hash(path)}.pcm")
+
+def has_pcm(path):
+    """True if ``path``'s audio is already extracted, so slicing it costs no decode."""
+    return os.path.exists(_pcm_file(path))
+
+def pcm_path(path):
+    """Return the cached PCM file for ``path``, decoding it with ffmpeg on first use."""
+    out = _pcm_file(path)
+    if os.path.exists(out):
+        return out
+
+    with _extract_lock:
+        if os.path.exists(out):
+            return out
+        print(f"[*] Extracting audio: {path}")
+        tmp = f"{out}.{os.getpid()}.tmp"
+        cmd = [
+            "ffmpeg", "-nostdin", "-v", "error", "-threads", "0", "-i", path,
+            "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "s16le", "-y", tmp
+        ]
+        try:
+            with tracing.span("audio.extract"):
+                subprocess.run(cmd, check=True, capture_output=True)
+        except subprocess.CalledProcessError as e:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise RuntimeError(f"Failed to extract audio from {path}: {e.stderr.decode(errors='ignore')}") from e
+        tracing.count("bytes_decoded", os.path.getsize(tmp))
+        os.replace(tmp, out)
+    return out
+
+def load_pcm(path):
+    """Read-only int16 memmap of the whole source; slicing it never copies."""
+    cached = pcm_path(path)
+    if os.path.getsize(cached) == 0:
+        return np.zeros(0, dtype=np.int16)
+    return np.memmap(cached, dtype=np.int16, mode="r")
+
+def audio_slice(path, start=0.0, end=None):
+    """Zero-copy int16 view of ``path``'s audio between ``start`` and ``end`` seconds."""
+    pcm = load_pcm(path)
+    lo = int(start * SAMPLE_RATE)
+    hi = len(pcm) if end is None else int(end * SAMPLE_RATE)
+    return pcm[lo:hi]
+
+def to_float(pcm):
+    """Convert int16 PCM to the float32 [-1, 1] array Whisper consumes."""
+    return np.asarray(pcm, dtype=np.float32) / 32768.0
+
+def load_audio(path, start=0.0, end=None):
+    """Drop-in for ``whisper.load_audio`` backed by the cache, optionally for a time range only."""
+    return to_float(audio_slice(path, start, end))
@@ -0,0 +1,239 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import resource
+import tempfile
+import multiprocessing
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(BENCH_DIR)
+sys.path.append(BENCH_DIR)
+
+import synthetic
+
+# --- CONFIG ---
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+BASELINE_FILE = os.path.join(BENCH_DIR, "baseline.json")  # written by --save-baseline on the reference box
+REGRESSION_THRESHOLD = 0.10  # p50 more than 10% slower than baseline is flagged
+
+
+# --- Timing helpers ---
+def _percentile(values, q):
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * q
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+def timed(fn, repeat):
+    """Run ``fn`` ``repeat`` times; returns (last result, latency stats). The first run is reported as cold."""
+    times, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - started)
+    return result, {
+        "runs": repeat,
+        "cold_s": round(times[0], 4),
+        "p50_s": round(_percentile(times, 0.5), 4),
+        "p95_s": round(_percentile(times, 0.95), 4),
+        "mean_s": round(sum(times) / len(times), 4),
+    }
+
+def _peak_rss_mb():
+    # ru_maxrss is KiB on Linux; children covers the ffmpeg processes a stage spawns
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(own / 1024, 1), round(children / 1024, 1)
+
+
+# --- Stages (each runs in a fresh process with private caches) ---
+def bench_slicer(workdir, video, repeat):
+    import media_info
+    import slicer
+
+    slicer.OUTPUT_FOLDER = os.path.join(workdir, "slicer_out")
+    os.makedirs(slicer.OUTPUT_FOLDER, exist_ok=True)
+    base = os.path.splitext(os.path.basename(video))[0]
+
+    def run():
+        random.seed(0)
+        slicer.slice_and_crop_video(video, base)
+        return [f for f in os.listdir(slicer.OUTPUT_FOLDER) if f.startswith(base)]
+
+    clips, stats = timed(run, repeat)
+    rendered = sum(media_info.probe(os.path.join(slicer.OUTPUT_FOLDER, c)).duration for c in clips)
+    stats["clips"] = len(clips)
+    stats["frames_per_s"] = round(rendered * synthetic.FPS / stats["p50_s"], 1)
+    stats["realtime_factor"] = round(rendered / stats["p50_s"], 2)
+    return stats
+
+def bench_smart_slice(workdir, video, repeat):
+    import media_info
+    import smart_slicer
+
+    smart_slicer.OUTPUT_DIR = os.path.join(workdir, "smart_out")
+    smart_slicer.METADATA_DIR = os.path.join(workdir, "smart_meta")
+    os.makedirs(smart_slicer.OUTPUT_DIR, exist_ok=True)
+    os.makedirs(smart_slicer.METADATA_DIR, exist_ok=True)
+    duration = media_info.probe(video).duration
+    # a 12s clip every 20s, deliberately off-keyframe so both copy and re-encode paths run
+    chunks = [
+        {"start": t + 0.7, "end": t + 12.7, "duration": 12.0, "text": "benchmark", "classification": "general"}
+        for t in range(0, int(duration) - 13, 20)
+    ]
+    base = os.path.splitext(os.path.basename(video))[0]
+    _, stats = timed(lambda: smart_slicer.slice_and_save(video, base, chunks), repeat)
+    clip_seconds = sum(c["duration"] for c in chunks)
+    stats["clips"] = len(chunks)
+    stats["frames_per_s"] = round(clip_seconds * synthetic.FPS / stats["p50_s"], 1)
+    stats["realtime_factor"] = round(clip_seconds / stats["p50_s"], 2)
+    return stats
+
+def bench_find_good_segments(workdir, hours, repeat):
+    import smart_slicer
+
+    transcript = synthetic.make_transcript(hours)
+    n_words = sum(len(s["words"]) for s in transcript["segments"])
+    clips, stats = timed(lambda: smart_slicer.find_good_segments(transcript), repeat)
+    stats["words"] = n_words
+    stats["clips"] = len(clips)
+    stats["words_per_s"] = round(n_words / stats["p50_s"])
+    stats["realtime_factor"] = round(hours * 3600 / stats["p50_s"], 1)
+    return stats
+
+def bench_vote_segments(workdir, n, repeat):
+    sys.path.append(os.path.join(REPO, "pipelines", "jre_pods"))
+    import llm_voting_panel
+
+    lists = synthetic.make_candidates(n)
+    voted, stats = timed(lambda: llm_voting_panel.vote_segments(*lists), repeat)
+    total = sum(len(l) for l in lists)
+    stats["candidates"] = total
+    stats["agreed"] = len(voted)
+    stats["candidates_per_s"] = round(total / stats["p50_s"])
+    return stats
+
+def bench_metadata(workdir, n, repeat):
+    sys.path.append(os.path.join(REPO, "pipelines", "jre_pods"))
+    import metadata_utils
+
+    meta_dir = synthetic.make_metadata_dir(os.path.join(workdir, f"metadata_{n}"), n)
+    records, stats = timed(lambda: metadata_utils.load_metadata_files(meta_dir), repeat)
+    stats["records"] = len(records)
+    stats["records_per_s"] = round(len(records) / stats["p50_s"])
+    return stats
+
+STAGES = {
+    "slicer": (bench_slicer, "videos"),
+    "smart_slice": (bench_smart_slice, "videos"),
+    "find_good_segments": (bench_find_good_segments, "transcript_hours"),
+    "vote_segments": (bench_vote_segments, "candidates"),
+    "metadata": (bench_metadata, "metadata"),
+}
+
+
+def _child(stage, arg, repeat):
+    workdir = tempfile.mkdtemp(prefix=f"bench_{stage}_")
+    # every cache points into the scratch dir so runs never see each other's (or production) state
+    for var, sub in [("AUDIO_CACHE_DIR", "audio"), ("SIGNALS_CACHE_DIR", "signals"),
+                     ("ARTIFACT_CACHE_DIR", "artifacts"), ("MEDIA_CACHE_DIR", "media"),
+                     ("TRACE_DIR", "traces")]:
+        os.environ[var] = os.path.join(workdir, "cache", sub)
+    os.environ["JOB_LEDGER_PATH"] = os.path.join(workdir, "cache", "job_ledger.sqlite")
+    os.chdir(workdir)  # the slicers create their folders relative to the working directory
+    sys.path.insert(0, REPO)
+    try:
+        stats = STAGES[stage][0](workdir, arg, repeat)
+    except Exception as e:
+        stats = {"error": f"{type(e).__name__}: {e}"}
+    finally:
+        os.chdir(REPO)
+        shutil.rmtree(workdir, ignore_errors=True)
+    stats["peak_rss_mb"], stats["peak_child_rss_mb"] = _peak_rss_mb()
+    return stats
+
+def run_stage(stage, arg, repeat):
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(1) as pool:
+        return pool.apply(_child, (stage, arg, repeat))
+
+
+# --- Baseline comparison ---
+def _label(stage, arg):
+    if isinstance(arg, str):
+        arg = os.path.splitext(os.path.basename(arg))[0]
+    return f"{stage}[{arg}]"
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """Print p50 deltas against ``baseline``; returns the labels that regressed past ``threshold``."""
+    regressions = []
+    for label, stats in results["stages"].items():
+        old = baseline.get("stages", {}).get(label)
+        if not old or "p50_s" not in old or "p50_s" not in stats:
+            print(f"[*] {label}: no baseline")
+            continue
+        change = stats["p50_s"] / old["p50_s"] - 1 if old["p50_s"] else 0.0
+        tag = "[!]" if change > threshold else "[+]"
+        print(f"{tag} {label}: p50 {old['p50_s']:.4f}s -> {stats['p50_s']:.4f}s ({change:+.1%})")
+        if change > threshold:
+            regressions.append(label)
+    return regressions
+
+
+# --- CLI ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the pipeline stages on synthetic media and fixtures.")
+    parser.add_argument("--profile", choices=sorted(synthetic.PROFILES), default="quick")
+    parser.add_argument("--stages", nargs="+", choices=sorted(STAGES), default=sorted(STAGES))
+    parser.add_argument("--repeat", type=int, default=None, help="runs per stage (default: from profile)")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit 1 if any stage regressed")
+    args = parser.parse_args(argv)
+
+    profile = synthetic.PROFILES[args.profile]
+    repeat = args.repeat or profile["repeat"]
+    results = {
+        "profile": args.profile,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "stages": {},
+    }
+
+    for stage in args.stages:
+        _, key = STAGES[stage]
+        for item in profile[key]:
+            arg = synthetic.make_video(*item) if key == "videos" else item
+            label = _label(stage, arg)
+            print(f"[*] Running {label} x{repeat}...")
+            stats = run_stage(stage, arg, repeat)
+            results["stages"][label] = stats
+            if "error" in stats:
+                print(f"[!] {label} failed: {stats['error']}")
+            else:
+                print(f"[+] {label}: p50 {stats['p50_s']:.4f}s  p95 {stats['p95_s']:.4f}s  "
+                      f"peak RSS {stats['peak_rss_mb']} MB")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out = os.path.join(RESULTS_DIR, f"{args.profile}_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"[+] Results written to {out}")
+
+    regressions = []
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+    if args.save_baseline:
+        shutil.copyfile(out, args.baseline)
+        print(f"[+] Baseline updated: {args.baseline}")
+    return 1 if regressions and args.fail_on_regression else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+import os
+import json
+import random
+import subprocess
+
+# --- CONFIG ---
+MEDIA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "media")
+FPS = 30
+
+# Sizes per profile: (seconds, (width, height)) videos, transcript hours, candidate counts, metadata records
+PROFILES = {
+    "quick": {
+        "videos": [(60, (1280, 720))],
+        "transcript_hours": [1],
+        "candidates": [300],
+        "metadata": [2000],
+        "repeat": 3,
+    },
+    "full": {
+        "videos": [(60, (1280, 720)), (300, (1920, 1080)), (600, (854, 480))],
+        "transcript_hours": [1, 3, 10],
+        "candidates": [300, 1500],
+        "metadata": [2000, 20000],
+        "repeat": 5,
+    },
+}
+
+WORDS = "so like yeah and the you know I mean what that is right okay but just really".split()
+HOT = ["insane", "crazy", "truth", "money", "nobody", "illegal", "wtf", "podcast", "gym", "meme"]
+TITLES = ["aliens are real", "chimp strength", "dmt trip story", "elk hunting", "comedy store days",
+          "ufc knockout", "ancient civilizations", "sober october", "bear attack", "cold plunge"]
+
+
+# --- Media: deterministic lavfi test videos, generated once and reused ---
+def make_video(duration, size, fps=FPS):
+    """testsrc2 picture + pink noise gated to 2s of silence every 10s, H.264/AAC with 2s GOPs."""
+    w, h = size
+    os.makedirs(MEDIA_DIR, exist_ok=True)
+    path = os.path.join(MEDIA_DIR, f"testsrc_{w}x{h}_{duration}s_{fps}fps.mp4")
+    if os.path.exists(path):
+        return path
+
+    print(f"[*] Generating synthetic video: {os.path.basename(path)}")
+    tmp = path + ".tmp.mp4"
+    cmd = [
+        "ffmpeg", "-nostdin", "-v", "error",
+        "-f", "lavfi", "-i", f"testsrc2=size={w}x{h}:rate={fps}:duration={duration}",
+        "-f", "lavfi", "-i", f"anoisesrc=color=pink:amplitude=0.3:seed=42:duration={duration}",
+        "-af", "volume='if(lt(mod(t,10),8),1,0)':eval=frame",
+        "-c:v", "libx264", "-preset", "ultrafast", "-g", str(fps * 2), "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-ar", "44100", "-shortest", "-y", tmp
+    ]
+    subprocess.run(cmd, check=True)
+    os.replace(tmp, path)
+    return path
+
+
+# --- Text fixtures ---
+def make_transcript(hours, seed=0, words_per_second=2.5, hot_rate=0.02):
+    """Whisper-shaped result with word timestamps, ~5s segments and sprinkled hot keywords."""
+    rng = random.Random(seed)
+    segments, t, end = [], 0.0, hours * 3600
+    while t < end:
+        words, seg_start = [], t
+        for _ in range(rng.randint(8, 16)):
+            d = rng.uniform(0.6, 1.4) / words_per_second
+            text = rng.choice(HOT) if rng.random() < hot_rate else rng.choice(WORDS)
+            words.append({"word": " " + text, "start": round(t, 2), "end": round(t + d * 0.8, 2)})
+            t += d
+        text = "".join(w["word"] for w in words) + rng.choice([".", ".", "?", "!"])
+        segments.append({"start": round(seg_start, 2), "end": round(t, 2), "text": text, "words": words})
+        t += rng.uniform(0.1, 0.8)
+    return {"text": " ".join(s["text"] for s in segments), "segments": segments}
+
+def make_candidates(n, voters=3, seed=0, episode_seconds=10800):
+    """``voters`` lists of ``n`` segments; about half are near-duplicates across voters."""
+    rng = random.Random(seed)
+    shared = []
+    for _ in range(n):
+        start = rng.uniform(0, episode_seconds - 60)
+        shared.append((start, start + rng.uniform(8, 60), f"{rng.choice(TITLES)} {rng.randint(0, 999)}"))
+    lists = []
+    for v in range(voters):
+        segs = []
+        for start, end, title in shared:
+            if rng.random() < 0.5:
+                start = rng.uniform(0, episode_seconds - 60)
+                end = start + rng.uniform(8, 60)
+                title = f"{rng.choice(TITLES)} {rng.randint(0, 999)}"
+            jitter = rng.uniform(-1.5, 1.5)
+            segs.append({
+                "start": round(start + jitter, 2), "end": round(end + jitter, 2), "title": title,
+                "virality_score": rng.randint(1, 10), "llm_votes": [f"voter{v}"],
+            })
+        lists.append(segs)
+    return lists
+
+def make_metadata_dir(path, n, seed=0):
+    """``n`` legacy per-clip JSON files, the layout the slicers used to write."""
+    rng = random.Random(seed)
+    os.makedirs(path, exist_ok=True)
+    for i in range(n):
+        meta = {
+            "filename": f"clip_{i:06d}.mp4",
+            "source_video": f"episode_{i % 200:03d}.mp4",
+            "start": i * 10.0,
+            "end": i * 10.0 + 25,
+            "title": rng.choice(TITLES),
+            "reason": "benchmark fixture",
+            "transcript_snippet": " ".join(rng.choice(WORDS) for _ in range(40)),
+            "category": rng.choice(["podcast", "finance", "fitness", "general"]),
+            "model_used": rng.choice(["mistral", "llama3", "gpt-4"]),
+        }
+        with open(os.path.join(path, f"clip_{i:06d}.json"), "w") as f:
+            json.dump(meta, f, indent=2)
+    return path
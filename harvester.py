@@ -5,6 +5,9 @@ import string
 import random
 from datetime import datetime
 
+import job_ledger
+import tracing
+
 # -- CONFIG --
 KEYWORDS = [
     "gym motivation shorts",
@@ -24,14 +27,18 @@ SAVE_DIR = "harvested_raw"
 LOG_FILE = "harvest_log.txt"
 
 os.makedirs(SAVE_DIR, exist_ok=True)
+_log_file = None
 
 # -- Logging --
 def log(msg):
+    global _log_file
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     full_msg = f"[{timestamp}] {msg}"
     print(full_msg)
-    with open(LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(full_msg + "\n")
+    if _log_file is None:
+        # opened once, line-buffered so each line still reaches the file as it's logged
+        _log_file = open(LOG_FILE, "a", encoding="utf-8", buffering=1)
+    _log_file.write(full_msg + "\n")
 
 # -- Utility --
 def sanitize_filename(name):
@@ -45,8 +52,6 @@ def randomize_keyword(keyword):
 
 # -- Harvest Routine --
 def harvest_videos():
-    initial_files = set(os.listdir(SAVE_DIR))
-
     for keyword in KEYWORDS:
         randomized_keyword = randomize_keyword(keyword)
         topic = randomized_keyword.replace(" ", "_").lower()
@@ -55,25 +60,26 @@ def harvest_videos():
         log(f"[AIM] 🔍 Querying: {randomized_keyword}")
 
         try:
-            subprocess.run([
-                "yt-dlp",
-                search_term,
-"--format", "bestvideo[height>=720][ext=mp4]+bestaudio[ext=m4a]/best[height>=720]",
-                "--match-filter",
-                "duration >= 400 & duration <= 3600",
-                "--restrict-filenames",
-                "--format", "mp4",
-                "--output",
-                os.path.join(SAVE_DIR, f"{topic}_video%(autonumber)03d.%(ext)s")
-            ], check=True)
+            with tracing.span("harvest.download", keyword=randomized_keyword):
+                subprocess.run([
+                    "yt-dlp",
+                    search_term,
+                    "--format", "bestvideo[height>=720][ext=mp4]+bestaudio[ext=m4a]/best[height>=720]",
+                    "--match-filter",
+                    "duration >= 400 & duration <= 3600",
+                    "--restrict-filenames",
+                    "--format", "mp4",
+                    "--output",
+                    os.path.join(SAVE_DIR, f"{topic}_video%(autonumber)03d.%(ext)s")
+                ], check=True)
         except Exception as e:
             log(f"[!] Error downloading '{randomized_keyword}': {e}")
 
-    # Count the difference
-    final_files = set(os.listdir(SAVE_DIR))
-    harvested = final_files - initial_files
+    # New files are the ones the ledger hasn't seen; slicers pick them up as pending
+    harvested = job_ledger.register([os.path.join(SAVE_DIR, f) for f in os.listdir(SAVE_DIR)])
     log(f"\n[+] ✅ Harvest complete. {len(harvested)} new files saved to '{SAVE_DIR}'.")
 
 # -- EXECUTE --
 if __name__ == "__main__":
+    tracing.init()
     harvest_videos()
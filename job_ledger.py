@@ -0,0 +1,215 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+from contextlib import contextmanager
+
+# --- CONFIG ---
+LEDGER_PATH = os.getenv("JOB_LEDGER_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "job_ledger.sqlite"))
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+os.makedirs(os.path.dirname(LEDGER_PATH), exist_ok=True)
+
+
+# --- Storage: one row per source/clip, one row per (item, stage) ---
+def _connect():
+    conn = sqlite3.connect(LEDGER_PATH, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS items ("
+        "path TEXT PRIMARY KEY, kind TEXT NOT NULL, parent TEXT, first_seen REAL NOT NULL)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS stages ("
+        "path TEXT NOT NULL, stage TEXT NOT NULL, status TEXT NOT NULL, input_hash TEXT, "
+        "attempts INTEGER NOT NULL DEFAULT 0, started REAL, finished REAL, seconds REAL, error TEXT, "
+        "PRIMARY KEY (path, stage))"
+    )
+    return conn
+
+@contextmanager
+def _db():
+    conn = _connect()
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+def fingerprint(path, **params):
+    """Cheap change detector: size + mtime of the file plus any stage parameters (model, preset...)."""
+    st = os.stat(path)
+    data = f"{st.st_size}|{st.st_mtime_ns}|{json.dumps(params, sort_keys=True, default=str)}"
+    return hashlib.sha1(data.encode()).hexdigest()[:16]
+
+
+# --- Items ---
+def register(paths, kind="source", parent=None):
+    """Record ``paths`` as known items; returns the ones seen for the first time."""
+    rows = [(os.path.abspath(p), kind, parent and os.path.abspath(parent), time.time()) for p in paths]
+    with _db() as conn:
+        before = conn.total_changes
+        new = []
+        for row in rows:
+            conn.execute("INSERT OR IGNORE INTO items (path, kind, parent, first_seen) VALUES (?, ?, ?, ?)", row)
+            if conn.total_changes > before:
+                new.append(row[0])
+                before = conn.total_changes
+    return new
+
+def add_clip(clip_path, source_path):
+    register([clip_path], kind="clip", parent=source_path)
+
+
+# --- Stages ---
+def pending(stage, paths, **params):
+    """The subset of ``paths`` whose ``stage`` isn't done for their current contents and ``params``.
+
+    Failed items, items left running by a crashed run and changed files all
+    count as pending, so rerunning a stage resumes exactly where it stopped.
+    """
+    paths = list(paths)
+    register(paths)
+    with _db() as conn:
+        done = dict(conn.execute("SELECT path, input_hash FROM stages WHERE stage = ? AND status = ?", (stage, DONE)))
+    todo = []
+    for path in paths:
+        try:
+            if done.get(os.path.abspath(path)) != fingerprint(path, **params):
+                todo.append(path)
+        except OSError:
+            continue  # vanished since listing
+    skipped = len(paths) - len(todo)
+    if skipped:
+        print(f"[*] Ledger: {skipped} item(s) already through '{stage}', {len(todo)} to do")
+    return todo
+
+def start(stage, path, **params):
+    with _db() as conn:
+        conn.execute(
+            "INSERT INTO stages (path, stage, status, input_hash, attempts, started) VALUES (?, ?, ?, ?, 1, ?) "
+            "ON CONFLICT (path, stage) DO UPDATE SET status = excluded.status, input_hash = excluded.input_hash, "
+            "attempts = attempts + 1, started = excluded.started, finished = NULL, seconds = NULL, error = NULL",
+            (os.path.abspath(path), stage, RUNNING, fingerprint(path, **params), time.time())
+        )
+
+def _settle(stage, path, status, error=None):
+    now = time.time()
+    with _db() as conn:
+        conn.execute(
+            "UPDATE stages SET status = ?, finished = ?, seconds = ? - started, error = ? WHERE path = ? AND stage = ?",
+            (status, now, now, error, os.path.abspath(path), stage)
+        )
+
+def finish(stage, path):
+    _settle(stage, path, DONE)
+
+def fail(stage, path, error):
+    _settle(stage, path, FAILED, str(error))
+
+def release(stage, path):
+    """Put an interrupted item back to pending so the next run picks it up."""
+    _settle(stage, path, PENDING)
+
+@contextmanager
+def track(stage, path, **params):
+    """Mark ``path`` running for ``stage``; done when the block exits, failed if it raises."""
+    start(stage, path, **params)
+    try:
+        yield
+    except KeyboardInterrupt:
+        release(stage, path)
+        raise
+    except Exception as e:
+        fail(stage, path, e)
+        raise
+    finish(stage, path)
+
+def settle(stage, path, futures):
+    """Finish ``stage`` for ``path`` once all of ``futures`` complete (failed if any did, pending if cancelled)."""
+    futures = [f for f in futures if f is not None]
+    if not futures:
+        finish(stage, path)
+        return
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def _done(_):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        if any(f.cancelled() for f in futures):
+            release(stage, path)
+            return
+        errors = [f.exception() for f in futures if f.exception() is not None]
+        if errors:
+            fail(stage, path, errors[0])
+        else:
+            finish(stage, path)
+
+    for f in futures:
+        f.add_done_callback(_done)
+
+
+# --- Reporting ---
+def summary():
+    with _db() as conn:
+        rows = conn.execute(
+            "SELECT stage, status, COUNT(*), COALESCE(SUM(seconds), 0) FROM stages GROUP BY stage, status ORDER BY stage"
+        ).fetchall()
+        items = dict(conn.execute("SELECT kind, COUNT(*) FROM items GROUP BY kind"))
+    stages = {}
+    for stage, status, count, seconds in rows:
+        stages.setdefault(stage, {})[status] = {"count": count, "seconds": round(seconds, 1)}
+    return {"items": items, "stages": stages}
+
+def failures(stage=None):
+    query = "SELECT path, stage, attempts, error FROM stages WHERE status = ?"
+    args = [FAILED]
+    if stage:
+        query += " AND stage = ?"
+        args.append(stage)
+    with _db() as conn:
+        return conn.execute(query, args).fetchall()
+
+def reset(stage, status=None):
+    """Forget ``stage`` results (optionally only those with ``status``) so the items are redone."""
+    query, args = "DELETE FROM stages WHERE stage = ?", [stage]
+    if status:
+        query += " AND status = ?"
+        args.append(status)
+    with _db() as conn:
+        return conn.execute(query, args).rowcount
+
+
+# --- CLI: python job_ledger.py stats | failures [--stage S] | reset STAGE [--status S] ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or reset the pipeline job ledger.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="item counts and per-stage status totals")
+    fails = sub.add_parser("failures", help="list failed items with their last error")
+    fails.add_argument("--stage", default=None)
+    rst = sub.add_parser("reset", help="make a stage redo its items")
+    rst.add_argument("stage")
+    rst.add_argument("--status", default=None, choices=[PENDING, RUNNING, DONE, FAILED])
+    args = parser.parse_args(argv)
+
+    if args.command == "stats":
+        print(json.dumps(summary(), indent=2))
+    elif args.command == "failures":
+        for path, stage, attempts, error in failures(args.stage):
+            print(f"[!] {stage}: {path} (attempt {attempts}) — {error}")
+    else:
+        print(f"[+] Reset {reset(args.stage, args.status)} '{args.stage}' row(s)")
+
+if __name__ == "__main__":
+    sys.exit(main())
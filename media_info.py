@@ -0,0 +1,193 @@
+import os
+import json
+import sqlite3
+import threading
+import subprocess
+from dataclasses import dataclass, asdict, fields
+
+import tracing
+
+# --- CONFIG ---
+CACHE_DIR = os.getenv("MEDIA_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache"))
+INDEX_PATH = os.path.join(CACHE_DIR, "media_index.sqlite")
+
+os.makedirs(CACHE_DIR, exist_ok=True)
+
+_memo = {}
+_keyframe_memo = {}
+_memo_lock = threading.Lock()
+
+
+@dataclass
+class MediaInfo:
+    path: str
+    duration: float
+    width: int = 0
+    height: int = 0
+    fps: float = 0.0
+    codec: str = ""
+    profile: str = ""  # as ffprobe names it, e.g. "High", "Constrained Baseline"
+    level: int = 0  # ffprobe's integer form: 40 = level 4.0
+    refs: int = 0
+    pix_fmt: str = ""
+    frame_rate: str = ""  # exact rational, e.g. "30000/1001"
+    rotation: int = 0
+    has_audio: bool = False
+
+    @property
+    def display_size(self):
+        """(width, height) as the video is shown, i.e. after applying rotation metadata."""
+        if self.rotation % 180:
+            return self.height, self.width
+        return self.width, self.height
+
+    @property
+    def resolution(self):
+        w, h = self.display_size
+        return f"{w}x{h}"
+
+    @property
+    def is_vertical(self):
+        w, h = self.display_size
+        return h > w
+
+
+# --- Probing: format and stream headers only; keyframes are listed on demand ---
+def _rate(value):
+    try:
+        num, _, den = value.partition("/")
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+def _rotation(stream):
+    for side in stream.get("side_data_list", []):
+        if "rotation" in side:
+            return int(side["rotation"]) % 360
+    return int(stream.get("tags", {}).get("rotate", 0)) % 360
+
+@tracing.traced("probe")
+def _probe(path):
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-of", "json=c=1", "-show_format", "-show_streams", path],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed for {path}: {result.stderr.strip()}")
+    data = json.loads(result.stdout)
+    streams = data.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), {})
+    return MediaInfo(
+        path=os.path.abspath(path),
+        duration=float(data.get("format", {}).get("duration") or video.get("duration") or 0.0),
+        width=int(video.get("width") or 0),
+        height=int(video.get("height") or 0),
+        fps=_rate(video.get("avg_frame_rate") or video.get("r_frame_rate") or "0/1"),
+        codec=video.get("codec_name", ""),
+        profile=video.get("profile", ""),
+        level=max(int(video.get("level") or 0), 0),  # -99 = unknown
+        refs=int(video.get("refs") or 0),
+        pix_fmt=video.get("pix_fmt", ""),
+        frame_rate=video.get("r_frame_rate", ""),
+        rotation=_rotation(video) if video else 0,
+        has_audio=any(s.get("codec_type") == "audio" for s in streams),
+    )
+
+@tracing.traced("probe.keyframes")
+def _probe_keyframes(path):
+    # demuxes every packet of the first video stream (no decoding); only cut_clip needs this
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-of", "json=c=1", "-select_streams", "v:0",
+         "-show_entries", "packet=pts_time,flags", path],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed for {path}: {result.stderr.strip()}")
+    return sorted(
+        float(p["pts_time"]) for p in json.loads(result.stdout).get("packets", [])
+        if "K" in p.get("flags", "") and p.get("pts_time") not in (None, "N/A")
+    )
+
+
+# --- On-disk index shared by every module ---
+def _connect():
+    conn = sqlite3.connect(INDEX_PATH, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS media ("
+        "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime INTEGER NOT NULL, info TEXT NOT NULL)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS keyframes ("
+        "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime INTEGER NOT NULL, times TEXT NOT NULL)"
+    )
+    return conn
+
+_FIELDS = {f.name for f in fields(MediaInfo)}
+
+def _cached_info(data):
+    # rows written by an older probe (missing fields) are re-probed; dropped fields are ignored
+    if not _FIELDS <= data.keys():
+        return None
+    return MediaInfo(**{k: data[k] for k in _FIELDS})
+
+def probe(path):
+    """Return MediaInfo for ``path``, running ffprobe only when the file is new or has changed."""
+    abspath = os.path.abspath(path)
+    st = os.stat(abspath)
+    key = (abspath, st.st_size, st.st_mtime_ns)
+    with _memo_lock:
+        if key in _memo:
+            return _memo[key]
+
+    with _connect() as conn:
+        row = conn.execute("SELECT size, mtime, info FROM media WHERE path = ?", (abspath,)).fetchone()
+        info = None
+        if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            info = _cached_info(json.loads(row[2]))
+        if info is None:
+            info = _probe(abspath)
+            conn.execute(
+                "INSERT OR REPLACE INTO media (path, size, mtime, info) VALUES (?, ?, ?, ?)",
+                (abspath, st.st_size, st.st_mtime_ns, json.dumps(asdict(info)))
+            )
+    conn.close()
+
+    with _memo_lock:
+        _memo[key] = info
+    return info
+
+def keyframes(path):
+    """Sorted keyframe times (seconds) of the first video stream, listed once per file version."""
+    abspath = os.path.abspath(path)
+    st = os.stat(abspath)
+    key = (abspath, st.st_size, st.st_mtime_ns)
+    with _memo_lock:
+        if key in _keyframe_memo:
+            return _keyframe_memo[key]
+
+    with _connect() as conn:
+        row = conn.execute("SELECT size, mtime, times FROM keyframes WHERE path = ?", (abspath,)).fetchone()
+        if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            times = json.loads(row[2])
+        else:
+            times = _probe_keyframes(abspath)
+            conn.execute(
+                "INSERT OR REPLACE INTO keyframes (path, size, mtime, times) VALUES (?, ?, ?, ?)",
+                (abspath, st.st_size, st.st_mtime_ns, json.dumps(times))
+            )
+    conn.close()
+
+    with _memo_lock:
+        _keyframe_memo[key] = times
+    return times
+
+def probe_many(paths):
+    """Probe a batch of files, returning {path: MediaInfo}; unreadable files are reported and skipped."""
+    infos = {}
+    for path in paths:
+        try:
+            infos[path] = probe(path)
+        except (OSError, RuntimeError, ValueError) as e:
+            print(f"[!] Could not probe {path}: {e}")
+    return infos
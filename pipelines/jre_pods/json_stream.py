@@ -0,0 +1,110 @@
+import re
+import sys
+import json
+from typing import Any, Dict, Iterable, Iterator, List
+
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+
+# --- Incremental parser: yields each object of a JSON array as soon as it closes ---
+class ArrayParser:
+    """Feed text chunks of an LLM response; get back the array's objects as they complete.
+
+    Anything before the array (prose, a ```json fence, a ``{"segments":``
+    wrapper) is skipped. A bracket pair that closes without yielding an object
+    — a ``[01:10]`` echoed in the prose — is skipped too, and an array whose
+    first element is another array (``[[{...}]]``) is read as that inner array.
+    Strings and escapes are tracked so brackets inside titles don't confuse
+    the depth count. An object cut off by truncation is simply never emitted.
+    """
+
+    def __init__(self):
+        self.buf = ""
+        self.pos = 0
+        self.depth = 0  # 0 = before the array, 1 = inside it, >1 = inside an item
+        self.in_string = False
+        self.escaped = False
+        self.item_start = None
+        self.found = 0  # objects yielded from the current array
+        self.closed = False
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        self.buf += chunk
+        items = []
+        while self.pos < len(self.buf) and not self.closed:
+            ch = self.buf[self.pos]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == "\\":
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif self.depth == 0:
+                if ch == "[":
+                    self.depth = 1
+            elif ch == '"':
+                self.in_string = True
+            elif ch == "[" and self.depth == 1 and not self.found:
+                pass  # [[...]] wrapper: the inner array stands in for the outer one
+            elif ch in "[{":
+                if self.depth == 1 and ch == "{":
+                    self.item_start = self.pos
+                self.depth += 1
+            elif ch in "]}":
+                self.depth -= 1
+                if self.depth == 1 and self.item_start is not None:
+                    item = _loads_lenient(self.buf[self.item_start:self.pos + 1])
+                    if isinstance(item, dict):
+                        items.append(item)
+                        self.found += 1
+                    self.item_start = None
+                elif self.depth == 0:
+                    # prose like "[01:10]" closes without an object: back to looking for the array
+                    self.closed = self.found > 0
+            self.pos += 1
+
+        # drop consumed text so long streams don't keep the whole response around
+        keep = self.item_start if self.item_start is not None else self.pos
+        self.buf = self.buf[keep:]
+        self.pos -= keep
+        if self.item_start is not None:
+            self.item_start = 0
+        return items
+
+
+def _loads_lenient(text: str):
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        try:
+            return json.loads(_TRAILING_COMMA.sub(r"\1", text))
+        except json.JSONDecodeError:
+            return None
+
+
+def iter_json_array(chunks: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    parser = ArrayParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+
+
+def parse_array(text: str) -> List[Dict[str, Any]]:
+    """Objects from a complete response; strict JSON first, then salvage whatever objects closed."""
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        return list(iter_json_array([text]))
+    if isinstance(data, dict):
+        data = next((v for v in data.values() if isinstance(v, list)), [data])
+    items = [item for item in data if isinstance(item, dict)] if isinstance(data, list) else []
+    return items or list(iter_json_array([text]))  # e.g. a [[...]] wrapper
+
+
+# --- CLI: python json_stream.py recorded_response.txt — replay a saved response offline ---
+if __name__ == "__main__":
+    with open(sys.argv[1], "r", encoding="utf-8") as f:
+        recorded = f.read()
+    # feed it in small pieces, the way a streamed completion arrives
+    for obj in iter_json_array(recorded[i:i + 16] for i in range(0, len(recorded), 16)):
+        print(json.dumps(obj))
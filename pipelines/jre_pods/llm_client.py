@@ -0,0 +1,233 @@
+import os
+import sys
+import json
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+import tracing
+
+load_dotenv()
+
+# --- CONFIG ---
+# Base URLs are overridable so the whole layer can be pointed at a local stub server
+BASE_URLS = {
+    "openai": os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1"),
+    "ollama": os.getenv("OLLAMA_BASE_URL", "http://localhost:11434"),
+}
+CONCURRENCY = {
+    "openai": int(os.getenv("LLM_OPENAI_CONCURRENCY", "8")),
+    "ollama": int(os.getenv("LLM_OLLAMA_CONCURRENCY", "2")),  # local GPU/CPU; more just queues
+}
+TIMEOUTS = {
+    "openai": (10, 120),  # (connect, read) seconds
+    "ollama": (5, 300),
+}
+MAX_RETRIES = 4
+BACKOFF_BASE = 1.0  # seconds, doubled per attempt plus jitter
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class LLMError(RuntimeError):
+    pass
+
+
+# --- Pooled sessions + per-backend concurrency limits ---
+_sessions: Dict[str, requests.Session] = {}
+_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+_init_lock = threading.Lock()
+
+def _backend(name: str):
+    with _init_lock:
+        if name not in _sessions:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=CONCURRENCY[name])
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[name] = session
+            _semaphores[name] = threading.BoundedSemaphore(CONCURRENCY[name])
+        return _sessions[name], _semaphores[name]
+
+def _headers(backend: str) -> Dict[str, str]:
+    headers = {"Content-Type": "application/json"}
+    if backend == "openai":
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise EnvironmentError("OPENAI_API_KEY not set in .env")
+        headers["Authorization"] = f"Bearer {api_key}"
+    return headers
+
+def _retry_delay(attempt: int, response: Optional[requests.Response] = None) -> float:
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.replace(".", "", 1).isdigit():
+            return float(retry_after)
+    return BACKOFF_BASE * (2 ** attempt) + random.uniform(0, BACKOFF_BASE)
+
+def _send(backend: str, method: str, path: str, payload: Any = None, timeout=None, stream: bool = False) -> requests.Response:
+    session, _ = _backend(backend)
+    url = BASE_URLS[backend].rstrip("/") + path
+    timeout = timeout or TIMEOUTS[backend]
+
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            res = session.request(method, url, json=payload, headers=_headers(backend), timeout=timeout, stream=stream)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt == MAX_RETRIES:
+                raise LLMError(f"{backend} {path} unreachable after {attempt + 1} attempt(s): {e}") from e
+            delay = _retry_delay(attempt)
+        else:
+            if res.status_code not in RETRY_STATUS:
+                res.raise_for_status()
+                return res
+            res.close()
+            if attempt == MAX_RETRIES:
+                raise LLMError(f"{backend} {path} returned {res.status_code} after {attempt + 1} attempt(s)")
+            delay = _retry_delay(attempt, res)
+        print(f"[⏳] {backend} retry {attempt + 1}/{MAX_RETRIES} in {delay:.1f}s")
+        tracing.count("llm_retries")
+        time.sleep(delay)
+
+def _count_sent(payload: Any):
+    # prompt text only; the JSON envelope adds a handful of tokens per request
+    if not isinstance(payload, dict):
+        return
+    from transcript_chunks import count_tokens  # imported here: transcript_chunks imports this module
+    text = payload.get("prompt") or "".join(m.get("content", "") for m in payload.get("messages", []))
+    if text:
+        tracing.count("tokens_sent", count_tokens(text))
+
+def request(backend: str, method: str, path: str, payload: Any = None, timeout=None) -> requests.Response:
+    """Send one request on the backend's pooled session, retrying 429/5xx and connection errors."""
+    _, slots = _backend(backend)
+    _count_sent(payload)
+    with slots, tracing.span(f"llm.{backend}", path=path, model=(payload or {}).get("model")):
+        return _send(backend, method, path, payload, timeout)
+
+def _acquire(slots: threading.BoundedSemaphore, cancel: Optional[threading.Event]) -> bool:
+    if cancel is None:
+        slots.acquire()
+        return True
+    while not slots.acquire(timeout=0.5):
+        if cancel.is_set():
+            return False
+    if cancel.is_set():
+        slots.release()
+        return False
+    return True
+
+def stream_lines(backend: str, path: str, payload: Any, timeout=None,
+                 cancel: Optional[threading.Event] = None) -> Iterator[str]:
+    """POST with a streamed body and yield its non-empty lines; the backend slot is held until exhausted.
+
+    Retries only cover getting the response started — once text is flowing a
+    failure is raised, since the caller may already have used part of it.
+    Setting ``cancel`` ends the stream at the next line, closing the response
+    and freeing the slot (a caller still waiting for a slot gives up too).
+    """
+    _, slots = _backend(backend)
+    if not _acquire(slots, cancel):
+        return
+    try:
+        _count_sent(payload)
+        with tracing.span(f"llm.{backend}.stream", path=path, model=payload.get("model")):
+            res = _send(backend, "POST", path, payload, timeout, stream=True)
+            res.encoding = res.encoding or "utf-8"  # SSE/NDJSON often omit a charset; iter_lines would yield bytes
+            try:
+                for line in res.iter_lines(decode_unicode=True):
+                    if cancel is not None and cancel.is_set():
+                        return
+                    if line:
+                        yield line
+            except (requests.ConnectionError, requests.Timeout) as e:
+                raise LLMError(f"{backend} {path} stream interrupted: {e}") from e
+            finally:
+                res.close()
+    finally:
+        slots.release()
+
+# --- Backend calls ---
+def chat_openai(messages: List[Dict[str, str]], model: str = "gpt-4", **params) -> str:
+    res = request("openai", "POST", "/chat/completions", {"model": model, "messages": messages, **params})
+    data = res.json()
+    if "choices" not in data:
+        raise LLMError(f"OpenAI response without choices: {data}")
+    return data["choices"][0]["message"]["content"]
+
+def chat_ollama(messages: List[Dict[str, str]], model: str = "mistral", **params) -> str:
+    res = request("ollama", "POST", "/api/chat", {"model": model, "messages": messages, "stream": False, **params})
+    return res.json()["message"]["content"]
+
+def generate_ollama(prompt: str, model: str = "mistral", **params) -> str:
+    res = request("ollama", "POST", "/api/generate", {"model": model, "prompt": prompt, "stream": False, **params})
+    return res.json()["response"]
+
+# --- Streaming calls: yield text deltas as the model produces them ---
+def stream_openai(messages: List[Dict[str, str]], model: str = "gpt-4", cancel: Optional[threading.Event] = None,
+                  **params) -> Iterator[str]:
+    payload = {"model": model, "messages": messages, "stream": True, **params}
+    for line in stream_lines("openai", "/chat/completions", payload, cancel=cancel):
+        if not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return
+        choices = json.loads(data).get("choices") or [{}]
+        delta = choices[0].get("delta", {}).get("content")
+        if delta:
+            yield delta
+
+def stream_ollama(messages: List[Dict[str, str]], model: str = "mistral", cancel: Optional[threading.Event] = None,
+                  **params) -> Iterator[str]:
+    payload = {"model": model, "messages": messages, "stream": True, **params}
+    for line in stream_lines("ollama", "/api/chat", payload, cancel=cancel):
+        data = json.loads(line)
+        if data.get("error"):
+            raise LLMError(f"ollama {model}: {data['error']}")
+        yield data.get("message", {}).get("content", "")
+        if data.get("done"):
+            return
+
+def stream_generate_ollama(prompt: str, model: str = "mistral", cancel: Optional[threading.Event] = None,
+                           **params) -> Iterator[str]:
+    payload = {"model": model, "prompt": prompt, "stream": True, **params}
+    for line in stream_lines("ollama", "/api/generate", payload, cancel=cancel):
+        data = json.loads(line)
+        if data.get("error"):
+            raise LLMError(f"ollama {model}: {data['error']}")
+        yield data.get("response", "")
+        if data.get("done"):
+            return
+
+def ping(backend: str) -> bool:
+    path = "/models" if backend == "openai" else "/api/tags"
+    try:
+        return request(backend, "GET", path).status_code == 200
+    except (LLMError, EnvironmentError, requests.HTTPError):
+        return False
+
+# --- Batch fan-out ---
+def batch(fn: Callable, items: List[Any], max_workers: Optional[int] = None) -> List[Any]:
+    """Run ``fn`` over ``items`` concurrently and return results in order.
+
+    A failed item yields its exception instead of aborting the batch; the
+    per-backend semaphores keep the real request concurrency bounded no
+    matter how many items are in flight.
+    """
+    def _safe(item):
+        try:
+            return fn(item)
+        except Exception as e:
+            return e
+
+    workers = max_workers or sum(CONCURRENCY.values())
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm") as pool:
+        return list(pool.map(_safe, items))
@@ -1,20 +1,25 @@
 import os
-import json
-import requests
+import sys
+import time
+import bisect
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from dotenv import load_dotenv
-from collections import defaultdict
 from difflib import SequenceMatcher
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+import artifact_cache
+import json_stream
+import llm_client
 
 load_dotenv()
+CACHE = artifact_cache.default_cache()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 # GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")  # Disabled for now
 
-HEADERS_OPENAI = {
-    "Content-Type": "application/json",
-    "Authorization": f"Bearer {OPENAI_API_KEY}"
-}
-
 # HEADERS_GEMINI = {
 #     "Content-Type": "application/json",
 #     "x-goog-api-key": GEMINI_API_KEY
@@ -31,11 +36,7 @@ PROMPT_MISTRAL = """You're a viral detector for podcast content. Return 3–5 JS
 def test_llm_connections():
     print("\n[🔌] Testing LLM connectivity:")
     if OPENAI_API_KEY:
-        try:
-            r = requests.get("https://api.openai.com/v1/models", headers=HEADERS_OPENAI)
-            print("[✅] GPT-4 connection: OK" if r.status_code == 200 else "[❌] GPT-4 connection: FAILED")
-        except Exception as e:
-            print(f"[❌] GPT-4 error: {e}")
+        print("[✅] GPT-4 connection: OK" if llm_client.ping("openai") else "[❌] GPT-4 connection: FAILED")
     else:
         print("[⚠️] OPENAI_API_KEY not found")
 
@@ -52,21 +53,13 @@ def test_llm_connections():
     # else:
     #     print("[🟨] Gemini check skipped — currently disabled")
 
-def similar(a, b, threshold=0.87):
-    return SequenceMatcher(None, a.strip().lower(), b.strip().lower()).ratio() > threshold
-
-def query_openai(transcript):
-    payload = {
-        "model": "gpt-4",
-        "messages": [
-            {"role": "system", "content": PROMPT_GPT},
-            {"role": "user", "content": transcript.strip()}
-        ]
-    }
+def query_openai(transcript, cancel=None):
+    messages = [
+        {"role": "system", "content": PROMPT_GPT},
+        {"role": "user", "content": transcript.strip()}
+    ]
     try:
-        r = requests.post("https://api.openai.com/v1/chat/completions", headers=HEADERS_OPENAI, json=payload)
-        content = r.json()["choices"][0]["message"]["content"]
-        parsed = json.loads(content[content.find("["):])
+        parsed = list(json_stream.iter_json_array(llm_client.stream_openai(messages, model="gpt-4", cancel=cancel)))
         for p in parsed:
             p["llm_votes"] = ["openai"]
         return parsed
@@ -74,64 +67,139 @@ def query_openai(transcript):
         print("[OpenAI ❌]", e)
         return []
 
-def query_mistral_local(transcript, cache_key="mistral_segments.json"):
-    base_dir = os.path.join(os.path.dirname(__file__), "transcripts")
-    os.makedirs(base_dir, exist_ok=True)
-    cache_path = os.path.join(base_dir, cache_key)
-
-    if os.path.exists(cache_path):
-        try:
-            with open(cache_path, "r") as f:
-                cached = json.load(f)
-                if isinstance(cached, list) and cached:
-                    print(f"[📄] Loaded cached Mistral segments from {cache_key}")
-                    return cached
-                else:
-                    os.remove(cache_path)
-        except:
-            os.remove(cache_path)
-
-    payload = {
-        "model": "mistral",
-        "messages": [
-            {"role": "system", "content": PROMPT_MISTRAL},
-            {"role": "user", "content": transcript.strip()}
-        ],
-        "stream": False
-    }
+def query_ollama_local(transcript, model="mistral", cancel=None):
+    cache_key = CACHE.key("segments", texts=[transcript.strip()], model=model, prompt=PROMPT_MISTRAL)
+    cached = CACHE.get(cache_key)
+    if isinstance(cached, list) and cached:
+        print(f"[📄] Loaded cached {model} segments ({cache_key})")
+        return cached
+
+    messages = [
+        {"role": "system", "content": PROMPT_MISTRAL},
+        {"role": "user", "content": transcript.strip()}
+    ]
     try:
-        r = requests.post("http://localhost:11434/api/chat", json=payload)
-        content = r.json()["message"]["content"].strip()
-        trimmed = content[content.find("["):content.rfind("]")+1]
-        parsed = json.loads(trimmed)
+        parsed = list(json_stream.iter_json_array(llm_client.stream_ollama(messages, model=model, cancel=cancel)))
         for p in parsed:
-            p["llm_votes"] = ["mistral"]
-        with open(cache_path, "w") as f:
-            json.dump(parsed, f, indent=2)
+            p["llm_votes"] = [model]
+        if parsed and not (cancel and cancel.is_set()):  # a cut-off answer is never cached
+            CACHE.put(cache_key, parsed)
         return parsed
     except Exception as e:
-        print("[Mistral ❌]", e)
+        print(f"[{model} ❌]", e)
         return []
 
-def vote_segments(openai_segs, mistral_segs):  # Gemini commented out for now
-    all_segments = openai_segs + mistral_segs
+def query_mistral_local(transcript, cancel=None):
+    return query_ollama_local(transcript, model="mistral", cancel=cancel)
+
+# --- PANEL ---
+# name -> {"query": fn(transcript, cancel=Event) -> segments, "deadline": seconds}. OpenAI is the fallback voter.
+# A query should stop and return what it has once ``cancel`` is set (the stream helpers take it directly).
+VOTERS = {}
+PANEL_DEADLINE = float(os.getenv("PANEL_DEADLINE", "180"))
+PANEL_TARGET = 3  # agreed segments that settle the vote before every voter has answered
+MIN_AGREEMENT = 2
+
+def register_voter(name, query, deadline=PANEL_DEADLINE):
+    VOTERS[name] = {"query": query, "deadline": deadline}
+
+register_voter("mistral", query_mistral_local, deadline=300)
+register_voter("openai", query_openai, deadline=120)
+# register_voter("gemini", query_gemini)  # Disabled for now
+for _model in filter(None, os.getenv("PANEL_OLLAMA_MODELS", "").split(",")):
+    # e.g. PANEL_OLLAMA_MODELS=llama3 adds a second local voter
+    register_voter(_model.strip(), functools.partial(query_ollama_local, model=_model.strip()), deadline=300)
+
+# --- CONSENSUS ---
+MATCH_WINDOW = 2  # seconds start and end may each differ by and still be the same pick
+TITLE_THRESHOLD = 0.87
+MATCH_IOU = None  # e.g. 0.6 matches picks by time-range overlap instead of the ±MATCH_WINDOW rule
+
+def similar(a, b, threshold=TITLE_THRESHOLD):
+    return SequenceMatcher(None, a.strip().lower(), b.strip().lower()).ratio() > threshold
+
+class _TitleMatcher:
+    """similar() against one title, with difflib's cheap upper bounds checked before the full ratio."""
+
+    def __init__(self, title, threshold=TITLE_THRESHOLD):
+        self.matcher = SequenceMatcher(None)
+        self.matcher.set_seq2(title.strip().lower())  # seq2 is the side difflib preprocesses; reuse it
+        self.threshold = threshold
+
+    def __call__(self, other):
+        m = self.matcher
+        m.set_seq1(other)
+        return (
+            m.real_quick_ratio() > self.threshold
+            and m.quick_ratio() > self.threshold
+            and m.ratio() > self.threshold
+        )
+
+def _iou(a_start, a_end, b_start, b_end):
+    inter = min(a_end, b_end) - max(a_start, b_start)
+    if inter <= 0:
+        return 0.0
+    return inter / (max(a_end, b_end) - min(a_start, b_start))
+
+def merge_segments(all_segments, min_iou=None):
+    """Merge near-identical picks, pooling their llm_votes.
+
+    Two picks match when their titles are similar() and either their start and
+    end both lie within MATCH_WINDOW seconds or, with ``min_iou``, their time
+    ranges overlap by at least that IoU. A pick merges into the earliest
+    matching entry. Entries are indexed by start time, so each pick is only
+    compared with entries whose time range could match.
+    """
     consensus_map = []
+    starts, order = [], []  # entry starts kept sorted, with their positions in consensus_map
+    longest = 0.0
 
     for new_seg in all_segments:
+        start, end = float(new_seg["start"]), float(new_seg["end"])
+        if min_iou is None:
+            lo, hi = start - MATCH_WINDOW, start + MATCH_WINDOW
+        else:
+            lo, hi = start - longest, end  # anything starting earlier ends before this one starts
+        i, j = bisect.bisect_left(starts, lo), bisect.bisect_right(starts, hi)
+
         match = None
-        for existing in consensus_map:
-            if (
-                abs(existing["start"] - new_seg["start"]) < 2 and
-                abs(existing["end"] - new_seg["end"]) < 2 and
-                similar(existing["title"], new_seg["title"])
-            ):
+        title_matches = None
+        for pos in sorted(order[i:j]):
+            existing = consensus_map[pos]
+            e_start, e_end = float(existing["start"]), float(existing["end"])
+            if min_iou is None:
+                close = abs(e_start - start) < MATCH_WINDOW and abs(e_end - end) < MATCH_WINDOW
+            else:
+                close = _iou(e_start, e_end, start, end) >= min_iou
+            if not close:
+                continue
+            title_matches = title_matches or _TitleMatcher(new_seg["title"])
+            if title_matches(existing["title"].strip().lower()):
                 existing["llm_votes"].extend(new_seg.get("llm_votes", []))
                 match = existing
                 break
+
         if not match:
+            k = bisect.bisect_right(starts, start)
+            starts.insert(k, start)
+            order.insert(k, len(consensus_map))
             consensus_map.append(new_seg)
+            longest = max(longest, end - start)
+
+    return consensus_map
 
-    voted = [s for s in consensus_map if len(set(s["llm_votes"])) >= 2]
+def _copy_segments(segs):
+    # merging extends llm_votes in place, so work on copies and leave the voters' results intact
+    return [dict(s, llm_votes=list(s.get("llm_votes", []))) for s in segs]
+
+def vote_segments(openai_segs, mistral_segs, *other_segs, min_iou=MATCH_IOU):
+    openai_segs = _copy_segments(openai_segs)
+    all_segments = openai_segs + _copy_segments(mistral_segs)
+    for segs in other_segs:
+        all_segments += _copy_segments(segs)
+    consensus_map = merge_segments(all_segments, min_iou=min_iou)
+
+    voted = [s for s in consensus_map if len(set(s["llm_votes"])) >= MIN_AGREEMENT]
 
     if not voted:
         print("[🧪] No agreement found — falling back to OpenAI top picks.")
@@ -139,22 +207,73 @@ def vote_segments(openai_segs, mistral_segs):  # Gemini commented out for now
 
     return sorted(voted, key=lambda x: -x.get("virality_score", 5))
 
-def get_consensus_segments(transcript, transcript_id="default"):
-    meta_dir = os.path.join(os.path.dirname(__file__), "metadata")
-    os.makedirs(meta_dir, exist_ok=True)
-    cache_path = os.path.join(meta_dir, f"{transcript_id}.consensus.json")
+def _decided(results, target):
+    if len(results) < MIN_AGREEMENT:
+        return False
+    merged = merge_segments(_copy_segments([s for segs in results.values() for s in segs]), min_iou=MATCH_IOU)
+    return sum(1 for s in merged if len(set(s["llm_votes"])) >= MIN_AGREEMENT) >= target
 
-    if os.path.exists(cache_path):
-        print(f"[📄] Using cached consensus for: {transcript_id}")
-        with open(cache_path, "r") as f:
-            return json.load(f)
+def run_panel(transcript, voters=None, target=PANEL_TARGET):
+    """Query every voter at once and return {name: segments} for those that answered in time.
+
+    Each voter has its own deadline. As soon as the answers so far agree on
+    ``target`` segments the vote is settled and the stragglers are dropped.
+    """
+    voters = voters or VOTERS
+    pool = ThreadPoolExecutor(max_workers=len(voters), thread_name_prefix="voter")
+    cancels = {name: threading.Event() for name in voters}
+    started = time.monotonic()
+    futures = {pool.submit(v["query"], transcript, cancel=cancels[name]): name for name, v in voters.items()}
+    pending = set(futures)
+    results = {}
 
-    mistral = query_mistral_local(transcript, f"{transcript_id}.mistral_segments.json")
-    openai = query_openai(transcript)
-    # gemini = []  # query_gemini(transcript)
+    try:
+        while pending:
+            elapsed = time.monotonic() - started
+            for f in [f for f in pending if elapsed >= voters[futures[f]]["deadline"]]:
+                print(f"[⏱️] {futures[f]} missed its {voters[futures[f]]['deadline']:.0f}s deadline — dropped")
+                cancels[futures[f]].set()
+                pending.discard(f)
+            if not pending:
+                break
+
+            timeout = min(voters[futures[f]]["deadline"] for f in pending) - elapsed
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for f in done:
+                pending.discard(f)
+                name = futures[f]
+                try:
+                    results[name] = f.result()
+                except Exception as e:
+                    print(f"[{name} ❌]", e)
+                    results[name] = []
+
+            if pending and _decided(results, target):
+                print(f"[🗳️] Consensus settled — not waiting for: {', '.join(futures[f] for f in pending)}")
+                break
+    finally:
+        # stragglers close their streams at the next line, handing their backend slots to the next panel
+        for event in cancels.values():
+            event.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    return results
+
+def get_consensus_segments(transcript, transcript_id="default", voters=None):
+    voters = voters or VOTERS
+    cache_key = CACHE.key(
+        "consensus", texts=[transcript.strip()], voters=sorted(voters),
+        prompts=[PROMPT_MISTRAL, PROMPT_GPT], target=PANEL_TARGET, min_iou=MATCH_IOU
+    )
+    cached = CACHE.get(cache_key)
+    if cached is not None:
+        print(f"[📄] Using cached consensus for: {transcript_id}")
+        return cached
 
-    consensus = vote_segments(openai, mistral)
+    results = run_panel(transcript, voters)
+    others = [segs for name, segs in results.items() if name not in ("openai", "mistral")]
+    consensus = vote_segments(results.get("openai", []), results.get("mistral", []), *others)
 
-    with open(cache_path, "w") as f:
-        json.dump(consensus, f, indent=2)
+    if any(results.values()):
+        CACHE.put(cache_key, consensus)
     return consensus
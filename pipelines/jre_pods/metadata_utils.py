@@ -1,19 +1,196 @@
 # metadata_utils.py
 
 import os
+import sys
 import json
+import time
+import sqlite3
+import argparse
+import threading
+from contextlib import contextmanager
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
 
-def load_metadata_files(meta_dir):
-    """Load all valid metadata JSON files into structured dicts."""
-    metadata = []
-    for file in os.listdir(meta_dir):
-        if file.endswith(".json"):
-            path = os.path.join(meta_dir, file)
+import tracing
+
+DB_NAME = "metadata.sqlite"  # lives inside the metadata directory it indexes
+BATCH_SIZE = 200  # buffered records per transaction in batch()
+INDEXED = ("source_video", "category", "model_used", "status")
+LEGACY_STATUS = "legacy"  # imported clips with no upload record; set status="ready" to queue one for upload
+
+
+class MetadataStore:
+    """Clip metadata in SQLite, indexed on source_video, category, model_used and status.
+
+    Each record is kept whole as JSON; the indexed fields are copied into
+    columns so filters run in the database instead of over thousands of
+    files. ``migrate()`` imports the legacy one-JSON-per-clip files.
+    """
+
+    def __init__(self, meta_dir):
+        self.meta_dir = meta_dir
+        self.path = os.path.join(meta_dir, DB_NAME)
+        self._local = threading.local()
+        os.makedirs(meta_dir, exist_ok=True)
+        with self._db() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS clips ("
+                "filename TEXT PRIMARY KEY, source_video TEXT, category TEXT, model_used TEXT, "
+                "status TEXT NOT NULL DEFAULT 'ready', updated REAL NOT NULL, data TEXT NOT NULL)"
+            )
+            for column in INDEXED:
+                conn.execute(f"CREATE INDEX IF NOT EXISTS clips_{column} ON clips ({column})")
+
+    @contextmanager
+    def _db(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # --- Writes ---
+    @staticmethod
+    def _row(meta):
+        meta = dict(meta)
+        meta.setdefault("status", "ready")
+        return (
+            meta["filename"], meta.get("source_video"), meta.get("category"), meta.get("model_used"),
+            meta["status"], time.time(), json.dumps(meta)
+        )
+
+    def put_many(self, metas):
+        rows = [self._row(m) for m in metas]
+        if not rows:
+            return 0
+        with tracing.span("metadata.write", rows=len(rows)), self._db() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO clips (filename, source_video, category, model_used, status, updated, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+        return len(rows)
+
+    def put(self, meta):
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None:
+            return self.put_many([meta])
+        buffer.append(meta)
+        if len(buffer) >= BATCH_SIZE:
+            self.put_many(buffer)
+            buffer.clear()
+        return 1
+
+    @contextmanager
+    def batch(self):
+        """Buffer ``put`` calls on this thread and write them in a few transactions."""
+        self._local.buffer = []
+        try:
+            yield self
+        finally:
+            buffer, self._local.buffer = self._local.buffer, None
+            self.put_many(buffer)
+
+    def update(self, filename, **fields):
+        """Merge ``fields`` into one record (e.g. status="uploaded", video_id=...)."""
+        meta = self.get(filename)
+        if meta is None:
+            raise KeyError(filename)
+        meta.update(fields)
+        self.put_many([meta])
+        return meta
+
+    # --- Reads ---
+    def get(self, filename):
+        with self._db() as conn:
+            row = conn.execute("SELECT data FROM clips WHERE filename = ?", (filename,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def query(self, limit=None, **filters):
+        """Records matching every indexed field given, e.g. ``query(source_video="x.mp4", status="ready")``."""
+        unknown = set(filters) - set(INDEXED)
+        if unknown:
+            raise ValueError(f"Not an indexed field: {', '.join(sorted(unknown))}")
+        sql, args = "SELECT data FROM clips", []
+        if filters:
+            sql += " WHERE " + " AND ".join(f"{k} = ?" for k in filters)
+            args.extend(filters.values())
+        sql += " ORDER BY filename"
+        if limit:
+            sql += " LIMIT ?"
+            args.append(limit)
+        with tracing.span("metadata.query", filters=sorted(filters)), self._db() as conn:
+            return [json.loads(data) for (data,) in conn.execute(sql, args)]
+
+    def filenames(self):
+        with self._db() as conn:
+            return {name for (name,) in conn.execute("SELECT filename FROM clips")}
+
+    # --- Migration from per-clip JSON files ---
+    def migrate(self, force=False):
+        """Import ``*.json`` files from the metadata directory that aren't in the store yet."""
+        known = set() if force else self.filenames()
+        imported = []
+        for file in os.listdir(self.meta_dir):
+            if not file.endswith(".json"):
+                continue
+            if file[:-len(".json")] + ".mp4" in known:
+                continue
+            path = os.path.join(self.meta_dir, file)
             try:
                 with open(path, "r") as f:
                     data = json.load(f)
-                    if isinstance(data, dict) and "reason" in data:
-                        metadata.append(data)
             except Exception as e:
                 print(f"[⚠️] Skipping invalid JSON: {file} ({e})")
-    return metadata
+                continue
+            if isinstance(data, dict):
+                data.setdefault("filename", file[:-len(".json")] + ".mp4")
+                data.setdefault("status", legacy_status(data))
+                imported.append(data)
+        if imported:
+            self.put_many(imported)
+            held = sum(1 for m in imported if m["status"] == LEGACY_STATUS)
+            print(f"[📥] Imported {len(imported)} metadata file(s) into {self.path}"
+                  + (f" ({held} held as '{LEGACY_STATUS}', not queued for upload)" if held else ""))
+        return len(imported)
+
+
+def legacy_status(meta):
+    """Status for a pre-database record: the old JSON files never tracked uploads, so only
+    a recorded video_id/uploaded flag proves one and anything else stays out of the upload queue."""
+    if meta.get("video_id") or meta.get("uploaded"):
+        return "uploaded"
+    return LEGACY_STATUS
+
+
+def load_metadata_files(meta_dir):
+    """Load all valid metadata records (those with a "reason") as dicts."""
+    store = MetadataStore(meta_dir)
+    with tracing.span("metadata.migrate"):
+        store.migrate()
+    return [meta for meta in store.query() if "reason" in meta]
+
+
+# --- CLI: python metadata_utils.py META_DIR migrate | query [--source_video ...] ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import or query clip metadata.")
+    parser.add_argument("meta_dir")
+    sub = parser.add_subparsers(dest="command", required=True)
+    mig = sub.add_parser("migrate", help="import legacy per-clip JSON files")
+    mig.add_argument("--force", action="store_true", help="re-import files already in the store")
+    q = sub.add_parser("query", help="print matching records as JSON lines")
+    for column in INDEXED:
+        q.add_argument(f"--{column}", default=None)
+    q.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    store = MetadataStore(args.meta_dir)
+    if args.command == "migrate":
+        print(f"[✅] {store.migrate(force=args.force)} record(s) imported")
+    else:
+        filters = {c: getattr(args, c) for c in INDEXED if getattr(args, c) is not None}
+        for meta in store.query(limit=args.limit, **filters):
+            print(json.dumps(meta))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,29 +1,42 @@
 import os
+import sys
 import json
-import requests
 import datetime
-from typing import List, Dict, Any
+import threading
+from typing import List, Dict, Any, Iterable, Iterator, Optional
 from dotenv import load_dotenv
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+import artifact_cache
+import json_stream
+import llm_client
+import tracing
+import transcript_chunks
 
 load_dotenv()
+CACHE = artifact_cache.default_cache()
 
-OLLAMA_URL = "http://localhost:11434/api/generate"
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+MAX_SEGMENTS = 12  # kept per episode after merging every window's candidates
 
 # --- SETUP ---
 BASE = os.path.dirname(os.path.abspath(__file__))
 FAIL_LOG_DIR = os.path.join(BASE, "fail_logs")
+FAIL_LOG = os.path.join(FAIL_LOG_DIR, "failures.jsonl")  # one JSON record per line
 os.makedirs(FAIL_LOG_DIR, exist_ok=True)
+_fail_lock = threading.Lock()
 
 SEGMENT_PROMPT_TEMPLATE = """
-You are a viral content strategist analyzing the following podcast transcript. Identify 3 to 5 high-virality short-form video segments. For each one, give:
+You are a viral content strategist analyzing the following podcast transcript. Each line starts with its [mm:ss] timestamp. Identify 3 to 5 high-virality short-form video segments. For each one, give:
 - A compelling title
-- Start and end time (in seconds, estimate from transcript if not given)
+- Start and end time in seconds, taken from the [mm:ss] timestamps of the first and last lines used
 - A one-sentence reason for virality
 - Hashtags
 - A target category
 - A 1–2 sentence transcript snippet
 - A viewer comment bait prompt
+- A virality score from 1 to 10
 
 Format your response as a JSON array of objects with this format:
 
@@ -36,7 +49,8 @@ Format your response as a JSON array of objects with this format:
     "snippet": "...",
     "hashtags": ["...", "..."],
     "category": "...",
-    "comment_prompt": "..."
+    "comment_prompt": "...",
+    "virality_score": 8
   }},
   ...
 ]
@@ -47,51 +61,40 @@ Transcript:
 
 # --- LOGGING ---
 def log_failure(model: str, error: str, transcript: str, raw_output: str = None):
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    base_name = f"fail_{model}_{timestamp}"
-    log_path = os.path.join(FAIL_LOG_DIR, f"{base_name}.log")
-
-    with open(log_path, "w", encoding="utf-8") as f:
-        f.write(f"[MODEL]: {model}\n")
-        f.write(f"[ERROR]: {error}\n\n")
-        f.write("[TRANSCRIPT SNIPPET]\n")
-        f.write(transcript[:1000])
-    print(f"[🪵] Logged failure to: {log_path}")
-
+    """Append one failure (plus the raw output, if any) to the shared failures.jsonl."""
+    record = {
+        "time": datetime.datetime.now().isoformat(timespec="seconds"),
+        "model": model,
+        "error": error,
+        "transcript_snippet": transcript[:1000],
+    }
     if raw_output:
-        raw_path = os.path.join(FAIL_LOG_DIR, f"{base_name}_raw.json")
-        with open(raw_path, "w", encoding="utf-8") as f:
-            json.dump({"model": model, "raw": raw_output}, f, indent=2)
-        print(f"[🪵] Saved raw output to: {raw_path}")
+        record["raw"] = raw_output
+    with _fail_lock, open(FAIL_LOG, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    tracing.event("llm.failure", model=model, error=error)
+    print(f"[🪵] Logged {model} failure to: {FAIL_LOG}")
 
 # --- HELPERS ---
 def query_ollama(prompt: str, model: str) -> str:
-    res = requests.post(
-        OLLAMA_URL,
-        json={"model": model, "prompt": prompt, "stream": False},
-        timeout=60
-    )
-    res.raise_for_status()
-    return res.json()["response"]
+    return llm_client.generate_ollama(prompt, model=model)
 
-def query_gpt_fallback(prompt: str) -> str:
-    import openai
-    from openai import OpenAI
+def run_mistral_prompt(prompt: str) -> str:
+    return query_ollama(prompt, model="mistral")
 
+def query_gpt_fallback(prompt: str) -> str:
     if not OPENAI_API_KEY:
         raise EnvironmentError("OPENAI_API_KEY not set in .env")
 
-    client = OpenAI(api_key=OPENAI_API_KEY)
-    response = client.chat.completions.create(
-        model="gpt-4-turbo",
-        messages=[
+    return llm_client.chat_openai(
+        [
             {"role": "system", "content": "You are a viral content strategist."},
             {"role": "user", "content": prompt}
         ],
+        model="gpt-4-turbo",
         temperature=0.7,
         max_tokens=1024
-    )
-    return response.choices[0].message.content.strip()
+    ).strip()
 
 def extract_json_block(text: str) -> List[Dict[str, Any]]:
     try:
@@ -103,18 +106,45 @@ def extract_json_block(text: str) -> List[Dict[str, Any]]:
             json_str = text[start:end]
             return json.loads(json_str)
         except Exception as e:
+            # Truncated or sloppy output: keep every object that did close rather than re-asking another model
+            salvaged = json_stream.parse_array(text)
+            if salvaged:
+                print(f"[🩹] Repaired malformed JSON — kept {len(salvaged)} complete segment(s)")
+                return salvaged
             raise ValueError(f"JSON extraction failed: {e}\nRaw:\n{text[:1000]}")
 
+def stream_segments(chunks: Iterable[str], raw: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+    """Yield segments from a streamed completion as each object closes; text is appended to ``raw``."""
+    parser = json_stream.ArrayParser()
+    for chunk in chunks:
+        if raw is not None:
+            raw.append(chunk)
+        yield from parser.feed(chunk)
+
+def query_ollama_segments(prompt: str, model: str):
+    """Stream one Ollama completion; returns (segments, raw). Truncated output keeps its complete objects."""
+    raw = []
+    segments = list(stream_segments(llm_client.stream_generate_ollama(prompt, model=model), raw))
+    raw = "".join(raw)
+    if not segments:
+        raise ValueError(f"No JSON segments in {model} output\nRaw:\n{raw[:1000]}")
+    return segments, raw
+
 # --- MAIN ENTRY ---
-def generate_segments(transcript: str) -> List[Dict[str, Any]]:
-    prompt = SEGMENT_PROMPT_TEMPLATE.format(transcript=transcript[:8000])
+def generate_window_segments(transcript: str) -> List[Dict[str, Any]]:
+    prompt = SEGMENT_PROMPT_TEMPLATE.format(transcript=transcript)
+    cache_key = CACHE.key("segments", texts=[prompt], chain=["mistral", "llama3", "gpt-4-turbo"])
+    cached = CACHE.get(cache_key)
+    if cached:
+        print("[📄] Loaded cached segments")
+        return cached
+
     segments = []
     model_used = "unknown"
 
     try:
         print("[🤖] Generating with Mistral...")
-        raw = query_ollama(prompt, model="mistral")
-        segments = extract_json_block(raw)
+        segments, raw = query_ollama_segments(prompt, model="mistral")
         model_used = "mistral"
 
     except Exception as mistral_error:
@@ -123,8 +153,7 @@ def generate_segments(transcript: str) -> List[Dict[str, Any]]:
 
         try:
             print("[🦙] Falling back to LLaMA 3...")
-            raw = query_ollama(prompt, model="llama3")
-            segments = extract_json_block(raw)
+            segments, raw = query_ollama_segments(prompt, model="llama3")
             model_used = "llama3"
             log_failure("llama3", "[Used as fallback - no error]", transcript, raw_output=raw)
 
@@ -156,4 +185,20 @@ def generate_segments(transcript: str) -> List[Dict[str, Any]]:
         if model_used != "mistral":
             seg["title"] = f"[FAILED] {seg['title']}"
 
+    # Fallback output stays uncached so the next run gets another shot at the primary model
+    if model_used == "mistral" and segments:
+        CACHE.put(cache_key, segments)
     return segments
+
+def generate_segments(transcript: str, max_workers: int = None) -> List[Dict[str, Any]]:
+    """Segments for the whole transcript: one request per token-budgeted window, merged and ranked."""
+    windows = transcript_chunks.split_windows(transcript)
+    if len(windows) <= 1:
+        return generate_window_segments(transcript)
+    return transcript_chunks.map_reduce(
+        transcript, generate_window_segments, top_n=MAX_SEGMENTS, max_workers=max_workers
+    )
+
+def generate_segments_batch(transcripts: List[str], max_workers: int = None) -> List[Any]:
+    """Fan segment generation out over many transcripts; failed items come back as exceptions."""
+    return llm_client.batch(generate_segments, transcripts, max_workers=max_workers)
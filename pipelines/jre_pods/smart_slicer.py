@@ -1,16 +1,28 @@
 import os
 import json
-import whisper
-from moviepy.editor import VideoFileClip, CompositeVideoClip, ImageClip
-from PIL import Image, ImageDraw, ImageFont
+import queue
+import functools
+import threading
 from dotenv import load_dotenv
 import sys
 sys.path.append(os.path.dirname(__file__))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+import artifact_cache
+import job_ledger
+import metadata_utils
+import render
+import scheduler
+import segment_scoring
+import tracing
+import transcriber
+from transcript_index import TranscriptIndex, format_timestamped, parse_time, transcript_key
 
 from segment_generator_hybrid import generate_segments
 
 # --- SETUP ---
-load_dotenv()
+# Render workers are spawned and re-import this script, so module scope stays free of
+# heavy imports and side effects; directories, .env and the metadata DB are set up in run_slicer()
 BASE = os.path.dirname(os.path.abspath(__file__))
 DIRS = {
     "source": os.path.join(BASE, "harvested_raw"),
@@ -19,10 +31,15 @@ DIRS = {
     "transcripts": os.path.join(BASE, "transcripts"),
 }
 
-for d in DIRS.values():
-    os.makedirs(d, exist_ok=True)
-
 # --- CONFIG ---
+WHISPER_MODEL = "base"
+WHISPER_WORKERS = transcriber.CHUNK_WORKERS  # >1 splits long episodes across processes
+WHISPER_WINDOW = transcriber.CHUNK_WINDOW  # seconds per window in chunked mode
+SEGMENT_WORKERS = 2  # concurrent LLM segment-generation threads
+PRERANK_TOP_K = segment_scoring.TOP_K  # only the best-scoring transcript windows are sent to the LLMs (0 = all)
+CACHE = artifact_cache.default_cache()
+STAGE = "jre_slice"  # job ledger stage name
+
 SUBTITLE_STYLE = {
     "font_path": "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
     "font_size": 42,
@@ -35,70 +52,174 @@ SUBTITLE_STYLE = {
 }
 
 # --- UTILS ---
+@functools.lru_cache(maxsize=None)
+def metadata_store():
+    return metadata_utils.MetadataStore(DIRS["meta"])
+
 def transcribe(path):
+    """Full Whisper result (segments with word timestamps), cached per source."""
     base = os.path.splitext(os.path.basename(path))[0]
-    t_path = os.path.join(DIRS["transcripts"], f"{base}.json")
-    if os.path.exists(t_path):
+    key = transcript_key(path, WHISPER_MODEL, CACHE)
+    cached = CACHE.get(key)
+    if cached is not None:
         print(f"[📄] Loaded cached transcript for: {base}")
-        return json.load(open(t_path))["text"]
+        return cached
 
     print(f"[🎙️] Transcribing {base}...")
-    model = whisper.load_model("base")
-    result = model.transcribe(path)
-    json.dump(result, open(t_path, "w"), indent=2)
-    return result["text"]
+    result = transcriber.transcribe_long(
+        path, model=WHISPER_MODEL, workers=WHISPER_WORKERS, window=WHISPER_WINDOW, word_timestamps=True
+    )
+    CACHE.put(key, result)
+    return result
+
+def resolve_times(index, seg):
+    """Snap the LLM's start/end onto real word/segment boundaries; None if the range has no speech."""
+    start, end = parse_time(seg.get("start")), parse_time(seg.get("end"))
+    if start is None or end is None:
+        return None
+    return index.snap_marked(start, end)
+
+def render_key(source_path, clip):
+    return CACHE.key(
+        "render", files=[source_path], start=clip["start"], end=clip["end"], text=clip["text"],
+        style=SUBTITLE_STYLE, size=render.VERTICAL_RES, preset=render.X264_PRESET, crf=render.X264_CRF
+    )
+
+def already_rendered(source_path, clip):
+    manifest = CACHE.get(render_key(source_path, clip))
+    return (
+        manifest is not None and os.path.exists(clip["out"])
+        and os.path.getsize(clip["out"]) == manifest.get("size")
+    )
+
+def save_metadata(filename, seg, snippet):
+    meta = {
+        "filename": filename,
+        "source_video": seg["source_video"],
+        "start": seg["start"],
+        "end": seg["end"],
+        "title": seg["title"],
+        "reason": seg["reason"],
+        "transcript_snippet": snippet,
+        "category": seg.get("category"),
+        "model_used": seg.get("model_used", "unknown"),
+        "status": "ready",
+    }
+    metadata_store().put(meta)
+
+def save_batch_metadata(future, source_path, clips):
+    if future.cancelled() or future.exception():
+        return
+    with metadata_store().batch():
+        for clip in clips:
+            save_metadata(clip["filename"], clip["segment"], clip["text"])
+            job_ledger.add_clip(clip["out"], source_path)
+            CACHE.put(render_key(source_path, clip), {"out": clip["out"], "size": os.path.getsize(clip["out"])})
+    print(f"[💾] Saved metadata for {len(clips)} clip(s) to {metadata_store().path}")
+
+# --- STAGES ---
+def submit_renders(sched, base, index, segments):
+    """Queue one batch render for a source's segments as soon as its LLM step is done; returns its future."""
+    clips = []
+    for idx, seg in enumerate(segments):
+        times = resolve_times(index, seg)
+        if times is None:
+            print(f"[⚠️] Skipping segment with no speech in range: {seg.get('start')}–{seg.get('end')}")
+            continue
+        seg["source_video"] = f"{base}.mp4"
+        seg["start"], seg["end"] = times
+        snippet = index.text_between(*times)
+        filename = f"{base}_{idx:02d}.mp4"
+        clips.append({
+            "start": seg["start"],
+            "end": seg["end"],
+            "out": os.path.join(DIRS["output"], filename),
+            "text": snippet,
+            "filename": filename,
+            "segment": seg,
+        })
+
+    source_path = os.path.join(DIRS["source"], f"{base}.mp4")
+    pending = [c for c in clips if not already_rendered(source_path, c)]
+    if len(pending) < len(clips):
+        print(f"[📄] {len(clips) - len(pending)} clip(s) from {base} unchanged since last render")
+    if not pending:
+        return None
+
+    print(f"[🎬] Queued {len(pending)} clip(s) from: {base}")
+    future = sched.submit(render.render_batch, source_path, pending, style=SUBTITLE_STYLE, label=base)
+    future.add_done_callback(lambda f, clips=pending: save_batch_metadata(f, source_path, clips))
+    return future
+
+def segment_stage(jobs, sched):
+    """LLM worker: pull transcripts off ``jobs`` until the None sentinel, pushing renders as it goes."""
+    while True:
+        job = jobs.get()
+        if job is None:
+            return
+        base, result = job
+        source_path = os.path.join(DIRS["source"], f"{base}.mp4")
+        print(f"[🧠] Generating segments for: {base}")
+        try:
+            if PRERANK_TOP_K:
+                text = segment_scoring.preranked_transcript(result, source_path, top_k=PRERANK_TOP_K)
+            else:
+                text = format_timestamped(result)
+            segments = generate_segments(text)
+            print(f"[📦] Received {len(segments)} segment(s) for: {base}")
+            future = submit_renders(sched, base, TranscriptIndex(result), segments)
+        except Exception as e:
+            print(f"[⚠️] Skipped {base}: {e}")
+            job_ledger.fail(STAGE, source_path, e)
+            continue
+        job_ledger.settle(STAGE, source_path, [future])
 
 # --- MAIN ---
 def run_slicer():
+    """Stream each source through transcribe -> segment -> render.
+
+    Transcription runs on this thread, LLM calls on SEGMENT_WORKERS threads and
+    renders on the scheduler's process pool, so the next file is transcribed
+    while the previous one is still being segmented and rendered.
+    """
     print("\n[🚀] Smart Slicer MVP\n")
+    load_dotenv()
+    for d in DIRS.values():
+        os.makedirs(d, exist_ok=True)
     files = [f for f in os.listdir(DIRS["source"]) if f.endswith(".mp4")]
     print(f"[📁] Found {len(files)} file(s)")
+    todo = job_ledger.pending(STAGE, [os.path.join(DIRS["source"], f) for f in files], model=WHISPER_MODEL)
 
-    transcript_map = {}
-    all_segments = []
+    # Bounded so transcription can't run arbitrarily far ahead of the LLM stage
+    jobs = queue.Queue(maxsize=SEGMENT_WORKERS * 2)
 
-    for f in files:
-        path = os.path.join(DIRS["source"], f)
-        base = os.path.splitext(f)[0]
-        transcript = transcribe(path)
-        transcript_map[base] = transcript
+    with scheduler.RenderScheduler() as sched:
+        workers = [
+            threading.Thread(target=segment_stage, args=(jobs, sched), name=f"segment-{i}", daemon=True)
+            for i in range(SEGMENT_WORKERS)
+        ]
+        for t in workers:
+            t.start()
 
-        print(f"[🧠] Generating segments for: {base}")
-        try:
-            segments = generate_segments(transcript)
-            for seg in segments:
-                seg["source_video"] = f"{base}.mp4"
-            all_segments.extend(segments)
-            print(f"[📦] Received {len(segments)} segment(s)\n")
-        except Exception as e:
-            print(f"[⚠️] Skipped {base}: {e}")
+        for path in todo:
+            base = os.path.splitext(os.path.basename(path))[0]
+            job_ledger.start(STAGE, path, model=WHISPER_MODEL)
+            try:
+                jobs.put((base, transcribe(path)))
+            except KeyboardInterrupt:
+                job_ledger.release(STAGE, path)
+                raise
+            except Exception as e:
+                print(f"[⚠️] Transcription failed for {base}: {e}")
+                job_ledger.fail(STAGE, path, e)
 
-    for idx, seg in enumerate(all_segments):
-        src_base = seg["source_video"].replace(".mp4", "")
-        source_path = os.path.join(DIRS["source"], seg["source_video"])
-        transcript_text = transcript_map.get(src_base, "")
-        snippet = transcript_text[seg["start"]:seg["end"]]
-
-        filename = f"{src_base}_{idx:02d}.mp4"
-        out_path = os.path.join(DIRS["output"], filename)
-
-        print(f"[🎬] Rendering: {filename}")
-        if burn_subtitles(source_path, out_path, seg["start"], seg["end"], snippet):
-            meta = {
-                "filename": filename,
-                "source_video": seg["source_video"],
-                "start": seg["start"],
-                "end": seg["end"],
-                "title": seg["title"],
-                "reason": seg["reason"],
-                "transcript_snippet": snippet,
-                "model_used": seg.get("model_used", "unknown")
-            }
-            meta_path = os.path.join(DIRS["meta"], filename.replace(".mp4", ".json"))
-            json.dump(meta, open(meta_path, "w"), indent=2)
-            print(f"[💾] Saved metadata: {meta_path}")
+        for _ in workers:
+            jobs.put(None)
+        for t in workers:
+            t.join()
 
     print("\n[✅] Slicer MVP complete.")
 
 if __name__ == "__main__":
+    tracing.init()
     run_slicer()
@@ -0,0 +1,135 @@
+import os
+import re
+import sys
+from typing import Any, Callable, Dict, List, Optional
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+import llm_client
+from transcript_index import parse_time
+
+# --- CONFIG ---
+WINDOW_TOKENS = int(os.getenv("SEGMENT_WINDOW_TOKENS", "3000"))  # transcript tokens per request, prompt excluded
+OVERLAP_TOKENS = int(os.getenv("SEGMENT_OVERLAP_TOKENS", "300"))  # so a story split at a boundary is whole in one window
+ENCODING = "cl100k_base"
+DEDUPE_IOU = 0.5  # candidates overlapping more than this (in time) are the same clip
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_encoder = None
+
+
+# --- Token counting ---
+def count_tokens(text: str) -> int:
+    global _encoder
+    if _encoder is None:
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding(ENCODING)
+        except ImportError:
+            _encoder = False
+    if _encoder is False:
+        return len(text) // 4 + 1  # rough English average when tiktoken isn't installed
+    return len(_encoder.encode(text, disallowed_special=()))
+
+def _units(transcript: str) -> List[str]:
+    # Timestamped transcripts are one line per segment; plain Whisper text is one long line, so split sentences
+    units = []
+    for line in transcript.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if count_tokens(line) > WINDOW_TOKENS // 4:
+            units.extend(s for s in _SENTENCE_END.split(line) if s)
+        else:
+            units.append(line)
+    return units
+
+
+# --- Map: overlapping token-budgeted windows ---
+def split_windows(transcript: str, max_tokens: int = WINDOW_TOKENS, overlap_tokens: int = OVERLAP_TOKENS) -> List[str]:
+    """Split ``transcript`` into windows of whole lines/sentences, each within ``max_tokens``.
+
+    Consecutive windows share roughly ``overlap_tokens`` of text. A single
+    unit larger than the budget still gets a window of its own.
+    """
+    units = _units(transcript)
+    sizes = [count_tokens(u) for u in units]
+    windows = []
+    i = 0
+    while i < len(units):
+        j, total = i, 0
+        while j < len(units) and (j == i or total + sizes[j] <= max_tokens):
+            total += sizes[j]
+            j += 1
+        windows.append("\n".join(units[i:j]))
+        if j == len(units):
+            break
+        # step back over the tail of this window to seed the next one
+        k, back = j, 0
+        while k - 1 > i and back + sizes[k - 1] <= overlap_tokens:
+            k -= 1
+            back += sizes[k]
+        i = k
+    return windows
+
+
+# --- Reduce: rank and dedupe across the episode ---
+def _interval(seg: Dict[str, Any]):
+    # same parsing as the renderer, so "mm:ss" picks from the timestamped prompt survive the reduce
+    start, end = parse_time(seg.get("start", 0)), parse_time(seg.get("end", 0))
+    if start is None or end is None:
+        return None
+    return (start, end) if end > start else None
+
+def _iou(a, b) -> float:
+    inter = min(a[1], b[1]) - max(a[0], b[0])
+    if inter <= 0:
+        return 0.0
+    return inter / (max(a[1], b[1]) - min(a[0], b[0]))
+
+def _score(seg: Dict[str, Any], key: str) -> float:
+    try:
+        return float(seg.get(key) or 5)
+    except (TypeError, ValueError):
+        return 5.0
+
+def reduce_segments(segments: List[Dict[str, Any]], top_n: Optional[int] = None, iou: float = DEDUPE_IOU,
+                    score_key: str = "virality_score", windows: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+    """Best-first: keep each candidate unless it overlaps an already kept one by more than ``iou``.
+
+    ``windows`` gives the window each candidate came from. Equal scores (and
+    missing ones, which count as 5) are taken round-robin across windows in
+    each window's own order, so no part of the episode is favoured.
+    """
+    windows = windows or [0] * len(segments)
+    rank, seen = [], {}
+    for w in windows:
+        rank.append(seen.get(w, 0))
+        seen[w] = rank[-1] + 1
+    order = sorted(range(len(segments)), key=lambda k: (-_score(segments[k], score_key), rank[k], windows[k]))
+    kept, spans = [], []
+    for seg in (segments[k] for k in order):
+        span = _interval(seg)
+        if span is None:
+            continue
+        if any(_iou(span, other) > iou for other in spans):
+            continue
+        kept.append(seg)
+        spans.append(span)
+        if top_n and len(kept) >= top_n:
+            break
+    return kept
+
+def map_reduce(transcript: str, generate: Callable[[str], List[Dict[str, Any]]], top_n: Optional[int] = None,
+               max_workers: Optional[int] = None, **window_opts) -> List[Dict[str, Any]]:
+    """Run ``generate`` on every window in parallel and merge the candidates into one ranked list."""
+    windows = split_windows(transcript, **window_opts)
+    print(f"[🧩] {len(windows)} transcript window(s) → generating candidates in parallel")
+    candidates, origins = [], []
+    for idx, result in enumerate(llm_client.batch(generate, windows, max_workers=max_workers)):
+        if isinstance(result, Exception):
+            print(f"[⚠️] Window {idx + 1}/{len(windows)} failed: {result}")
+            continue
+        candidates.extend(result or [])
+        origins.extend([idx] * len(result or []))
+    return reduce_segments(candidates, top_n=top_n, windows=origins)
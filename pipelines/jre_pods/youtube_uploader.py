@@ -1,10 +1,17 @@
 import os
 import json
 import random
+import sys
 import time
 from googleapiclient.discovery import build
 from googleapiclient.http import MediaFileUpload
 from oauth2client import file, client, tools
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+import tracing
+
+from metadata_utils import MetadataStore
 
 # --- CONFIG ---
 UPLOAD_DIR = os.path.join(os.path.dirname(__file__), "shorts_ready")
@@ -44,10 +51,8 @@ def generate_engagement_comment(title, reason=""):
     return random.choice(prompts)(title.strip(), reason.strip())
 
 # --- Upload the video ---
-def upload_video(youtube, video_path, meta_path):
-    with open(meta_path, "r") as f:
-        meta = json.load(f)
-
+@tracing.traced("upload")
+def upload_video(youtube, video_path, meta):
     title = meta["title"]
     description = f"{meta.get('reason', '')}\n\nSubscribe for more 💀🔥\n{' '.join(random.sample(HASHTAGS, 5))}"
     tags = random.sample(HASHTAGS, 7)
@@ -90,34 +95,42 @@ def upload_video(youtube, video_path, meta_path):
         }
     ).execute()
     print(f"[💬] Comment posted: {comment}")
+    return video_id
 
 # --- Main uploader routine ---
 def main():
     youtube = get_authenticated_service()
+    store = MetadataStore(META_DIR)
+    store.migrate()
 
     videos = [f for f in os.listdir(UPLOAD_DIR) if f.endswith(".mp4")]
     if not videos:
         print("[⚠️] No videos found.")
         return
 
+    # One indexed query instead of an exists() + open() per video
+    ready = {meta["filename"]: meta for meta in store.query(status="ready")}
+
     random.shuffle(videos)
     for video_file in videos:
         video_path = os.path.join(UPLOAD_DIR, video_file)
-        meta_file = os.path.join(META_DIR, video_file.replace(".mp4", ".json"))
+        meta = ready.get(video_file)
 
-        if not os.path.exists(meta_file):
-            print(f"[!] Missing metadata for {video_file}. Skipping.")
+        if meta is None:
+            print(f"[!] No pending metadata for {video_file}. Skipping.")
             continue
 
         try:
-            upload_video(youtube, video_path, meta_file)
+            video_id = upload_video(youtube, video_path, meta)
         except Exception as e:
             print(f"[❌] Failed to upload {video_file}: {e}")
             continue
+        store.update(video_file, status="uploaded", video_id=video_id)
 
         wait = random.randint(300, 600)
         print(f"[⏱️] Waiting {wait//60} min before next upload...")
         time.sleep(wait)
 
 if __name__ == "__main__":
+    tracing.init()
     main()
@@ -0,0 +1,215 @@
+import os
+import bisect
+import tempfile
+import textwrap
+import subprocess
+
+import media_info
+import tracing
+
+# --- CONFIG ---
+VERTICAL_RES = (1080, 1920)  # width x height
+X264_PRESET = os.getenv("X264_PRESET", "veryfast")  # software x264, same output on every box
+X264_CRF = int(os.getenv("X264_CRF", "23"))
+AUDIO_BITRATE = "128k"
+BATCH_MAX_GAP = 120.0  # seconds; clips closer than this share one decode, farther ones get their own seek
+SUBTITLE_WRAP = 28  # characters per burned-in subtitle line
+KEYFRAME_TOLERANCE = 0.5  # seconds a cut may move to land on a keyframe and stream-copy instead
+X264_PROFILES = {  # ffprobe's H.264 profile names -> libx264 -profile:v
+    "Constrained Baseline": "baseline", "Baseline": "baseline", "Main": "main", "High": "high",
+    "High 10": "high10", "High 4:2:2": "high422", "High 4:4:4 Predictive": "high444",
+}
+
+
+# --- ffmpeg helpers ---
+def run_ffmpeg(args):
+    cmd = ["ffmpeg", "-nostdin", "-hide_banner", "-v", "error", "-y"] + args
+    result = subprocess.run(cmd, capture_output=True)
+    if result.returncode != 0:
+        err = result.stderr.decode(errors="ignore").strip().splitlines()
+        raise RuntimeError(f"ffmpeg exited {result.returncode}: {err[-1] if err else 'no output'}")
+
+def vertical_filter(size=VERTICAL_RES):
+    """Centre crop to the target aspect over the full height (whole width if narrower), then scale.
+
+    Mirrors slicer.crop_to_vertical, but runs inside ffmpeg instead of per frame in Python.
+    """
+    w, h = size
+    return f"crop='min(iw,trunc(ih*{w}/{h}/2)*2)':ih:'(iw-ow)/2':0,scale={w}:{h},setsar=1"
+
+def _rgb(color):
+    return "0x{:02X}{:02X}{:02X}".format(*color)
+
+def subtitle_filter(textfile, style):
+    """drawtext filter for the pipeline's SUBTITLE_STYLE dict, reading the text from ``textfile``."""
+    pad = style.get("padding", 20)
+    args = [
+        f"textfile='{textfile}'",
+        f"fontsize={style.get('font_size', 42)}",
+        f"fontcolor={_rgb(style.get('font_color', (255, 255, 255)))}",
+        f"borderw={style.get('stroke_width', 2)}",
+        f"bordercolor={_rgb(style.get('stroke_color', (0, 0, 0)))}",
+        "x=(w-text_w)/2",
+        "y=h-text_h-h/6",  # keep clear of the Shorts UI at the bottom
+    ]
+    if style.get("font_path") and os.path.exists(style["font_path"]):
+        args.insert(0, f"fontfile='{style['font_path']}'")
+    if style.get("bg_color"):
+        args += ["box=1", f"boxcolor={_rgb(style['bg_color'])}@0.5", f"boxborderw={pad}"]
+    return "drawtext=" + ":".join(args)
+
+def encode_args(preset=X264_PRESET, crf=X264_CRF):
+    return [
+        "-c:v", "libx264", "-preset", preset, "-crf", str(crf), "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-b:a", AUDIO_BITRATE, "-movflags", "+faststart"
+    ]
+
+
+# --- Renderers ---
+def group_clips(clips, max_gap=BATCH_MAX_GAP):
+    """Sort clips by start and group them into runs that are worth decoding in one pass."""
+    runs = []
+    for clip in sorted(clips, key=lambda c: c["start"]):
+        if runs and clip["start"] - max(c["end"] for c in runs[-1]) <= max_gap:
+            runs[-1].append(clip)
+        else:
+            runs.append([clip])
+    return runs
+
+def _render_run(src, run, size, style, audio, tmpdir):
+    first = run[0]["start"]
+    span = max(c["end"] for c in run) - first
+    graph = [f"[0:v]split={len(run)}" + "".join(f"[s{i}]" for i in range(len(run)))]
+    if audio:
+        graph.append(f"[0:a]asplit={len(run)}" + "".join(f"[t{i}]" for i in range(len(run))))
+
+    outputs = []
+    for i, clip in enumerate(run):
+        # input seek resets timestamps to 0 at ``first``, so trims are relative to it
+        a, b = clip["start"] - first, clip["end"] - first
+        video = f"[s{i}]trim=start={a:.3f}:end={b:.3f},setpts=PTS-STARTPTS,{vertical_filter(size)}"
+        if clip.get("text") and style is not None:
+            textfile = os.path.join(tmpdir, f"sub{i}.txt")
+            with open(textfile, "w", encoding="utf-8") as f:
+                f.write(textwrap.fill(clip["text"].strip(), SUBTITLE_WRAP))
+            video += "," + subtitle_filter(textfile, style)
+        graph.append(video + f"[v{i}]")
+        outputs += ["-map", f"[v{i}]"]
+        if audio:
+            graph.append(f"[t{i}]atrim=start={a:.3f}:end={b:.3f},asetpts=PTS-STARTPTS[a{i}]")
+            outputs += ["-map", f"[a{i}]"]
+        outputs += [*encode_args(), clip["out"]]
+
+    run_ffmpeg([
+        "-ss", f"{first:.3f}", "-t", f"{span:.3f}", "-i", src,
+        "-filter_complex", ";".join(graph),
+        *outputs
+    ])
+
+def render_batch(src, clips, size=VERTICAL_RES, style=None, max_gap=BATCH_MAX_GAP):
+    """Render every clip of one source, decoding each run of nearby clips once and fanning it out.
+
+    ``clips`` are dicts with ``start``, ``end`` and ``out`` (plus optional ``text``
+    burned in with ``style``). Returns the output paths that were written.
+    """
+    audio = media_info.probe(src).has_audio
+    done = []
+    with tempfile.TemporaryDirectory(prefix="render_") as tmpdir:
+        for run in group_clips(clips, max_gap):
+            print(f"[*] Rendering {len(run)} clip(s) from one decode of {os.path.basename(src)}")
+            with tracing.span("render.batch", clips=len(run)):
+                _render_run(src, run, size, style, audio, tmpdir)
+            done.extend(c["out"] for c in run)
+    return done
+
+
+# --- Keyframe-aware cutting: stream-copy where possible, re-encode only the GOP head ---
+def _copy_args(start):
+    # seek just past the keyframe so the demuxer lands exactly on it
+    return ["-ss", f"{start + 0.001:.6f}"]
+
+def _matching_head_args(info):
+    """libx264 settings that reproduce the source's profile, level, refs and pix_fmt, or None if they can't.
+
+    The joined MP4 keeps a single avcC, taken from the head, so the head's SPS
+    must describe the copied tail as well.
+    """
+    profile = X264_PROFILES.get(info.profile)
+    if profile is None or not info.pix_fmt or info.level < 10:
+        return None
+    args = ["-profile:v", profile, "-level:v", f"{info.level / 10:.1f}", "-pix_fmt", info.pix_fmt]
+    if info.refs:
+        args += ["-refs", str(info.refs)]
+    return args
+
+def _encode_cut(src, dst, start, end):
+    run_ffmpeg([
+        "-ss", f"{start:.3f}", "-i", src, "-t", f"{end - start:.3f}",
+        "-map", "0:v:0", "-map", "0:a:0?", *encode_args(), dst
+    ])
+    return dst
+
+@tracing.traced("render.cut")
+def cut_clip(src, dst, start, end, tolerance=KEYFRAME_TOLERANCE):
+    """Cut [start, end] out of ``src`` without cropping, re-encoding as little as possible.
+
+    If a keyframe lies within ``tolerance`` of ``start`` the whole clip is
+    stream-copied from it. Otherwise only the head up to the next keyframe is
+    re-encoded and joined to a stream-copied tail, with the audio cut on the
+    exact range. Non-H.264 sources, and H.264 whose profile/level the head
+    encode can't reproduce, fall back to a full frame-accurate encode.
+    """
+    info = media_info.probe(src)
+    keyframes = media_info.keyframes(src)
+    i = bisect.bisect_left(keyframes, start)
+    prev_kf = keyframes[i - 1] if i > 0 else None
+    next_kf = keyframes[i] if i < len(keyframes) else None
+
+    if prev_kf is not None and start - prev_kf <= tolerance:
+        snap = prev_kf
+    elif next_kf is not None and next_kf - start <= tolerance:
+        snap = next_kf
+    else:
+        snap = None
+
+    if snap is not None:
+        run_ffmpeg([
+            *_copy_args(snap), "-i", src, "-t", f"{end - snap:.3f}",
+            "-map", "0:v:0", "-map", "0:a:0?", "-c", "copy", "-avoid_negative_ts", "make_zero", dst
+        ])
+        return dst
+
+    head_args = _matching_head_args(info) if info.codec == "h264" else None
+    if head_args is None or next_kf is None or next_kf >= end:
+        return _encode_cut(src, dst, start, end)
+
+    with tempfile.TemporaryDirectory(prefix="cut_") as tmpdir:
+        head = os.path.join(tmpdir, "head.ts")
+        tail = os.path.join(tmpdir, "tail.ts")
+        listing = os.path.join(tmpdir, "parts.txt")
+
+        # Annex-B transport streams carry their own SPS/PPS, so the two parts concat cleanly
+        try:
+            run_ffmpeg([
+                "-ss", f"{start:.3f}", "-i", src, "-t", f"{next_kf - start:.3f}", "-map", "0:v:0", "-an",
+                "-c:v", "libx264", "-preset", X264_PRESET, "-crf", str(X264_CRF), *head_args,
+                "-r", info.frame_rate or "30",
+                "-bsf:v", "h264_mp4toannexb", "-f", "mpegts", head
+            ])
+        except RuntimeError:
+            # this libx264 build can't produce the source's profile (e.g. no 10-bit support)
+            return _encode_cut(src, dst, start, end)
+        run_ffmpeg([
+            *_copy_args(next_kf), "-i", src, "-t", f"{end - next_kf:.3f}", "-map", "0:v:0", "-an",
+            "-c:v", "copy", "-bsf:v", "h264_mp4toannexb", "-f", "mpegts", tail
+        ])
+        with open(listing, "w") as f:
+            f.write(f"file '{head}'\nfile '{tail}'\n")
+
+        run_ffmpeg([
+            "-f", "concat", "-safe", "0", "-i", listing,
+            "-ss", f"{start:.3f}", "-t", f"{end - start:.3f}", "-i", src,
+            "-map", "0:v:0", "-map", "1:a:0?", "-c:v", "copy",
+            "-c:a", "aac", "-b:a", AUDIO_BITRATE, "-movflags", "+faststart", "-shortest", dst
+        ])
+    return dst
@@ -0,0 +1,148 @@
+import os
+import time
+import signal
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor, wait
+
+import tracing
+
+# --- CONFIG ---
+CPU_COUNT = os.cpu_count() or 1
+MAX_WORKERS = int(os.getenv("RENDER_WORKERS", CPU_COUNT))
+MAX_ENCODES = int(os.getenv("RENDER_MAX_ENCODES", max(1, CPU_COUNT // 4)))  # x264 already threads internally
+MAX_READERS = int(os.getenv("RENDER_MAX_READERS", 4))  # stream copies / probes hitting the same disk
+
+ENCODE = "encode"
+READ = "read"
+
+
+# --- Worker side ---
+def _init_worker():
+    # Ctrl-C is handled once, in the parent, which cancels what hasn't started
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def _run_job(kind, fn, args, kwargs):
+    try:
+        started = time.time()
+        with tracing.span(f"job.{kind}", fn=getattr(fn, "__name__", "job")):
+            result = fn(*args, **kwargs)
+        return result, time.time() - started
+    finally:
+        tracing.flush()  # pool workers can be torn down without running exit hooks
+
+
+# --- Scheduler ---
+class RenderScheduler:
+    """Process pool for render/cut jobs with separate caps on concurrent encodes and disk readers.
+
+    Use as a context manager: ``submit`` returns a Future for the job's result,
+    per-job progress is printed as jobs finish, leaving the block waits for
+    everything, and Ctrl-C cancels pending jobs before shutting the pool down.
+
+    The caps are enforced here in the parent: a job is handed to the pool only
+    once its kind has a free slot, so workers never sit blocked on a slot while
+    jobs of the other kind wait behind them.
+    """
+
+    def __init__(self, workers=MAX_WORKERS, max_encodes=MAX_ENCODES, max_readers=MAX_READERS):
+        self.workers = workers
+        self.max_encodes = max_encodes
+        self.max_readers = max_readers
+        self._pool = None
+        self._futures = []
+        self._lock = threading.Lock()
+        self._slots = {ENCODE: threading.Semaphore(max_encodes), READ: threading.Semaphore(max_readers)}
+        self._queued = {ENCODE: deque(), READ: deque()}
+        self._stopping = False
+        self._done = 0
+        self._failed = 0
+
+    def __enter__(self):
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"), initializer=_init_worker
+        )
+        print(f"[*] Render scheduler: {self.workers} worker(s), "
+              f"{self.max_encodes} encode slot(s), {self.max_readers} reader slot(s)")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is KeyboardInterrupt:
+            self._interrupt()
+            return False
+        try:
+            self.join()
+        except KeyboardInterrupt:
+            self._interrupt()
+            raise
+        self._pool.shutdown(wait=True)
+        return False
+
+    def _interrupt(self):
+        pending = sum(1 for f in self._futures if not f.done())
+        print(f"\n[!] Interrupted — cancelling {pending} unfinished job(s)...")
+        with self._lock:
+            self._stopping = True
+            for queued in self._queued.values():
+                queued.clear()
+        for f in self._futures:
+            if f.cancel():
+                f.set_running_or_notify_cancel()  # so wait() sees it as done
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+    def _dispatch(self, kind):
+        """Hand queued jobs of ``kind`` to the pool while it has free slots."""
+        slot = self._slots[kind]
+        while slot.acquire(blocking=False):
+            with self._lock:
+                job = self._queued[kind].popleft() if self._queued[kind] and not self._stopping else None
+            if job is None:
+                slot.release()
+                return
+            outer, call, finished = job
+            if not outer.set_running_or_notify_cancel():
+                slot.release()  # cancelled while it waited for a slot
+                continue
+            try:
+                inner = self._pool.submit(_run_job, kind, *call)
+            except Exception as e:  # pool already shut down or broken
+                slot.release()
+                outer.set_exception(e)
+                continue
+            inner.add_done_callback(finished)
+
+    def submit(self, fn, *args, kind=ENCODE, label=None, **kwargs):
+        label = label or getattr(fn, "__name__", "job")
+        outer = Future()
+
+        def _finished(f):
+            self._slots[kind].release()
+            self._dispatch(kind)
+            if f.cancelled():  # dropped from the pool's queue on shutdown
+                outer.set_exception(CancelledError())
+                return
+            with self._lock:
+                self._done += 1
+                total = len(self._futures)
+                err = f.exception()
+                if err is not None:
+                    self._failed += 1
+                    print(f"[!] [{self._done}/{total}] {label} failed: {err}")
+                else:
+                    print(f"[+] [{self._done}/{total}] {label} ({f.result()[1]:.1f}s)")
+            if err is not None:
+                outer.set_exception(err)
+            else:
+                outer.set_result(f.result()[0])
+
+        with self._lock:
+            self._futures.append(outer)
+            self._queued[kind].append((outer, (fn, args, kwargs), _finished))
+        self._dispatch(kind)
+        return outer
+
+    def join(self):
+        """Block until every submitted job has finished; returns (succeeded, failed) counts."""
+        wait(self._futures)
+        return self._done - self._failed, self._failed
@@ -0,0 +1,283 @@
+import os
+import bisect
+from collections import deque
+
+import numpy as np
+
+import signals
+from transcript_index import format_timestamped
+
+# --- CONFIG ---
+HOT_KEYWORDS = [
+    "insane", "crazy", "truth", "money", "nobody", "illegal",
+    "wtf", "he said", "she did", "they don't want you", "you won't believe"
+]
+# (category, keywords) in priority order: the first category present wins, as in classify_text
+CATEGORY_KEYWORDS = [
+    ("podcast", ["podcast", "interview"]),
+    ("reaction", ["meme", "sound"]),
+    ("finance", ["money", "redpill"]),
+    ("fitness", ["gym", "lift"]),
+]
+DEFAULT_CATEGORY = "general"
+CLIP_MIN_LEN = 8
+CLIP_MAX_LEN = 30
+WINDOW_SECONDS = 60
+WINDOW_STEP = 30
+TOP_K = int(os.getenv("PRERANK_TOP_K", "12"))  # windows per episode that go on to the LLMs
+WEIGHTS = {
+    "keywords": 1.0,  # hot keyword hits per 100 words
+    "speech_rate": 0.5,  # words per second of speech
+    "loudness": 0.5,  # mean RMS level, dBFS
+    "exclamations": 0.5,  # "!" and "?" per 100 words
+}
+
+
+# --- Aho-Corasick: every keyword and category in one pass over the text ---
+class KeywordAutomaton:
+    """Character-level Aho-Corasick matcher; ``find`` reports (end_index, label) for every occurrence."""
+
+    def __init__(self, patterns):
+        # patterns: {keyword: [label, ...]}; substring semantics, same as ``kw in text``
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        for word, labels in patterns.items():
+            node = 0
+            for ch in word:
+                if ch not in self.goto[node]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                    self.goto[node][ch] = len(self.goto) - 1
+                node = self.goto[node][ch]
+            self.out[node].extend(labels)
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self.goto[node].items():
+                queue.append(child)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[child] = self.goto[f].get(ch, 0)
+                self.out[child] = self.out[child] + self.out[self.fail[child]]
+
+    def find(self, text):
+        goto, fail, out = self.goto, self.fail, self.out
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for label in out[node]:
+                yield i, label
+
+def _build_automaton():
+    patterns = {}
+    for kw in HOT_KEYWORDS:
+        patterns.setdefault(kw, []).append("hot")
+    for category, keywords in CATEGORY_KEYWORDS:
+        for kw in keywords:
+            patterns.setdefault(kw, []).append(category)
+    return KeywordAutomaton(patterns)
+
+LABELS = ["hot"] + [category for category, _ in CATEGORY_KEYWORDS]
+_automaton = None
+
+def automaton():
+    global _automaton
+    if _automaton is None:
+        _automaton = _build_automaton()
+    return _automaton
+
+def label_counts(texts):
+    """(len(texts), len(LABELS)) array of keyword hits per text, from a single automaton pass."""
+    counts = np.zeros((len(texts), len(LABELS)), dtype=np.int32)
+    if not texts:
+        return counts
+    joined = "\n".join(t.lower() for t in texts)  # newline never occurs in a keyword, so no match spans two texts
+    bounds = np.cumsum([len(t) + 1 for t in texts])
+    col = {label: k for k, label in enumerate(LABELS)}
+    for end, label in automaton().find(joined):
+        counts[bisect.bisect_right(bounds, end), col[label]] += 1
+    return counts
+
+def word_label_counts(words):
+    """(len(words), len(LABELS)) hits for a run of transcript words read as one space-joined text.
+
+    Multi-word keywords ("he said") match across word boundaries; each hit is
+    counted on the word where it ends.
+    """
+    counts = np.zeros((len(words), len(LABELS)), dtype=np.int32)
+    if not words:
+        return counts
+    tokens = [w.strip().lower() for w in words]
+    offsets = np.cumsum([0] + [len(t) + 1 for t in tokens[:-1]])  # char offset where each word starts
+    col = {label: k for k, label in enumerate(LABELS)}
+    for end, label in automaton().find(" ".join(tokens)):
+        counts[bisect.bisect_right(offsets, end) - 1, col[label]] += 1
+    return counts
+
+def classify_counts(counts):
+    for k, (category, _) in enumerate(CATEGORY_KEYWORDS, start=1):
+        if counts[k]:
+            return category
+    return DEFAULT_CATEGORY
+
+def classify_text(text):
+    return classify_counts(label_counts([text])[0])
+
+
+# --- Hot clip detection: best 8-30s windows over word boundaries ---
+def _words(result):
+    segments = result.get("segments", [])
+    words = [w for seg in segments for w in seg.get("words", [])]
+    if not words:
+        words = [{"word": seg["text"], "start": seg["start"], "end": seg["end"]} for seg in segments]
+    return sorted(words, key=lambda w: w["start"])
+
+def find_hot_windows(result, min_len=CLIP_MIN_LEN, max_len=CLIP_MAX_LEN, min_hits=1, max_clips=None):
+    """Non-overlapping word-aligned windows of ``min_len``-``max_len`` seconds with the most hot keywords.
+
+    Every (first word, last word) window within the length limits is scored
+    as hits / sqrt(duration) from prefix sums, so short dense moments and
+    longer runs of hits both compete; the best are taken greedily.
+    """
+    words = _words(result)
+    if not words:
+        return []
+    texts = [w.get("word", "") for w in words]
+    starts = np.array([w["start"] for w in words], dtype=np.float64)
+    ends = np.array([w["end"] for w in words], dtype=np.float64)
+    counts = word_label_counts(texts)
+    csum = np.vstack([np.zeros((1, len(LABELS)), dtype=np.int64), np.cumsum(counts, axis=0)])
+    hot = csum[:, 0]
+
+    # window [i, j): words i..j-1, duration ends[j-1] - starts[i]
+    n = len(words)
+    idx = np.arange(n)
+    j_lo = np.searchsorted(ends, starts + min_len, side="left") + 1
+    j_hi = np.searchsorted(ends, starts + max_len, side="right")
+    best_score = np.full(n, -np.inf)
+    best_j = np.zeros(n, dtype=np.int64)
+    max_span = int(np.max(j_hi - idx, initial=0))
+    for span in range(1, max_span + 1):
+        j = idx + span
+        ok = (j >= j_lo) & (j <= j_hi) & (j <= n)
+        if not ok.any():
+            continue
+        jj = np.minimum(j, n)
+        hits = hot[jj] - hot[idx]
+        score = np.where(ok & (hits >= min_hits), hits / np.sqrt(np.maximum(ends[jj - 1] - starts, 1e-6)), -np.inf)
+        better = score > best_score
+        best_score[better] = score[better]
+        best_j[better] = jj[better]
+
+    chosen_starts, chosen_ends, clips = [], [], []
+    for i in np.argsort(-best_score, kind="stable"):
+        if not np.isfinite(best_score[i]) or (max_clips and len(clips) >= max_clips):
+            break
+        start, end = starts[i], ends[best_j[i] - 1]
+        k = bisect.bisect_left(chosen_starts, start)
+        if (k < len(chosen_starts) and chosen_starts[k] < end) or (k and chosen_ends[k - 1] > start):
+            continue
+        chosen_starts.insert(k, start)
+        chosen_ends.insert(k, end)
+        window_counts = csum[best_j[i]] - csum[i]
+        clips.append({
+            "start": float(start),
+            "end": float(end),
+            "duration": float(end - start),
+            "text": "".join(texts[i:best_j[i]]).strip(),
+            "hits": int(window_counts[0]),
+            "classification": classify_counts(window_counts),
+        })
+    return sorted(clips, key=lambda c: c["start"])
+
+
+# --- Window features ---
+def _segment_features(segments):
+    texts = [seg["text"].lower() for seg in segments]
+    words = np.array([len(t.split()) for t in texts], dtype=np.float64)
+    hits = label_counts(texts)[:, 0].astype(np.float64)
+    marks = np.array([t.count("!") + t.count("?") for t in texts], dtype=np.float64)
+    spoken = np.array([seg["end"] - seg["start"] for seg in segments], dtype=np.float64)
+    return words, hits, marks, spoken
+
+def _window_sums(values, lo, hi):
+    csum = np.concatenate(([0.0], np.cumsum(values)))
+    return csum[hi] - csum[lo]
+
+def _zscore(x):
+    std = x.std()
+    return (x - x.mean()) / std if std > 0 else np.zeros_like(x)
+
+def score_windows(result, source=None, size=WINDOW_SECONDS, step=WINDOW_STEP):
+    """Score every ``size``-second window (every ``step`` seconds) of a Whisper result.
+
+    Returns (starts, scores, lo, hi): window start times, combined z-scored
+    feature scores, and the [lo, hi) range of segments starting in each window.
+    """
+    segments = result.get("segments", [])
+    if not segments:
+        empty = np.zeros(0)
+        return empty, empty, empty.astype(int), empty.astype(int)
+
+    seg_starts = np.array([seg["start"] for seg in segments])
+    starts = np.arange(0.0, seg_starts[-1] + step, step)
+    lo = np.searchsorted(seg_starts, starts, side="left")
+    hi = np.searchsorted(seg_starts, starts + size, side="left")
+
+    words, hits, marks, spoken = _segment_features(segments)
+    n_words = _window_sums(words, lo, hi)
+    per_100 = 100.0 / np.maximum(n_words, 1)
+    features = {
+        "keywords": _window_sums(hits, lo, hi) * per_100,
+        "speech_rate": n_words / np.maximum(_window_sums(spoken, lo, hi), 1.0),
+        "exclamations": _window_sums(marks, lo, hi) * per_100,
+    }
+    if source is not None:
+        levels = signals.load_rms(source)
+        csum = np.concatenate(([0.0], np.cumsum(levels, dtype=np.float64)))
+        a = np.clip(starts.astype(int), 0, len(levels))
+        b = np.clip((starts + size).astype(int), 0, len(levels))
+        features["loudness"] = np.where(b > a, (csum[b] - csum[a]) / np.maximum(b - a, 1), levels.min(initial=-90.0))
+
+    scores = sum(WEIGHTS[name] * _zscore(values) for name, values in features.items())
+    scores = np.where(n_words > 0, scores, -np.inf)
+    return starts, scores, lo, hi
+
+
+# --- Top-K selection ---
+def prerank_windows(result, source=None, top_k=TOP_K, size=WINDOW_SECONDS, step=WINDOW_STEP):
+    """Best ``top_k`` non-overlapping windows, in time order, each with its segments and score."""
+    starts, scores, lo, hi = score_windows(result, source, size, step)
+    segments = result.get("segments", [])
+    picked = []
+    for idx in np.argsort(-scores, kind="stable"):
+        if len(picked) >= top_k or not np.isfinite(scores[idx]):
+            break
+        if any(abs(starts[idx] - starts[p]) < size for p in picked):
+            continue
+        picked.append(idx)
+
+    return [
+        {
+            "start": float(starts[i]),
+            "end": float(starts[i] + size),
+            "score": float(scores[i]),
+            "segments": segments[lo[i]:hi[i]],
+        }
+        for i in sorted(picked)
+    ]
+
+def preranked_transcript(result, source=None, top_k=TOP_K):
+    """Timestamped text of only the top-K windows, ready to send to the LLMs."""
+    windows = prerank_windows(result, source, top_k)
+    text = "\n\n".join(format_timestamped({"segments": w["segments"]}) for w in windows)
+    total = len(result.get("segments", []))
+    kept = sum(len(w["segments"]) for w in windows)
+    print(f"[*] Pre-ranked {len(windows)} window(s): {kept}/{total} transcript segment(s) kept")
+    return text
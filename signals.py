@@ -0,0 +1,179 @@
+import os
+import subprocess
+from dataclasses import dataclass
+
+import numpy as np
+
+import audio_cache
+import tracing
+
+# --- CONFIG ---
+CACHE_DIR = os.getenv("SIGNALS_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "signals"))
+FRAME_SECONDS = 0.1  # loudness resolution used for silence detection
+RMS_BLOCK_SECONDS = 600  # PCM converted to float a block at a time so long episodes stay cheap
+SILENCE_DB = -35.0  # dBFS below which a frame counts as silent
+MIN_SILENCE = 0.3  # seconds
+SCENE_FPS = 4  # frames per second sampled for scene detection
+SCENE_SIZE = (64, 36)  # grayscale analysis resolution
+SCENE_THRESHOLD = float(os.getenv("SCENE_THRESHOLD", "0.15"))  # mean abs frame difference, 0-1
+SNAP_TOLERANCE = 1.5  # seconds a boundary may move to land on a silence or cut
+SNAP_PAD = 0.15  # seconds of silence kept next to speech when snapping into a gap
+
+os.makedirs(CACHE_DIR, exist_ok=True)
+
+
+@dataclass
+class Signals:
+    rms: np.ndarray  # dBFS per whole second
+    silences: np.ndarray  # (n, 2) [start, end] seconds
+    cuts: np.ndarray  # scene-change timestamps, seconds
+
+    def _points(self, side):
+        sil = self.silences.reshape(-1, 2)
+        if side == "start":  # just before speech resumes
+            gaps = np.maximum(sil[:, 0], sil[:, 1] - SNAP_PAD)
+        else:  # just after speech stops
+            gaps = np.minimum(sil[:, 1], sil[:, 0] + SNAP_PAD)
+        return np.sort(np.concatenate([gaps, self.cuts]))
+
+    def _nearest(self, t, side, tolerance):
+        points = self._points(side)
+        k = np.searchsorted(points, t)
+        near = points[max(k - 1, 0):k + 1]
+        if not len(near):
+            return t
+        best = near[np.argmin(np.abs(near - t))]
+        return float(best) if abs(best - t) <= tolerance else t
+
+    def snap(self, start, end, tolerance=SNAP_TOLERANCE, min_len=None, max_len=None):
+        """Move ``start``/``end`` onto the nearest silence edge or scene cut within ``tolerance``.
+
+        A side is left where it was if moving it would break the length limits.
+        """
+        new_start = self._nearest(start, "start", tolerance)
+        new_end = self._nearest(end, "end", tolerance)
+        if not _fits(new_start, end, min_len, max_len):
+            new_start = start
+        if not _fits(new_start, new_end, min_len, max_len):
+            new_end = end
+        return new_start, new_end
+
+    def loudness(self, start, end):
+        a, b = int(start), max(int(np.ceil(end)), int(start) + 1)
+        window = self.rms[a:b]
+        return float(window.mean()) if len(window) else float("-inf")
+
+
+def _fits(start, end, min_len, max_len):
+    length = end - start
+    return length > 0 and (min_len is None or length >= min_len) and (max_len is None or length <= max_len)
+
+
+# --- Audio: loudness and silences from the shared PCM cache (no extra decode once transcribed) ---
+def _frame_power(source):
+    pcm = audio_cache.load_pcm(source)
+    hop = int(audio_cache.SAMPLE_RATE * FRAME_SECONDS)
+    frames = len(pcm) // hop
+    power = np.empty(frames, dtype=np.float32)
+    block = int(RMS_BLOCK_SECONDS / FRAME_SECONDS)
+    for lo in range(0, frames, block):
+        hi = min(lo + block, frames)
+        x = np.asarray(pcm[lo * hop:hi * hop], dtype=np.float32).reshape(hi - lo, hop) / 32768.0
+        power[lo:hi] = np.mean(x * x, axis=1)
+    return power
+
+def _to_db(power):
+    return 20 * np.log10(np.sqrt(power) + 1e-9)
+
+def rms_per_second(source, power=None):
+    """dBFS level of each whole second of ``source``'s audio."""
+    power = _frame_power(source) if power is None else power
+    per_second = int(round(1 / FRAME_SECONDS))
+    seconds = len(power) // per_second
+    return _to_db(power[:seconds * per_second].reshape(seconds, per_second).mean(axis=1)).astype(np.float32)
+
+def find_silences(power):
+    silent = np.concatenate(([0], (_to_db(power) < SILENCE_DB).astype(np.int8), [0]))
+    edges = np.flatnonzero(np.diff(silent))
+    runs = edges.reshape(-1, 2) * FRAME_SECONDS
+    return runs[(runs[:, 1] - runs[:, 0]) >= MIN_SILENCE].astype(np.float32)
+
+
+# --- Video: scene cuts from one low-res grayscale decode, streamed through a pipe ---
+def find_cuts(source):
+    w, h = SCENE_SIZE
+    frame_bytes = w * h
+    cmd = [
+        "ffmpeg", "-nostdin", "-v", "error", "-threads", "0", "-i", source, "-an",
+        "-vf", f"fps={SCENE_FPS},scale={w}:{h},format=gray", "-f", "rawvideo", "pipe:1"
+    ]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    cuts, prev, index = [], None, 0
+    try:
+        while True:
+            data = proc.stdout.read(frame_bytes * SCENE_FPS * 60)  # a minute of frames at a time
+            usable = len(data) - len(data) % frame_bytes
+            if not usable:
+                break
+            tracing.count("bytes_decoded", usable)
+            frames = np.frombuffer(data[:usable], dtype=np.uint8).reshape(-1, frame_bytes).astype(np.int16)
+            if prev is not None:
+                frames = np.vstack([prev, frames])
+            diffs = np.abs(np.diff(frames, axis=0)).mean(axis=1) / 255.0
+            first = index - (1 if prev is not None else 0)  # frame index of frames[0]
+            cuts.extend((first + 1 + np.flatnonzero(diffs > SCENE_THRESHOLD)) / SCENE_FPS)
+            index = first + len(frames)
+            prev = frames[-1:]
+    finally:
+        proc.stdout.close()
+        stderr = proc.stderr.read()
+        proc.wait()
+    if proc.returncode:
+        raise RuntimeError(f"Scene detection failed for {source}: {stderr.decode(errors='ignore')}")
+    return np.array(cuts, dtype=np.float32)
+
+
+# --- Cache: one .npz per source content hash ---
+def _cache_path(source, ext=".npz"):
+    return os.path.join(CACHE_DIR, f"{audio_cache.content_hash(source)}{ext}")
+
+@tracing.traced("signals.analyze")
+def analyze(source):
+    print(f"[*] Analyzing audio/scene signals: {source}")
+    power = _frame_power(source)
+    return Signals(rms=rms_per_second(source, power), silences=find_silences(power), cuts=find_cuts(source))
+
+def load(source):
+    """Signals for ``source``, computed on first use and cached next to the other per-source caches."""
+    path = _cache_path(source)
+    if os.path.exists(path):
+        with np.load(path) as data:
+            return Signals(rms=data["rms"], silences=data["silences"], cuts=data["cuts"])
+
+    sig = analyze(source)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.savez_compressed(f, rms=sig.rms, silences=sig.silences, cuts=sig.cuts)
+    os.replace(tmp, path)
+    return sig
+
+def load_rms(source):
+    """Per-second loudness only, for callers that don't need scene cuts (so no video decode).
+
+    Read from the full signals cache when ``load`` has run, else computed from
+    the cached PCM and kept in its own small file.
+    """
+    path = _cache_path(source)
+    if os.path.exists(path):
+        with np.load(path) as data:
+            return data["rms"]
+    rms_path = _cache_path(source, ".rms.npy")
+    if os.path.exists(rms_path):
+        return np.load(rms_path)
+
+    rms = rms_per_second(source)
+    tmp = f"{rms_path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, rms)
+    os.replace(tmp, rms_path)
+    return rms
@@ -1,8 +1,13 @@
 import os
 import random
-import cv2
 import subprocess
-from moviepy.editor import VideoFileClip
+
+import job_ledger
+import media_info
+import render
+import scheduler
+import signals
+import tracing
 
 # CONFIG
 SOURCE_FOLDER = "harvested_raw"
@@ -11,14 +16,17 @@ CLIP_COUNT = 3
 MIN_LEN = 10
 MAX_LEN = 30
 VERTICAL_RES = (1080, 1920)  # width x height
+CANDIDATES_PER_CLIP = 4  # random picks per clip; the loudest after snapping to silences/cuts wins
+STAGE = "slice"  # job ledger stage name
+RENDER_BACKEND = "ffmpeg"  # "ffmpeg" (all clips from one decode, keeps audio) or "opencv" (legacy frame loop)
 
 os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 
 def get_video_duration(path):
-    clip = VideoFileClip(path)
-    return clip.duration
+    return media_info.probe(path).duration
 
 def crop_to_vertical(frame):
+    import cv2
     height, width = frame.shape[:2]
     target_width = int(height * 9 / 16)
     x_start = (width - target_width) // 2 if width > target_width else 0
@@ -31,15 +39,38 @@ def slice_and_crop_video(file_path, base_name):
         print(f"[-] Skipping short video: {file_path}")
         return
 
-    cap = cv2.VideoCapture(file_path)
-    fps = cap.get(cv2.CAP_PROP_FPS)
-
-    for i in range(CLIP_COUNT):
+    sig = signals.load(file_path)
+    candidates = []
+    for _ in range(CLIP_COUNT * CANDIDATES_PER_CLIP):
         start_time = random.randint(0, int(duration - MAX_LEN))
         clip_length = random.randint(MIN_LEN, MAX_LEN)
+        start, end = sig.snap(start_time, start_time + clip_length, min_len=MIN_LEN, max_len=MAX_LEN)
+        candidates.append((sig.loudness(start, end), start, end))
+
+    picked = []
+    for _, start, end in sorted(candidates, reverse=True):
+        if len(picked) < CLIP_COUNT and all(end <= s or start >= e for s, e in picked):
+            picked.append((start, end))
+
+    clips = []
+    for i, (start, end) in enumerate(picked):
         out_name = os.path.join(OUTPUT_FOLDER, f"{base_name}_clip{i+1:03d}.mp4")
+        print(f"[*] Slicing {file_path} at {start:.2f}s for {end - start:.2f}s -> {out_name}")
+        clips.append({"start": start, "end": end, "out": out_name})
+
+    if RENDER_BACKEND == "ffmpeg":
+        render.render_batch(file_path, clips, VERTICAL_RES)
+        for clip in clips:
+            job_ledger.add_clip(clip["out"], file_path)
+        return
+
+    import cv2  # legacy backend only; kept out of module scope so spawned render workers stay light
+    cap = cv2.VideoCapture(file_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
 
-        print(f"[*] Slicing {file_path} at {start_time}s for {clip_length}s -> {out_name}")
+    for clip in clips:
+        start_time, out_name = clip["start"], clip["out"]
+        clip_length = clip["end"] - clip["start"]
         cap.set(cv2.CAP_PROP_POS_MSEC, start_time * 1000)
         fourcc = cv2.VideoWriter_fourcc(*'mp4v')
         out = cv2.VideoWriter(out_name, fourcc, fps, VERTICAL_RES)
@@ -56,17 +87,24 @@ def slice_and_crop_video(file_path, base_name):
             written += 1
 
         out.release()
+        job_ledger.add_clip(out_name, file_path)
 
     cap.release()
 
 def run_slicer():
     video_files = [f for f in os.listdir(SOURCE_FOLDER) if f.endswith(('.mp4', '.mov'))]
-    for video in video_files:
-        full_path = os.path.join(SOURCE_FOLDER, video)
-        base_name = os.path.splitext(video)[0]
-        slice_and_crop_video(full_path, base_name)
+    todo = job_ledger.pending(STAGE, [os.path.join(SOURCE_FOLDER, f) for f in video_files],
+                              clips=CLIP_COUNT, min_len=MIN_LEN, max_len=MAX_LEN)
+    with scheduler.RenderScheduler() as sched:
+        for full_path in todo:
+            video = os.path.basename(full_path)
+            base_name = os.path.splitext(video)[0]
+            job_ledger.start(STAGE, full_path, clips=CLIP_COUNT, min_len=MIN_LEN, max_len=MAX_LEN)
+            future = sched.submit(slice_and_crop_video, full_path, base_name, label=video)
+            job_ledger.settle(STAGE, full_path, [future])
 
     print("[+] All slicing complete. Check 'shorts_ready/' folder.")
 
 if __name__ == '__main__':
+    tracing.init()
     run_slicer()
@@ -1,15 +1,27 @@
-import whisper
 import os
 import random
 import json
-from moviepy.video.io.ffmpeg_tools import ffmpeg_extract_subclip
-from moviepy.editor import VideoFileClip
+
+import artifact_cache
+import job_ledger
+import media_info
+import render
+import scheduler
+import transcriber
+import segment_scoring
+import signals
+import tracing
+import transcript_index
 
 # --- CONFIG ---
 SOURCE_DIR = "harvested_raw"
 OUTPUT_DIR = "shorts_ready"
 METADATA_DIR = "metadata"
-MODEL = whisper.load_model("base")  # "small", "medium", etc.
+MODEL_SIZE = "base"  # "small", "medium", etc. — loaded lazily by transcriber; uploader.py reuses its transcripts
+TRANSCRIBE_WORKERS = transcriber.CHUNK_WORKERS  # >1 splits long files across processes
+TRANSCRIBE_WINDOW = transcriber.CHUNK_WINDOW  # seconds per window in chunked mode
+
+STAGE = "smart_slice"  # job ledger stage name
 
 MIN_LEN = 8
 MAX_LEN = 30
@@ -19,95 +31,117 @@ os.makedirs(METADATA_DIR, exist_ok=True)
 
 # --- Utility: Transcribe video and return detailed word-timestamps ---
 def transcribe_with_timestamps(video_path):
+    # keyed on the source's bytes and the model, so a replaced file or new MODEL_SIZE is transcribed afresh
+    cache = artifact_cache.default_cache()
+    key = transcript_index.transcript_key(video_path, MODEL_SIZE, cache)
+    cached = cache.get(key)
+    if cached is not None:
+        print(f"[*] Loaded cached transcript for {video_path}")
+        return cached
+
     print(f"[*] Transcribing {video_path}...")
-    return MODEL.transcribe(video_path, word_timestamps=True)
+    result = transcriber.transcribe_long(
+        video_path, model=MODEL_SIZE, workers=TRANSCRIBE_WORKERS,
+        window=TRANSCRIBE_WINDOW, word_timestamps=True
+    )
+    return cache.put(key, result)
 
-# --- Utility: Identify "hot" segments using keywords and durations ---
+# --- Utility: Identify "hot" 8-30s windows over the word-timestamp stream ---
 def find_good_segments(transcript):
-    hot_keywords = [
-        "insane", "crazy", "truth", "money", "nobody", "illegal",
-        "wtf", "he said", "she did", "they don't want you", "you won't believe"
-    ]
-
-    segments = transcript["segments"]
-    good_chunks = []
-
-    for seg in segments:
-        text = seg["text"].lower()
-        duration = seg["end"] - seg["start"]
-
-        if MIN_LEN <= duration <= MAX_LEN and any(kw in text for kw in hot_keywords):
-            metadata = {
-                "start": seg["start"],
-                "end": seg["end"],
-                "duration": duration,
-                "text": seg["text"],
-                "classification": classify_text(seg["text"])
-            }
-            good_chunks.append(metadata)
-
-    return good_chunks
+    return segment_scoring.find_hot_windows(transcript, min_len=MIN_LEN, max_len=MAX_LEN)
+
+# --- Utility: Nudge clip edges onto silences / scene cuts so they don't start mid-word or mid-shot ---
+def snap_to_signals(video_path, clips):
+    sig = signals.load(video_path)
+    for clip in clips:
+        clip["start"], clip["end"] = sig.snap(clip["start"], clip["end"], min_len=MIN_LEN, max_len=MAX_LEN)
+        clip["duration"] = clip["end"] - clip["start"]
+    return clips
 
 # --- Utility: Quick content classifier based on keywords ---
 def classify_text(text):
-    lowered = text.lower()
-    if "podcast" in lowered or "interview" in lowered:
-        return "podcast"
-    elif "meme" in lowered or "sound" in lowered:
-        return "reaction"
-    elif "money" in lowered or "redpill" in lowered:
-        return "finance"
-    elif "gym" in lowered or "lift" in lowered:
-        return "fitness"
-    else:
-        return "general"
+    return segment_scoring.classify_text(text)
 
 # --- Slice the clips and save + write metadata ---
-def slice_and_save(video_path, base_name, chunks):
+def slice_and_save(video_path, base_name, chunks, sched=None):
+    resolution = get_resolution(video_path)
+    futures = []
     for idx, clip in enumerate(chunks):
         out_name = f"{base_name}_smartclip{idx+1:02d}.mp4"
         out_path = os.path.join(OUTPUT_DIR, out_name)
 
-        print(f"[+] Saving smart clip: {out_name} ({clip['duration']:.2f}s)")
-        ffmpeg_extract_subclip(video_path, int(clip["start"]), int(clip["end"]), targetname=out_path)
-
-        # Write accompanying metadata JSON
+        # Write accompanying metadata JSON once the clip exists
         meta = {
             "filename": out_name,
+            "source_video": os.path.basename(video_path),
             "start": clip["start"],
             "end": clip["end"],
             "duration": clip["duration"],
             "text": clip["text"],
             "classification": clip["classification"],
-            "resolution": get_resolution(video_path)
+            "resolution": resolution
         }
 
-        with open(os.path.join(METADATA_DIR, out_name.replace(".mp4", ".json")), "w") as f:
-            json.dump(meta, f, indent=2)
+        print(f"[+] Saving smart clip: {out_name} ({clip['duration']:.2f}s)")
+        if sched is None:
+            render.cut_clip(video_path, out_path, clip["start"], clip["end"])
+            write_metadata(meta)
+            continue
+
+        # Every cut re-encodes at least its head (the whole clip when it can't copy), so it takes an encode slot
+        future = sched.submit(render.cut_clip, video_path, out_path, clip["start"], clip["end"],
+                              kind=scheduler.ENCODE, label=out_name)
+        future.add_done_callback(lambda f, meta=meta: write_metadata_if_cut(f, meta))
+        futures.append(future)
+    return futures
+
+def write_metadata(meta):
+    with open(os.path.join(METADATA_DIR, meta["filename"].replace(".mp4", ".json")), "w") as f:
+        json.dump(meta, f, indent=2)
+    job_ledger.add_clip(os.path.join(OUTPUT_DIR, meta["filename"]), os.path.join(SOURCE_DIR, meta["source_video"]))
+
+def write_metadata_if_cut(future, meta):
+    if not future.cancelled() and future.exception() is None:
+        write_metadata(meta)
 
 # --- Get resolution of the source video ---
 def get_resolution(path):
-    clip = VideoFileClip(path)
-    return f"{int(clip.w)}x{int(clip.h)}"
+    return media_info.probe(path).resolution
 
 # --- Entry point ---
 def run_smart_slicer():
     files = [f for f in os.listdir(SOURCE_DIR) if f.endswith(".mp4")]
-
-    for file in files:
-        path = os.path.join(SOURCE_DIR, file)
-        base = os.path.splitext(file)[0]
-
-        transcript = transcribe_with_timestamps(path)
-        good_clips = find_good_segments(transcript)
-
-        if not good_clips:
-            print(f"[-] No good speech segments found in {file}.")
-            continue
-
-        slice_and_save(path, base, good_clips)
+    todo = job_ledger.pending(STAGE, [os.path.join(SOURCE_DIR, f) for f in files], model=MODEL_SIZE)
+
+    # Cuts for one file run in the background while the next file is transcribed
+    with scheduler.RenderScheduler() as sched:
+        for path in todo:
+            file = os.path.basename(path)
+            base = os.path.splitext(file)[0]
+            job_ledger.start(STAGE, path, model=MODEL_SIZE)
+
+            try:
+                transcript = transcribe_with_timestamps(path)
+                good_clips = find_good_segments(transcript)
+
+                if not good_clips:
+                    print(f"[-] No good speech segments found in {file}.")
+                    job_ledger.finish(STAGE, path)
+                    continue
+
+                good_clips = snap_to_signals(path, good_clips)
+                futures = slice_and_save(path, base, good_clips, sched)
+            except KeyboardInterrupt:
+                job_ledger.release(STAGE, path)
+                raise
+            except Exception as e:
+                print(f"[!] Failed on {file}: {e}")
+                job_ledger.fail(STAGE, path, e)
+                continue
+            job_ledger.settle(STAGE, path, futures)
 
     print("\n[✓] Smart slicing complete.")
 
 if __name__ == "__main__":
+    tracing.init()
     run_smart_slicer()
@@ -0,0 +1,14 @@
+import os
+import sys
+import tempfile
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+sys.path.insert(0, os.path.join(REPO, "pipelines", "jre_pods"))
+
+# keep every module-level cache out of the working tree's cache/
+_scratch = tempfile.mkdtemp(prefix="brainrot_tests_")
+for var, sub in [("AUDIO_CACHE_DIR", "audio"), ("SIGNALS_CACHE_DIR", "signals"), ("ARTIFACT_CACHE_DIR", "artifacts"),
+                 ("MEDIA_CACHE_DIR", "media"), ("TRACE_DIR", "traces")]:
+    os.environ.setdefault(var, os.path.join(_scratch, sub))
+os.environ.setdefault("JOB_LEDGER_PATH", os.path.join(_scratch, "job_ledger.sqlite"))
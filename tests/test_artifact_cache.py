@@ -0,0 +1,74 @@
+import os
+import json
+import time
+
+import artifact_cache
+
+
+def _cache(tmp_path, **kwargs):
+    return artifact_cache.ArtifactCache(root=str(tmp_path / "artifacts"), **kwargs)
+
+
+def _age(cache, key, seconds_ago):
+    then = time.time() - seconds_ago
+    os.utime(cache.path(key), (then, then))
+
+
+def test_gc_evicts_least_recently_used(tmp_path):
+    cache = _cache(tmp_path, max_bytes=0)
+    for i, name in enumerate(["old", "read", "new"]):
+        cache.put(f"segments/{name}", {"pad": "x" * 1000})
+        _age(cache, f"segments/{name}", 300 - i * 100)
+    assert cache.get("segments/read") is not None  # a hit makes it the most recently used
+
+    entry = os.path.getsize(cache.path("segments/new"))
+    assert cache.gc(max_bytes=2 * entry) == (1, entry)
+    assert cache.get("segments/old") is None
+    assert cache.get("segments/read") is not None and cache.get("segments/new") is not None
+
+
+def test_gc_by_age(tmp_path):
+    cache = _cache(tmp_path, max_bytes=0)
+    cache.put("render/stale", {"out": "a.mp4"})
+    cache.put("render/fresh", {"out": "b.mp4"})
+    _age(cache, "render/stale", 10 * 86400)
+    removed, _ = cache.gc(max_bytes=10 ** 9, max_age_days=7)
+    assert removed == 1
+    assert cache.get("render/stale") is None and cache.get("render/fresh") is not None
+
+
+def test_put_over_budget_trims_the_cache(tmp_path):
+    cache = _cache(tmp_path, max_bytes=2500)
+    for i in range(5):
+        cache.put(f"transcript/{i}", {"pad": "x" * 1000})
+        _age(cache, f"transcript/{i}", 100 - i)
+    assert cache.stats()["bytes"] <= 2500
+    assert cache.get("transcript/4") is not None
+
+
+def test_hit_survives_concurrent_eviction(tmp_path, monkeypatch):
+    cache = _cache(tmp_path)
+    cache.put("segments/k", [1, 2])
+
+    def evicted(path, *args):
+        raise FileNotFoundError(path)
+    monkeypatch.setattr(artifact_cache.os, "utime", evicted)
+    assert cache.get("segments/k") == [1, 2]
+    assert cache.hits == 1
+
+
+def test_stats_cli(tmp_path, monkeypatch, capsys):
+    cache = _cache(tmp_path)
+    cache.put("segments/a", [1])
+    cache.put("segments/b", [2])
+    cache.put("transcript/c", {"segments": []})
+    monkeypatch.setattr(artifact_cache, "_default", cache)
+
+    artifact_cache.main(["stats"])
+    stats = json.loads(capsys.readouterr().out)
+    assert stats["entries"] == 3
+    assert {k: v["entries"] for k, v in stats["kinds"].items()} == {"segments": 2, "transcript": 1}
+
+    artifact_cache.main(["gc", "--max-mb", "0"])
+    assert "Evicted 3 artifact(s)" in capsys.readouterr().out
+    assert cache.stats()["entries"] == 0
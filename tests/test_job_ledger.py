@@ -0,0 +1,119 @@
+import os
+from concurrent.futures import Future
+
+import pytest
+
+import job_ledger
+
+STAGE = "slice"
+
+
+@pytest.fixture(autouse=True)
+def ledger(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_ledger, "LEDGER_PATH", str(tmp_path / "ledger.sqlite"))
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "episode.mp4"
+    path.write_bytes(b"frames")
+    return str(path)
+
+
+def _row(path, stage=STAGE):
+    with job_ledger._db() as conn:
+        return conn.execute("SELECT status, attempts, error FROM stages WHERE path = ? AND stage = ?",
+                            (os.path.abspath(path), stage)).fetchone()
+
+
+def test_done_items_are_skipped_until_they_change(source):
+    assert job_ledger.pending(STAGE, [source], model="base") == [source]
+    job_ledger.start(STAGE, source, model="base")
+    assert _row(source) == (job_ledger.RUNNING, 1, None)
+    assert job_ledger.pending(STAGE, [source], model="base") == [source]  # a crashed run's item is redone
+
+    job_ledger.finish(STAGE, source)
+    assert _row(source)[0] == job_ledger.DONE
+    assert job_ledger.pending(STAGE, [source], model="base") == []
+    assert job_ledger.pending(STAGE, [source], model="small") == [source]  # new params
+    assert job_ledger.pending("upload", [source]) == [source]  # other stages are independent
+
+    with open(source, "ab") as f:
+        f.write(b" re-downloaded")
+    assert job_ledger.pending(STAGE, [source], model="base") == [source]
+
+
+def test_fail_then_retry(source):
+    job_ledger.start(STAGE, source)
+    job_ledger.fail(STAGE, source, RuntimeError("ffmpeg exited 1"))
+    assert _row(source) == (job_ledger.FAILED, 1, "ffmpeg exited 1")
+    assert job_ledger.failures(STAGE) == [(os.path.abspath(source), STAGE, 1, "ffmpeg exited 1")]
+    assert job_ledger.pending(STAGE, [source]) == [source]
+
+    job_ledger.start(STAGE, source)
+    assert _row(source) == (job_ledger.RUNNING, 2, None)
+    job_ledger.finish(STAGE, source)
+    assert job_ledger.failures() == []
+
+
+def test_release_puts_an_item_back(source):
+    with pytest.raises(KeyboardInterrupt):
+        with job_ledger.track(STAGE, source):
+            raise KeyboardInterrupt
+    assert _row(source)[0] == job_ledger.PENDING
+    assert job_ledger.pending(STAGE, [source]) == [source]
+
+
+def test_track_records_failures(source):
+    with pytest.raises(ValueError):
+        with job_ledger.track(STAGE, source):
+            raise ValueError("no speech")
+    assert _row(source)[:1] == (job_ledger.FAILED,)
+    with job_ledger.track(STAGE, source):
+        pass
+    assert _row(source)[:2] == (job_ledger.DONE, 2)
+
+
+def _settled(source, futures):
+    job_ledger.start(STAGE, source)
+    job_ledger.settle(STAGE, source, futures)
+    return futures
+
+
+def test_settle_waits_for_every_future(source):
+    a, b = _settled(source, [Future(), Future()])
+    a.set_result("clip_01.mp4")
+    assert _row(source)[0] == job_ledger.RUNNING
+    b.set_result("clip_02.mp4")
+    assert _row(source)[0] == job_ledger.DONE
+
+
+def test_settle_with_a_failed_future(source):
+    a, b = _settled(source, [Future(), Future()])
+    b.set_exception(RuntimeError("encode failed"))
+    a.set_result("clip_01.mp4")
+    assert _row(source) == (job_ledger.FAILED, 1, "encode failed")
+
+
+def test_settle_with_a_cancelled_future(source):
+    a, b = _settled(source, [Future(), Future()])
+    a.set_exception(RuntimeError("encode failed"))
+    b.cancel()
+    assert _row(source)[0] == job_ledger.PENDING  # interrupted, not failed: redone next run
+
+
+def test_settle_without_work(source):
+    _settled(source, [None])  # every clip was already rendered
+    assert _row(source)[0] == job_ledger.DONE
+
+
+def test_clips_and_summary(source, tmp_path):
+    job_ledger.pending(STAGE, [source])  # registers the source
+    job_ledger.add_clip(str(tmp_path / "episode_00.mp4"), source)
+    job_ledger.start(STAGE, source)
+    job_ledger.finish(STAGE, source)
+    summary = job_ledger.summary()
+    assert summary["items"] == {"clip": 1, "source": 1}
+    assert summary["stages"][STAGE][job_ledger.DONE]["count"] == 1
+    assert job_ledger.reset(STAGE) == 1
+    assert job_ledger.pending(STAGE, [source]) == [source]
@@ -0,0 +1,106 @@
+import os
+
+import pytest
+
+import json_stream
+import llm_client
+import segment_generator_hybrid
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def _chunks(text, n=5):
+    return [text[i:i + n] for i in range(0, len(text), n)]
+
+
+def _titles(objs):
+    return [o.get("title") for o in objs]
+
+
+# --- ArrayParser on hand-written replies, fed a few characters at a time ---
+@pytest.mark.parametrize("reply", [
+    'Here are segments from [01:10] onward:\n[{"title":"a","start":1}, {"title":"b"}]',
+    'Sure:\n```json\n[{"title":"a","start":1},\n {"title":"b"}]\n```\nEnjoy!',
+    '{"segments": [{"title":"a","start":1}, {"title":"b"}], "note": "[x]"}',
+    '[[{"title":"a","start":1}, {"title":"b"}]]',
+    'Picks [see [01:10]] and {note}:\n[{"title":"a","start":1}, {"title":"b"}] then [c]',
+])
+def test_objects_survive_prose_fences_and_wrappers(reply):
+    assert _titles(json_stream.iter_json_array(_chunks(reply))) == ["a", "b"]
+    assert _titles(json_stream.parse_array(reply)) == ["a", "b"]
+
+
+def test_brackets_inside_strings():
+    reply = r'[{"title":"[01:10] the ] and } \"quoted [\" bit","start":1}, {"title":"ok"}]'
+    assert _titles(json_stream.iter_json_array(_chunks(reply, 3))) == ['[01:10] the ] and } "quoted [" bit', "ok"]
+
+
+def test_truncated_final_object_is_dropped():
+    reply = '[{"title":"a","start":1}, {"title":"b","start":2}, {"title":"c","sta'
+    assert _titles(json_stream.iter_json_array(_chunks(reply))) == ["a", "b"]
+    assert _titles(json_stream.parse_array(reply)) == ["a", "b"]
+
+
+def test_each_object_is_yielded_by_the_chunk_that_closes_it():
+    parser = json_stream.ArrayParser()
+    assert parser.feed('[01:10] [{"title":"a"') == []
+    assert _titles(parser.feed('}, {"title"')) == ["a"]
+    assert parser.feed(':"b"') == []
+    assert _titles(parser.feed("}]")) == ["b"]
+    assert parser.feed(', [{"title":"after the array"}]') == []
+
+
+# --- Recorded streams replayed through the real client parsing ---
+def _replay(monkeypatch, name):
+    """Serve a recorded response body to llm_client.stream_lines; returns the list of lines consumed so far."""
+    with open(os.path.join(FIXTURES, name), "r", encoding="utf-8") as f:
+        lines = [line.rstrip("\n") for line in f if line.strip()]
+    consumed = []
+
+    def stream_lines(backend, path, payload, timeout=None, cancel=None):
+        for line in lines:
+            consumed.append(line)
+            yield line
+    monkeypatch.setattr(llm_client, "stream_lines", stream_lines)
+    return consumed
+
+
+def _yield_points(chunks):
+    raw = []
+    points = []
+    for segment in segment_generator_hybrid.stream_segments(chunks, raw):
+        points.append((segment["title"], len("".join(raw))))
+    return points, "".join(raw)
+
+
+def _assert_yielded_on_close(points, text, closers):
+    assert [title for title, _ in points] == list(closers)
+    for (title, seen), closer in zip(points, closers.values()):
+        closed_at = text.index(closer) + len(closer)
+        assert closed_at <= seen < closed_at + 7, title  # recorded deltas are 7 characters
+
+
+def test_ollama_ndjson_replay(monkeypatch):
+    _replay(monkeypatch, "ollama_generate.ndjson")
+    points, text = _yield_points(llm_client.stream_generate_ollama("prompt", model="mistral"))
+    _assert_yielded_on_close(points, text, {
+        "Joe on [REDACTED] chimps": '"virality_score": 8}',
+        "DMT {elves} explained": '"virality_score": 7}',
+    })
+    assert text.endswith("mid-obj")  # the reply was cut off inside a third object
+
+
+def test_openai_sse_replay(monkeypatch):
+    _replay(monkeypatch, "openai_chat.sse")
+    points, text = _yield_points(llm_client.stream_openai([{"role": "user", "content": "prompt"}]))
+    _assert_yielded_on_close(points, text, {
+        "Bear attack story": '"virality_score": 9}',
+        "Sauna protocol [part 2]": '"virality_score": 6}',
+    })
+
+
+def test_truncated_reply_does_not_escalate(monkeypatch):
+    _replay(monkeypatch, "ollama_generate.ndjson")
+    segments, raw = segment_generator_hybrid.query_ollama_segments("prompt", "mistral")
+    assert [s["start"] for s in segments] == [70, 301]
+    assert raw.startswith("Sure! Here are segments starting from [01:10]")
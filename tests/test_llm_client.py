@@ -0,0 +1,74 @@
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import llm_client
+
+
+class _SlowStream(BaseHTTPRequestHandler):
+    # chunked NDJSON, one line per chunk, the way Ollama streams tokens
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for i in range(200):
+                line = f'{{"n": {i}}}\n'.encode()
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                self.wfile.flush()
+                time.sleep(0.05)
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def ollama(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _SlowStream)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setitem(llm_client.BASE_URLS, "ollama", f"http://127.0.0.1:{server.server_address[1]}")
+    _, slots = llm_client._backend("ollama")
+    yield slots
+    server.shutdown()
+
+
+def _free(slots):
+    return slots._value == llm_client.CONCURRENCY["ollama"]
+
+
+def test_cancel_closes_stream_and_frees_slot(ollama):
+    cancel = threading.Event()
+    lines = []
+    started = time.monotonic()
+    for line in llm_client.stream_lines("ollama", "/api/chat", {"model": "m"}, cancel=cancel):
+        lines.append(line)
+        if len(lines) == 2:
+            cancel.set()
+    assert len(lines) == 2
+    assert time.monotonic() - started < 2  # the full stream would take 10s
+    assert _free(ollama)
+
+
+def test_cancel_while_waiting_for_a_slot(ollama):
+    for _ in range(llm_client.CONCURRENCY["ollama"]):
+        ollama.acquire()
+    cancel = threading.Event()
+    got = []
+    worker = threading.Thread(target=lambda: got.extend(
+        llm_client.stream_lines("ollama", "/api/chat", {"model": "m"}, cancel=cancel)))
+    worker.start()
+    cancel.set()
+    worker.join(timeout=3)
+    for _ in range(llm_client.CONCURRENCY["ollama"]):
+        ollama.release()
+    assert not worker.is_alive() and got == []
+    assert _free(ollama)
@@ -0,0 +1,56 @@
+import os
+import json
+import time
+
+import pytest
+
+import llm_voting_panel
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "vote_golden.json")
+
+
+@pytest.fixture(scope="module")
+def golden():
+    # voters: three lists of 120 picks, about half shared with ±1.5s jitter and some re-cased titles.
+    # expected["window"] is the pre-index vote_segments output; expected["iou_0.5"] the same linear
+    # scan with the IoU test in place of the ±MATCH_WINDOW one.
+    with open(FIXTURE, "r") as f:
+        return json.load(f)
+
+
+def test_window_mode_matches_golden(golden):
+    assert llm_voting_panel.vote_segments(*golden["voters"]) == golden["expected"]["window"]
+
+
+def test_iou_mode_matches_golden(golden):
+    assert llm_voting_panel.vote_segments(*golden["voters"], min_iou=0.5) == golden["expected"]["iou_0.5"]
+
+
+def test_voter_results_are_not_mutated(golden):
+    before = json.dumps(golden["voters"])
+    llm_voting_panel.vote_segments(*golden["voters"])
+    assert json.dumps(golden["voters"]) == before
+
+
+def test_settled_panel_cancels_running_voters():
+    picks = [{"start": 60 * k, "end": 60 * k + 20, "title": f"story {k}"} for k in range(3)]
+    seen = {}
+
+    def fast(name):
+        def query(transcript, cancel=None):
+            return [dict(p, llm_votes=[name]) for p in picks]
+        return query
+
+    def slow(transcript, cancel=None):
+        seen["cancelled"] = cancel.wait(timeout=10)
+        return []
+
+    voters = {"a": {"query": fast("a"), "deadline": 30}, "b": {"query": fast("b"), "deadline": 30},
+              "slow": {"query": slow, "deadline": 30}}
+    results = llm_voting_panel.run_panel("transcript", voters, target=3)
+    assert set(results) == {"a", "b"}
+    for _ in range(100):
+        if "cancelled" in seen:
+            break
+        time.sleep(0.02)
+    assert seen["cancelled"] is True
@@ -0,0 +1,50 @@
+import json
+import sqlite3
+from dataclasses import asdict
+
+import media_info
+
+
+def _fake_probes(monkeypatch):
+    calls = []
+
+    def probe(path):
+        calls.append("probe")
+        return media_info.MediaInfo(path=path, duration=60.0, width=1920, height=1080, codec="h264")
+
+    def probe_keyframes(path):
+        calls.append("keyframes")
+        return [0.0, 2.0, 4.0]
+    monkeypatch.setattr(media_info, "_probe", probe)
+    monkeypatch.setattr(media_info, "_probe_keyframes", probe_keyframes)
+    return calls
+
+
+def test_keyframes_are_listed_only_when_asked(tmp_path, monkeypatch):
+    calls = _fake_probes(monkeypatch)
+    video = tmp_path / "clip.mp4"
+    video.write_bytes(b"video")
+
+    assert media_info.probe(str(video)).resolution == "1920x1080"
+    assert calls == ["probe"]
+    assert media_info.keyframes(str(video)) == [0.0, 2.0, 4.0]
+    media_info._keyframe_memo.clear()
+    assert media_info.keyframes(str(video)) == [0.0, 2.0, 4.0]  # from the index this time
+    assert calls == ["probe", "keyframes"]
+
+
+def test_rows_from_an_older_probe_are_refreshed(tmp_path, monkeypatch):
+    calls = _fake_probes(monkeypatch)
+    video = tmp_path / "old.mp4"
+    video.write_bytes(b"video")
+    st = video.stat()
+    old = asdict(media_info.MediaInfo(path=str(video), duration=60.0))
+    old["keyframes"] = [0.0]
+    del old["pix_fmt"]
+    media_info._connect().close()  # creates the tables
+    with sqlite3.connect(media_info.INDEX_PATH) as conn:
+        conn.execute("INSERT OR REPLACE INTO media VALUES (?, ?, ?, ?)",
+                     (str(video), st.st_size, st.st_mtime_ns, json.dumps(old)))
+
+    assert media_info.probe(str(video)).width == 1920
+    assert calls == ["probe"]
@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+import metadata_utils
+from metadata_utils import MetadataStore
+
+
+def _write(meta_dir, name, data):
+    with open(meta_dir / name, "w") as f:
+        json.dump(data, f)
+
+
+def test_migrate_keeps_uploaded_clips_out_of_the_queue(tmp_path):
+    _write(tmp_path, "ep1_00.json", {"title": "a", "reason": "r", "source_video": "ep1.mp4"})
+    _write(tmp_path, "ep1_01.json", {"title": "b", "reason": "r", "source_video": "ep1.mp4", "video_id": "abc123"})
+    _write(tmp_path, "ep2_00.json", {"title": "c", "reason": "r", "source_video": "ep2.mp4", "uploaded": True})
+    _write(tmp_path, "ep2_01.json", {"filename": "ep2_01.mp4", "status": "ready", "reason": "r"})
+    (tmp_path / "broken.json").write_text("{not json")
+
+    store = MetadataStore(str(tmp_path))
+    assert store.migrate() == 4
+    statuses = {m["filename"]: m["status"] for m in store.query()}
+    assert statuses == {
+        "ep1_00.mp4": metadata_utils.LEGACY_STATUS,
+        "ep1_01.mp4": "uploaded",
+        "ep2_00.mp4": "uploaded",
+        "ep2_01.mp4": "ready",  # an explicit status is kept
+    }
+    assert [m["filename"] for m in store.query(status="ready")] == ["ep2_01.mp4"]
+    assert store.migrate() == 0  # already imported
+
+    store.update("ep1_00.mp4", status="ready")
+    assert store.migrate(force=True) == 4
+    assert store.get("ep1_00.mp4")["status"] == metadata_utils.LEGACY_STATUS  # force re-imports from the files
+
+
+def test_query_filters_and_limit(tmp_path):
+    store = MetadataStore(str(tmp_path))
+    store.put_many([
+        {"filename": f"ep{i % 2}_{i:02d}.mp4", "source_video": f"ep{i % 2}.mp4", "category": "science"}
+        for i in range(6)
+    ])
+    assert [m["filename"] for m in store.query(source_video="ep1.mp4")] == ["ep1_01.mp4", "ep1_03.mp4", "ep1_05.mp4"]
+    assert len(store.query(limit=2, category="science", status="ready")) == 2
+    with pytest.raises(ValueError, match="title"):
+        store.query(title="a")
+
+
+def test_batch_buffers_writes_until_the_block_ends(tmp_path, monkeypatch):
+    monkeypatch.setattr(metadata_utils, "BATCH_SIZE", 3)
+    store = MetadataStore(str(tmp_path))
+    with store.batch():
+        for i in range(4):
+            store.put({"filename": f"clip{i}.mp4"})
+        assert len(store.filenames()) == 3  # one full buffer flushed early
+    assert len(store.filenames()) == 4
+    store.put({"filename": "clip9.mp4"})  # outside a batch: written straight away
+    assert "clip9.mp4" in store.filenames()
+
+
+def test_update(tmp_path):
+    store = MetadataStore(str(tmp_path))
+    store.put({"filename": "clip.mp4", "title": "t"})
+    store.update("clip.mp4", status="uploaded", video_id="xyz")
+    assert store.query(status="uploaded")[0]["video_id"] == "xyz"
+    with pytest.raises(KeyError):
+        store.update("missing.mp4", status="uploaded")
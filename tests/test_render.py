@@ -0,0 +1,53 @@
+import json
+import shutil
+import subprocess
+
+import pytest
+
+import media_info
+import render
+
+needs_ffmpeg = pytest.mark.skipif(not (shutil.which("ffmpeg") and shutil.which("ffprobe")),
+                                  reason="ffmpeg/ffprobe not installed")
+
+
+def test_head_args_follow_the_source():
+    info = media_info.MediaInfo(path="x", duration=1.0, codec="h264", profile="High", level=41, refs=4,
+                                pix_fmt="yuv420p")
+    assert render._matching_head_args(info) == [
+        "-profile:v", "high", "-level:v", "4.1", "-pix_fmt", "yuv420p", "-refs", "4"
+    ]
+    # a profile libx264 can't produce, or an unknown level, means a full encode instead
+    assert render._matching_head_args(media_info.MediaInfo(path="x", duration=1.0, profile="Extended",
+                                                           level=30, pix_fmt="yuv420p")) is None
+    assert render._matching_head_args(media_info.MediaInfo(path="x", duration=1.0, profile="Main",
+                                                           pix_fmt="yuv420p")) is None
+
+
+def _ffprobe(path, *args):
+    result = subprocess.run(["ffprobe", "-v", "error", "-of", "json", *args, path],
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+
+@needs_ffmpeg
+def test_off_keyframe_cut_decodes_cleanly(tmp_path):
+    src = str(tmp_path / "src.mp4")
+    # keyframes every 2s, Main profile with 3 refs so libx264's own defaults would differ
+    subprocess.run([
+        "ffmpeg", "-v", "error", "-f", "lavfi", "-i", "testsrc2=size=320x240:rate=25",
+        "-f", "lavfi", "-i", "sine=frequency=440", "-t", "8",
+        "-c:v", "libx264", "-profile:v", "main", "-level:v", "3.0", "-refs", "3", "-pix_fmt", "yuv420p",
+        "-g", "50", "-keyint_min", "50", "-sc_threshold", "0", "-c:a", "aac", src
+    ], check=True)
+    assert media_info.keyframes(src)[:3] == pytest.approx([0.0, 2.0, 4.0], abs=0.05)
+
+    dst = str(tmp_path / "cut.mp4")
+    render.cut_clip(src, dst, 0.9, 5.3)  # head 0.9-2.0 re-encoded, tail 2.0-5.3 copied
+
+    stream = _ffprobe(dst, "-count_frames", "-select_streams", "v:0",
+                      "-show_entries", "stream=nb_read_frames,profile,level")["streams"][0]
+    assert stream["profile"] == "Main" and stream["level"] == 30
+    assert abs(int(stream["nb_read_frames"]) - round(4.4 * 25)) <= 2
+    decode = subprocess.run(["ffmpeg", "-v", "error", "-i", dst, "-f", "null", "-"], capture_output=True, text=True)
+    assert decode.returncode == 0 and not decode.stderr.strip()
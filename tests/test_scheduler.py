@@ -0,0 +1,74 @@
+import time
+
+import pytest
+
+import scheduler
+
+
+def _timed(seconds):
+    started = time.time()
+    time.sleep(seconds)
+    return started, time.time()
+
+
+def _fail(message):
+    raise ValueError(message)
+
+
+def _max_overlap(spans):
+    edges = sorted([(s, 1) for s, _ in spans] + [(e, -1) for _, e in spans])
+    running = peak = 0
+    for _, step in edges:
+        running += step
+        peak = max(peak, running)
+    return peak
+
+
+def test_encodes_waiting_for_a_slot_do_not_hold_workers():
+    with scheduler.RenderScheduler(workers=2, max_encodes=1, max_readers=1) as sched:
+        encodes = [sched.submit(_timed, 1.0, kind=scheduler.ENCODE) for _ in range(2)]
+        read = sched.submit(_timed, 0.2, kind=scheduler.READ)
+    encode_spans = [f.result() for f in encodes]
+    assert _max_overlap(encode_spans) == 1
+    # the read runs on the second worker while the first encode is still going
+    assert read.result()[0] < min(end for _, end in encode_spans)
+
+
+def test_reader_cap():
+    with scheduler.RenderScheduler(workers=3, max_encodes=1, max_readers=2) as sched:
+        reads = [sched.submit(_timed, 0.5, kind=scheduler.READ) for _ in range(4)]
+    assert _max_overlap([f.result() for f in reads]) == 2
+
+
+def test_progress_counts(capsys):
+    with scheduler.RenderScheduler(workers=2) as sched:
+        ok = sched.submit(_timed, 0.0, label="ok")
+        bad = sched.submit(_fail, "no keyframes", label="bad")
+        assert sched.join() == (1, 1)
+    assert ok.result()
+    with pytest.raises(ValueError, match="no keyframes"):
+        bad.result()
+    out = capsys.readouterr().out
+    assert "] ok (" in out
+    assert "] bad failed: no keyframes" in out
+    assert "[2/2]" in out
+
+
+def test_cancelled_jobs_never_start():
+    with scheduler.RenderScheduler(workers=2, max_encodes=1) as sched:
+        first = sched.submit(_timed, 0.5)
+        queued = [sched.submit(_timed, 0.5) for _ in range(3)]
+        assert all(f.cancel() for f in queued)  # still waiting for the encode slot
+        assert sched.join() == (1, 0)
+    assert first.result()
+    assert all(f.cancelled() for f in queued)
+
+
+def test_interrupt_cancels_unstarted_jobs():
+    with pytest.raises(KeyboardInterrupt):
+        with scheduler.RenderScheduler(workers=1, max_encodes=1) as sched:
+            running = sched.submit(_timed, 0.5)
+            queued = [sched.submit(_timed, 0.5) for _ in range(3)]
+            raise KeyboardInterrupt
+    assert all(f.cancelled() for f in queued)
+    assert running.done()
@@ -0,0 +1,22 @@
+import segment_scoring
+
+
+def _result(text, start=0.0, step=0.5):
+    words = [{"word": " " + w, "start": start + i * step, "end": start + i * step + 0.4}
+             for i, w in enumerate(text.split())]
+    return {"segments": [{"start": words[0]["start"], "end": words[-1]["end"], "text": text, "words": words}]}
+
+
+def test_multi_word_keywords_match_across_words():
+    words = [" they", " don't", " want", " you", " to", " know", " he", " said"]
+    counts = segment_scoring.word_label_counts(words)
+    assert counts[:, 0].sum() == 2
+    assert counts[3, 0] == 1  # "they don't want you" ends on "you"
+    assert counts[7, 0] == 1  # "he said" ends on "said"
+
+
+def test_word_and_segment_level_agree():
+    text = "honestly they don't want you to hear this and then he said it was fine anyway ok"
+    word_level = segment_scoring.find_hot_windows(_result(text), min_len=5, max_len=30)
+    segment_level = segment_scoring.label_counts([text])[0, 0]
+    assert sum(c["hits"] for c in word_level) == segment_level == 2
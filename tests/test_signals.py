@@ -0,0 +1,73 @@
+import os
+
+import numpy as np
+import pytest
+
+import audio_cache
+import signals
+
+RATE = audio_cache.SAMPLE_RATE
+
+
+@pytest.fixture
+def source(tmp_path):
+    """A source whose decoded PCM is already in the audio cache: 20s of speech-level noise, one real pause."""
+    path = tmp_path / "episode.mp4"
+    path.write_bytes(os.urandom(64))
+    pcm = np.random.default_rng(1).normal(0, 3000, 20 * RATE).clip(-32768, 32767).astype(np.int16)
+    pcm[5 * RATE:6 * RATE] = 0
+    pcm[int(12.0 * RATE):int(12.2 * RATE)] = 0  # shorter than MIN_SILENCE
+    pcm.tofile(os.path.join(audio_cache.CACHE_DIR, f"{audio_cache.content_hash(str(path))}.pcm"))
+    return str(path)
+
+
+def test_silences_and_loudness_from_cached_pcm(source):
+    power = signals._frame_power(source)
+    silences = signals.find_silences(power)
+    assert silences.shape == (1, 2) and silences[0].tolist() == pytest.approx([5.0, 6.0])
+
+    rms = signals.rms_per_second(source, power)
+    assert len(rms) == 20
+    assert rms[5] < signals.SILENCE_DB < rms[4]
+    assert np.all(np.delete(rms, 5) > signals.SILENCE_DB)
+
+
+def test_load_rms_is_cached(source, monkeypatch):
+    first = signals.load_rms(source)
+
+    def recompute(*args):
+        raise AssertionError("PCM scanned again")
+    monkeypatch.setattr(signals, "rms_per_second", recompute)
+    assert np.array_equal(signals.load_rms(source), first)
+
+
+def test_load_rms_prefers_the_full_signals_cache(source, monkeypatch):
+    rms = np.arange(20, dtype=np.float32)
+    np.savez_compressed(signals._cache_path(source), rms=rms, silences=np.zeros((0, 2)), cuts=np.zeros(0))
+    monkeypatch.setattr(signals, "rms_per_second", None)
+    assert np.array_equal(signals.load_rms(source), rms)
+    assert np.array_equal(signals.load(source).rms, rms)
+
+
+def _sig():
+    return signals.Signals(rms=np.linspace(-40, -10, 30, dtype=np.float32),
+                           silences=np.array([[9.0, 10.0]], dtype=np.float32),
+                           cuts=np.array([20.0], dtype=np.float32))
+
+
+def test_snap_moves_edges_onto_pauses_and_cuts():
+    start, end = _sig().snap(9.8, 19.5)
+    assert start == pytest.approx(10.0 - signals.SNAP_PAD)  # just before speech resumes
+    assert end == pytest.approx(20.0)  # onto the scene cut
+
+
+def test_snap_respects_length_limits_and_tolerance():
+    sig = _sig()
+    assert sig.snap(9.8, 19.5, max_len=10)[1] == 19.5  # 20.0 would make it too long
+    assert sig.snap(14.0, 17.0) == (14.0, 17.0)  # nothing within tolerance
+
+
+def test_loudness_over_whole_seconds():
+    sig = _sig()
+    assert sig.loudness(2.5, 4.2) == pytest.approx(float(sig.rms[2:5].mean()))
+    assert sig.loudness(40, 45) == float("-inf")
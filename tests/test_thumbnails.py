@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+thumbnails = pytest.importorskip("thumbnails")  # needs Pillow
+
+H, W = 128, 72
+
+
+def _frame(luma):
+    return np.repeat(np.clip(luma, 0, 255).astype(np.uint8)[..., None], 3, axis=2)
+
+
+def _checker(low, high, cell=8):
+    y, x = np.indices((H, W))
+    return _frame(np.where(((y // cell) + (x // cell)) % 2, high, low))
+
+
+def test_sharp_well_exposed_frame_wins():
+    frames = np.stack([
+        _frame(np.full((H, W), 128)),             # flat grey: no detail
+        _checker(60, 200),                        # in focus, mid exposure
+        _checker(235, 255),                       # blown out
+        _frame(np.full((H, W), 5)),               # black transition
+    ])
+    scores = thumbnails.score_frames(frames)
+    assert scores.shape == (4,)
+    assert int(np.argmax(scores)) == 1
+    assert scores[3] == -1.0
+    assert scores[0] < scores[1] and scores[2] < scores[1]
+
+
+def test_blur_lowers_the_score():
+    sharp = _checker(40, 220)
+    # box-blur the same pattern: identical exposure and mean, far less high-frequency energy
+    blurred = sharp.astype(np.float32)
+    for axis in (0, 1):
+        blurred = sum(np.roll(blurred, k, axis=axis) for k in range(-6, 7)) / 13
+    scores = thumbnails.score_frames(np.stack([blurred.astype(np.uint8), sharp]))
+    assert scores[1] > scores[0]
+
+
+def test_all_dark_clip_still_returns_scores():
+    frames = np.stack([_frame(np.full((H, W), v)) for v in (0, 10, 20)])
+    assert np.all(thumbnails.score_frames(frames) == -1.0)
+
+
+def test_overlay_writes_a_jpeg(tmp_path):
+    from PIL import Image
+
+    out = str(tmp_path / "thumb.jpg")
+    assert thumbnails.render_overlay(_checker(60, 200), "Joe reacts to the bear story #shorts", out) == out
+    with Image.open(out) as img:
+        assert img.format == "JPEG" and img.size == (W, H)
@@ -0,0 +1,92 @@
+import os
+import json
+
+import pytest
+
+import tracing
+
+
+@pytest.fixture
+def trace_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracing, "TRACE_DIR", str(tmp_path))
+    monkeypatch.setattr(tracing, "RUN_ID", "testrun")
+    monkeypatch.setattr(tracing, "_file", None)
+    monkeypatch.setattr(tracing, "_buffer", [])
+    monkeypatch.setattr(tracing, "_spans", {})
+    monkeypatch.setattr(tracing, "_counters", {})
+    monkeypatch.setattr(tracing, "ENABLED", True)
+    monkeypatch.setattr(tracing, "_closed", False)
+    yield tmp_path
+    if tracing._file is not None:
+        tracing._file.close()
+
+
+def _records(trace_dir):
+    tracing.flush()
+    with open(os.path.join(trace_dir, f"trace_testrun_{os.getpid()}.jsonl"), encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_nested_spans_record_their_parent(trace_dir):
+    with tracing.span("slice", file="ep1.mp4"):
+        with tracing.span("render.batch", clips=3):
+            pass
+        with tracing.span("render.batch", clips=1):
+            pass
+
+    spans = [r for r in _records(trace_dir) if r["type"] == "span"]
+    assert [(s["name"], s["parent"]) for s in spans] == [
+        ("render.batch", "slice"), ("render.batch", "slice"), ("slice", None)
+    ]
+    assert spans[0]["attrs"] == {"clips": 3}
+    assert spans[2]["seconds"] >= spans[0]["seconds"]
+    assert tracing.snapshot()["spans"]["render.batch"]["count"] == 2
+
+
+def test_errors_are_recorded_and_reraised(trace_dir):
+    @tracing.traced()
+    def probe():
+        raise RuntimeError("ffprobe failed")
+
+    with pytest.raises(RuntimeError):
+        probe()
+    (span,) = [r for r in _records(trace_dir) if r["type"] == "span"]
+    assert span["name"].endswith(".probe")
+    assert span["error"] == "RuntimeError: ffprobe failed"
+    assert tracing.snapshot()["spans"][span["name"]]["errors"] == 1
+
+
+def test_counters_events_and_run_summary(trace_dir):
+    tracing.count("bytes_decoded", 1000)
+    tracing.count("bytes_decoded", 24)
+    tracing.count("tokens_sent")
+    tracing.event("llm.failure", model="mistral", error="timeout")
+    with tracing.span("transcribe"):
+        pass
+    assert tracing.snapshot()["counters"] == {"bytes_decoded": 1024, "tokens_sent": 1}
+
+    tracing._at_exit()  # writes this process's totals record
+    records = _records(trace_dir)
+    assert {r["type"] for r in records} == {"event", "span", "totals"}
+    assert next(r for r in records if r["type"] == "event")["model"] == "mistral"
+
+    summary = tracing.print_summary("testrun")
+    assert summary["spans"]["transcribe"]["count"] == 1
+    assert summary["counters"] == {"bytes_decoded": 1024, "tokens_sent": 1}
+    assert os.path.exists(os.path.join(trace_dir, "summary_testrun.json"))
+
+
+def test_prometheus_text_groups_each_family(trace_dir):
+    with tracing.span("render"):
+        pass
+    tracing.count("bytes_decoded", 5)
+    lines = tracing._prometheus_text().splitlines()
+    assert lines == [
+        "# TYPE brainrot_span_seconds_total counter",
+        lines[1],
+        "# TYPE brainrot_span_count_total counter",
+        'brainrot_span_count_total{span="render"} 1',
+        "# TYPE brainrot_counter_total counter",
+        'brainrot_counter_total{name="bytes_decoded"} 5',
+    ]
+    assert lines[1].startswith('brainrot_span_seconds_total{span="render"} ')
@@ -0,0 +1,60 @@
+import numpy as np
+
+import transcriber
+
+RATE = transcriber.SAMPLE_RATE
+
+
+def _speech_with_pauses(seconds, pauses):
+    audio = np.random.default_rng(0).normal(0, 0.1, int(seconds * RATE)).astype(np.float32)
+    for start, end in pauses:
+        audio[int(start * RATE):int(end * RATE)] = 0
+    return audio
+
+
+def test_cuts_land_in_silences():
+    pauses = [(52.0, 52.6), (118.3, 118.9), (177.0, 177.5)]
+    audio = _speech_with_pauses(240, pauses)
+
+    cuts = transcriber.find_chunk_bounds(audio, window=60, search=10)
+    assert cuts[0] == 0.0 and cuts[-1] == 240.0
+    inner = cuts[1:-1]
+    assert len(inner) == len(pauses)
+    for cut, (start, end) in zip(inner, pauses):
+        assert start <= cut < end
+
+
+def test_short_audio_is_one_chunk():
+    assert transcriber.find_chunk_bounds(np.zeros(30 * RATE, dtype=np.float32), window=60) == [0.0, 30.0]
+
+
+def _seg(start, end, text):
+    return {"start": start, "end": end, "text": text,
+            "words": [{"word": text, "start": start, "end": end}]}
+
+
+def test_overlap_duplicates_are_dropped_without_losing_segments():
+    cuts = [0.0, 60.0, 120.0]
+    offsets = [0.0, 55.0]  # second window starts 5s before its cut, for context
+    first = {"language": "en", "segments": [
+        _seg(50.0, 57.0, " a"),
+        _seg(57.0, 59.5, " b"),   # midpoint before the cut: owned by the first window
+        _seg(59.5, 61.5, " c"),   # midpoint 60.5, past the cut: owned by the second
+        _seg(61.5, 64.0, " d"),   # trailing overlap
+    ]}
+    second = {"language": "en", "segments": [
+        _seg(2.0, 4.5, " b"),     # 57.0-59.5 again
+        _seg(4.5, 6.5, " c"),
+        _seg(6.5, 9.0, " d"),
+        _seg(9.0, 65.0, " e"),    # runs to the end of the audio
+    ]}
+
+    merged = transcriber.stitch_results([first, second], offsets, cuts)
+    assert [s["text"] for s in merged["segments"]] == [" a", " b", " c", " d", " e"]
+    assert merged["text"] == " a b c d e"
+    assert [s["id"] for s in merged["segments"]] == list(range(5))
+    c = merged["segments"][2]
+    assert (c["start"], c["end"]) == (59.5, 61.5)
+    assert c["words"][0]["start"] == 59.5  # word times shifted with the segment
+    assert merged["language"] == "en"
+    assert second["segments"][1]["start"] == 4.5  # inputs are left untouched
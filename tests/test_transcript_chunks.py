@@ -0,0 +1,34 @@
+import transcript_chunks
+
+
+def _transcript(lines=60):
+    return "\n".join(f"[{i // 60:02d}:{i % 60:02d}] line {i} " + "word " * 30 for i in range(0, lines * 60, 60))
+
+
+def test_unscored_picks_are_spread_across_windows():
+    transcript = _transcript()
+    windows = transcript_chunks.split_windows(transcript, max_tokens=200, overlap_tokens=0)
+    assert len(windows) >= 4
+
+    def generate(window):
+        first = int(window.split("]", 1)[0].strip("[").split(":")[0]) * 60
+        # five candidates per window, none with a virality_score, like the prompts used to produce
+        return [{"start": first + 10 * k, "end": first + 10 * k + 8, "title": f"{first}-{k}"} for k in range(5)]
+
+    picks = transcript_chunks.map_reduce(transcript, generate, top_n=len(windows), max_tokens=200, overlap_tokens=0)
+    starts = sorted(p["start"] for p in picks)
+    last_window_start = int(windows[-1].split("]", 1)[0].strip("[").split(":")[0]) * 60
+    assert len(picks) == len(windows)
+    assert starts[-1] >= last_window_start  # the final window still contributes
+
+
+def test_scores_rank_before_window_order():
+    segs = [{"start": 0, "end": 10}, {"start": 20, "end": 30}, {"start": 900, "end": 910, "virality_score": 9}]
+    kept = transcript_chunks.reduce_segments(segs, top_n=1, windows=[0, 0, 3])
+    assert kept[0]["start"] == 900
+
+
+def test_mm_ss_times_survive_the_reduce():
+    segs = [{"start": "01:10", "end": "01:35"}, {"start": "12:00", "end": "[12:30]"}, {"start": "x", "end": "y"}]
+    kept = transcript_chunks.reduce_segments(segs)
+    assert [s["start"] for s in kept] == ["01:10", "12:00"]
@@ -0,0 +1,38 @@
+from transcript_index import TranscriptIndex, format_timestamped, parse_time
+
+
+def _result():
+    lines = [(70.4, 74.0, "first line"), (74.2, 79.8, "second line"), (80.1, 86.5, "last line used"),
+             (86.9, 92.0, "next line")]
+    return {"segments": [{"start": s, "end": e, "text": t} for s, e, t in lines]}
+
+
+def test_end_marker_keeps_the_last_line():
+    result = _result()
+    markers = [line.split("]")[0] + "]" for line in format_timestamped(result).splitlines()]
+    assert markers[0] == "[01:10]" and markers[2] == "[01:20]"
+
+    index = TranscriptIndex(result)
+    start, end = index.snap_marked(parse_time(markers[0]), parse_time(markers[2]))
+    assert start == 70.4
+    assert end == 86.5  # the whole "[01:20]" line, not the end of the line before it
+
+
+def test_unmarked_end_falls_back_to_snap():
+    index = TranscriptIndex(_result())
+    assert index.snap_marked(70, 79.5) == index.snap(70, 79.5)
+
+
+def test_cached_transcript_is_keyed_on_source_and_model(tmp_path):
+    import artifact_cache
+    import transcript_index
+
+    cache = artifact_cache.ArtifactCache(root=str(tmp_path / "artifacts"))
+    source = tmp_path / "episode.mp4"
+    source.write_bytes(b"original bytes")
+    cache.put(transcript_index.transcript_key(str(source), "base", cache), _result())
+
+    assert len(transcript_index.load_cached(str(source), "base", cache)) == 4
+    assert transcript_index.load_cached(str(source), "small", cache) is None
+    source.write_bytes(b"replaced with a different download")
+    assert transcript_index.load_cached(str(source), "base", cache) is None
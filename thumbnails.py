@@ -0,0 +1,134 @@
+import os
+import textwrap
+import functools
+import subprocess
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+import media_info
+import scheduler
+import tracing
+
+# --- CONFIG ---
+THUMB_SIZE = (720, 1280)  # width x height; Shorts are vertical, and YouTube caps thumbnails at 2 MB
+CANDIDATES = int(os.getenv("THUMB_CANDIDATES", "8"))  # frames sampled per clip, evenly spaced
+EDGE_MARGIN = 0.5  # seconds skipped at each end, where fades and hard cuts live
+SCORE_STRIDE = 4  # scoring runs on every 4th pixel each way; plenty for focus/exposure
+DARK_LEVEL = 24  # mean luma below this is a black transition, never picked
+WEIGHTS = {"sharpness": 1.0, "exposure": 0.6, "contrast": 0.4}
+JPEG_QUALITY = 85
+FONT_PATHS = [os.getenv("THUMB_FONT", "arial.ttf"), "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"]
+TITLE_WRAP = 18  # characters per overlay line
+
+LUMA = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+# --- Sampling: one low-res decode per clip yields every candidate frame ---
+def sample_frames(path, n=CANDIDATES, size=THUMB_SIZE):
+    """Decode ``n`` evenly spaced RGB frames of ``path`` at ``size`` in a single ffmpeg pass.
+
+    Returns (frames as an (N, H, W, 3) uint8 array, their timestamps in seconds).
+    """
+    w, h = size
+    duration = media_info.probe(path).duration
+    margin = min(EDGE_MARGIN, duration * 0.1)
+    span = max(duration - 2 * margin, 0.1)
+    cmd = [
+        "ffmpeg", "-nostdin", "-v", "error", "-ss", f"{margin:.3f}", "-t", f"{span:.3f}", "-i", path, "-an",
+        "-vf", f"fps={n}/{span:.3f},scale={w}:{h}:force_original_aspect_ratio=decrease,"
+               f"pad={w}:{h}:(ow-iw)/2:(oh-ih)/2",
+        "-frames:v", str(n), "-pix_fmt", "rgb24", "-f", "rawvideo", "pipe:1"
+    ]
+    result = subprocess.run(cmd, capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Frame sampling failed for {path}: {result.stderr.decode(errors='ignore').strip()}")
+    frame_bytes = w * h * 3
+    count = len(result.stdout) // frame_bytes
+    if not count:
+        raise RuntimeError(f"No frames decoded from {path}")
+    tracing.count("bytes_decoded", count * frame_bytes)
+    frames = np.frombuffer(result.stdout[:count * frame_bytes], dtype=np.uint8).reshape(count, h, w, 3)
+    times = margin + np.arange(count) * span / n
+    return frames, times
+
+
+# --- Scoring: every candidate at once, no per-frame Python loop ---
+def score_frames(frames):
+    """Higher is better: in focus (Laplacian variance), well exposed and contrasty; black frames score -1."""
+    luma = frames[:, ::SCORE_STRIDE, ::SCORE_STRIDE].astype(np.float32) @ LUMA
+    lap = (4 * luma[:, 1:-1, 1:-1] - luma[:, :-2, 1:-1] - luma[:, 2:, 1:-1]
+           - luma[:, 1:-1, :-2] - luma[:, 1:-1, 2:])
+    sharpness = np.log1p(lap.var(axis=(1, 2)))
+    brightness = luma.mean(axis=(1, 2))
+    exposure = 1 - np.abs(brightness - 128) / 128
+    contrast = np.minimum(luma.std(axis=(1, 2)) / 64, 1)
+
+    score = (WEIGHTS["sharpness"] * sharpness / max(sharpness.max(), 1e-6)
+             + WEIGHTS["exposure"] * exposure + WEIGHTS["contrast"] * contrast)
+    score[brightness < DARK_LEVEL] = -1.0
+    return score
+
+
+# --- Overlay ---
+@functools.lru_cache(maxsize=None)
+def _font(size):
+    # loaded once per size per process instead of once per thumbnail
+    for path in FONT_PATHS:
+        if os.path.exists(path):
+            return ImageFont.truetype(path, size)
+    return ImageFont.load_default(size)
+
+def render_overlay(frame, title, out):
+    img = Image.fromarray(frame)
+    text = textwrap.fill(title.split("#")[0].strip(), TITLE_WRAP)
+    if text:
+        draw = ImageDraw.Draw(img)
+        font = _font(img.width // 12)
+        stroke = max(2, img.width // 180)
+        left, top, right, bottom = draw.multiline_textbbox((0, 0), text, font=font, stroke_width=stroke, align="center")
+        x = (img.width - (right - left)) / 2 - left
+        y = img.height * 0.12 - top  # upper third, clear of the Shorts UI at the bottom
+        draw.multiline_text((x, y), text, font=font, fill=(255, 255, 255), align="center",
+                            stroke_width=stroke, stroke_fill=(0, 0, 0))
+    tmp = f"{out}.{os.getpid()}.tmp.jpg"
+    img.save(tmp, "JPEG", quality=JPEG_QUALITY, optimize=True)
+    os.replace(tmp, out)
+    return out
+
+
+# --- Entry points ---
+@tracing.traced("thumbnail")
+def make_thumbnail(path, title, out):
+    """Write the best sampled frame of ``path`` with ``title`` overlaid to ``out``; returns ``out``."""
+    if os.path.exists(out) and os.path.getmtime(out) >= os.path.getmtime(path):
+        return out
+    frames, _ = sample_frames(path)
+    best = int(np.argmax(score_frames(frames)))
+    return render_overlay(frames[best], title, out)
+
+def thumbnail_path(out_dir, path):
+    return os.path.join(out_dir, os.path.splitext(os.path.basename(path))[0] + ".jpg")
+
+def make_thumbnails(clips, out_dir, sched=None):
+    """Thumbnail every (path, title) in ``clips`` across the render pool; returns {path: thumbnail or None}."""
+    os.makedirs(out_dir, exist_ok=True)
+    clips = list(clips)
+    if not clips:
+        return {}
+    if sched is None:
+        with scheduler.RenderScheduler() as sched:
+            return make_thumbnails(clips, out_dir, sched)
+
+    futures = {
+        path: sched.submit(make_thumbnail, path, title, thumbnail_path(out_dir, path),
+                           kind=scheduler.READ, label=f"thumbnail {os.path.basename(path)}")
+        for path, title in clips
+    }
+    results = {}
+    for path, future in futures.items():
+        try:
+            results[path] = future.result()
+        except Exception:
+            results[path] = None  # already reported by the scheduler; upload goes ahead without one
+    return results
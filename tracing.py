@@ -0,0 +1,240 @@
+import os
+import sys
+import glob
+import json
+import time
+import atexit
+import argparse
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- CONFIG ---
+TRACE_DIR = os.getenv("TRACE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "traces"))
+ENABLED = os.getenv("TRACING", "1") != "0"
+FLUSH_EVERY = 200  # buffered records per write
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # >0 serves Prometheus text on localhost:<port>/metrics
+
+# Worker processes inherit the run id through the environment, so one run = one set of trace files
+RUN_ID = os.environ.setdefault("TRACE_RUN_ID", time.strftime("%Y%m%d_%H%M%S") + f"_{os.getpid()}")
+
+_lock = threading.Lock()
+_buffer = []
+_file = None
+_spans = {}  # name -> [count, total seconds, max seconds, errors]
+_counters = {}  # name -> value
+_parent = contextvars.ContextVar("trace_parent", default=None)
+_closed = False
+
+
+# --- Recording ---
+def _record(entry):
+    with _lock:
+        _buffer.append(entry)
+        full = len(_buffer) >= FLUSH_EVERY
+    if full:
+        flush()
+
+def flush():
+    """Append buffered records to this process's JSONL trace file."""
+    global _file
+    with _lock:
+        if not _buffer:
+            return
+        lines, _buffer[:] = "".join(json.dumps(e, default=str) + "\n" for e in _buffer), []
+        if _file is None:
+            os.makedirs(TRACE_DIR, exist_ok=True)
+            _file = open(os.path.join(TRACE_DIR, f"trace_{RUN_ID}_{os.getpid()}.jsonl"), "a", encoding="utf-8")
+        _file.write(lines)
+        _file.flush()
+
+@contextmanager
+def span(name, **attrs):
+    """Time the block as one span; nested spans record their parent."""
+    if not ENABLED:
+        yield
+        return
+    token = _parent.set(name)
+    started, wall = time.perf_counter(), time.time()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _parent.reset(token)
+        seconds = time.perf_counter() - started
+        with _lock:
+            stats = _spans.setdefault(name, [0, 0.0, 0.0, 0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+            stats[3] += error is not None
+        entry = {"type": "span", "name": name, "ts": wall, "seconds": round(seconds, 6),
+                 "pid": os.getpid(), "thread": threading.current_thread().name, "parent": _parent.get()}
+        if attrs:
+            entry["attrs"] = attrs
+        if error:
+            entry["error"] = error
+        _record(entry)
+
+def traced(name=None):
+    """Decorator form of ``span``; defaults to module.function as the span name."""
+    def decorate(fn):
+        label = name or f"{fn.__module__}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def count(name, value=1):
+    """Add ``value`` to a run counter (bytes_decoded, tokens_sent, ...)."""
+    if not ENABLED:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+def event(name, **fields):
+    """One-off structured record, e.g. a failure with its context."""
+    if ENABLED:
+        _record({"type": "event", "name": name, "ts": time.time(), "pid": os.getpid(), **fields})
+
+
+# --- Per-process totals, written when the process exits ---
+def snapshot():
+    with _lock:
+        return {
+            "spans": {k: {"count": c, "seconds": round(t, 4), "max_seconds": round(m, 4), "errors": e}
+                      for k, (c, t, m, e) in _spans.items()},
+            "counters": dict(_counters),
+        }
+
+def _at_exit():
+    global _closed
+    if not ENABLED or _closed:
+        return
+    _closed = True
+    snap = snapshot()
+    if snap["spans"] or snap["counters"]:
+        _record({"type": "totals", "ts": time.time(), "pid": os.getpid(), **snap})
+    flush()
+
+atexit.register(_at_exit)
+
+
+# --- Run summary: where the wall time went, across every process of the run ---
+def summarize(run_id=RUN_ID):
+    spans, counters, errors = {}, {}, 0
+    for path in glob.glob(os.path.join(TRACE_DIR, f"trace_{run_id}_*.jsonl")):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if entry.get("type") == "span":
+                    stats = spans.setdefault(entry["name"], {"count": 0, "seconds": 0.0, "max_seconds": 0.0})
+                    stats["count"] += 1
+                    stats["seconds"] += entry["seconds"]
+                    stats["max_seconds"] = max(stats["max_seconds"], entry["seconds"])
+                    errors += "error" in entry
+                elif entry.get("type") == "totals":
+                    for name, value in entry["counters"].items():
+                        counters[name] = counters.get(name, 0) + value
+    return {"run_id": run_id, "spans": spans, "counters": counters, "errors": errors}
+
+def print_summary(run_id=RUN_ID, top=15):
+    summary = summarize(run_id)
+    if not summary["spans"]:
+        print(f"[*] No spans recorded for run {run_id}")
+        return summary
+    print(f"\n[*] Trace summary for run {run_id} (span time; nested spans overlap their parents)")
+    ranked = sorted(summary["spans"].items(), key=lambda kv: -kv[1]["seconds"])
+    for name, s in ranked[:top]:
+        print(f"    {name:<28} {s['seconds']:>10.2f}s  x{s['count']:<6} max {s['max_seconds']:.2f}s")
+    for name, value in sorted(summary["counters"].items()):
+        print(f"    {name:<28} {value:>14,}")
+    if summary["errors"]:
+        print(f"[!] {summary['errors']} span(s) ended in an error")
+    path = os.path.join(TRACE_DIR, f"summary_{run_id}.json")
+    with open(path, "w") as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+# --- Optional Prometheus text endpoint (this process's live totals) ---
+def _prometheus_text():
+    snap = snapshot()
+    lines = []
+    for metric, key in [("brainrot_span_seconds_total", "seconds"), ("brainrot_span_count_total", "count")]:
+        lines.append(f"# TYPE {metric} counter")
+        for name, s in sorted(snap["spans"].items()):
+            lines.append(f'{metric}{{span="{name}"}} {s[key]}')
+    lines.append("# TYPE brainrot_counter_total counter")
+    for name, value in sorted(snap["counters"].items()):
+        lines.append(f'brainrot_counter_total{{name="{name}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = _prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def start_metrics_server(port=METRICS_PORT):
+    server = ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    print(f"[*] Metrics on http://127.0.0.1:{server.server_address[1]}/metrics")
+    return server
+
+
+# --- Entry points ---
+def init():
+    """Call from a script's ``__main__``: serves metrics if METRICS_PORT is set and prints the run summary at exit."""
+    if not ENABLED:
+        return
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT)
+
+    def _finish_run():
+        _at_exit()
+        print_summary()
+    atexit.register(_finish_run)
+
+
+# --- CLI: python tracing.py summary [RUN_ID] | runs ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize recorded pipeline traces.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    s = sub.add_parser("summary", help="where wall time went in one run (default: latest)")
+    s.add_argument("run_id", nargs="?", default=None)
+    sub.add_parser("runs", help="list recorded run ids")
+    args = parser.parse_args(argv)
+
+    files = sorted(glob.glob(os.path.join(TRACE_DIR, "trace_*.jsonl")), key=os.path.getmtime)
+    runs = list(dict.fromkeys(os.path.basename(p)[len("trace_"):].rsplit("_", 1)[0] for p in files))
+    if args.command == "runs":
+        for run in runs:
+            print(run)
+    elif args.run_id or runs:
+        print_summary(args.run_id or runs[-1])
+    else:
+        print("[*] No traces recorded yet")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+import os
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import numpy as np
+
+import audio_cache
+import tracing
+
+# --- CONFIG ---
+DEFAULT_MODEL = os.getenv("WHISPER_MODEL", "base")  # "small", "medium", etc.
+CHUNK_WORKERS = int(os.getenv("WHISPER_WORKERS", "1"))  # >1 enables chunked multi-process mode
+CHUNK_WINDOW = float(os.getenv("WHISPER_WINDOW", "300"))  # seconds of audio per window
+CHUNK_OVERLAP = 5.0  # seconds of context added on each side of a window
+SILENCE_SEARCH = 15.0  # how far from the nominal cut to look for a quiet spot
+SAMPLE_RATE = audio_cache.SAMPLE_RATE
+
+
+# --- Service: one long-lived worker that keeps every loaded model resident ---
+class TranscriptionService:
+    """In-process Whisper worker fed through a job queue.
+
+    Models are loaded lazily the first time a job asks for a given size and
+    then stay in memory for the life of the process, so callers never pay the
+    load cost twice. Jobs run one at a time on a single worker thread since
+    a Whisper model is not safe to share across concurrent transcribe calls.
+    """
+
+    def __init__(self):
+        self._models = {}
+        self._jobs = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def _get_model(self, size):
+        model = self._models.get(size)
+        if model is None:
+            import whisper  # not at module top: spawned render workers import this module too
+            print(f"[*] Loading Whisper model '{size}'...")
+            model = whisper.load_model(size)
+            self._models[size] = model
+        return model
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            future, audio, size, options = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                with tracing.span("transcribe", model=size):
+                    if isinstance(audio, str):
+                        audio = audio_cache.load_audio(audio)
+                    result = self._get_model(size).transcribe(audio, **options)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="whisper-worker", daemon=True)
+                self._worker.start()
+
+    def submit(self, audio, model=DEFAULT_MODEL, **options):
+        """Queue a transcription job and return a Future for the Whisper result dict.
+
+        ``audio`` may be a media path (decoded once through ``audio_cache``) or
+        a float32 16 kHz array.
+        """
+        self._ensure_worker()
+        future = Future()
+        self._jobs.put((future, audio, model, options))
+        return future
+
+    def transcribe(self, audio, model=DEFAULT_MODEL, **options):
+        return self.submit(audio, model, **options).result()
+
+    def shutdown(self):
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                self._jobs.put(None)
+                self._worker.join()
+            self._worker = None
+
+
+# --- Shared instance used by every entry point ---
+_service = None
+_service_lock = threading.Lock()
+
+def get_service():
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = TranscriptionService()
+        return _service
+
+def submit(audio, model=DEFAULT_MODEL, **options):
+    return get_service().submit(audio, model, **options)
+
+def transcribe(audio, model=DEFAULT_MODEL, **options):
+    return get_service().transcribe(audio, model, **options)
+
+
+# --- Chunked mode: overlapping windows cut at silences, fanned out to a process pool ---
+_pools = {}
+_pool_lock = threading.Lock()
+_worker_models = {}
+
+def _init_chunk_worker(threads):
+    import torch
+    torch.set_num_threads(threads)
+
+def _get_pool(workers):
+    with _pool_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            # spawn, not fork: torch's thread pools don't survive a fork cleanly
+            threads = max(1, (os.cpu_count() or 1) // workers)
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_chunk_worker,
+                initargs=(threads,),
+            )
+            _pools[workers] = pool
+        return pool
+
+def _transcribe_window(source, start, end, size, options):
+    # ``source`` is a cached PCM file: each worker maps it and copies only its own window
+    with tracing.span("transcribe.window", model=size, seconds=(end - start) / SAMPLE_RATE):
+        pcm = np.memmap(source, dtype=np.int16, mode="r")
+        audio = audio_cache.to_float(pcm[start:end])
+        model = _worker_models.get(size)
+        if model is None:
+            import whisper
+            model = whisper.load_model(size)
+            _worker_models[size] = model
+        result = model.transcribe(audio, **options)
+    tracing.flush()  # pool workers can be torn down without running exit hooks
+    return result
+
+def find_chunk_bounds(audio, window=CHUNK_WINDOW, search=SILENCE_SEARCH):
+    """Return cut points (seconds) roughly ``window`` apart, each moved to the quietest nearby 100 ms frame."""
+    frame = SAMPLE_RATE // 10
+    n_frames = len(audio) // frame
+    total = len(audio) / SAMPLE_RATE
+    if n_frames == 0 or total <= window:
+        return [0.0, total]
+
+    cuts = [0.0]
+    target = window
+    while target < total - search:
+        lo = max(int((target - search) * 10), int(cuts[-1] * 10) + 1)
+        hi = min(int((target + search) * 10), n_frames)
+        if hi > lo:
+            # only the search region is read, so a memmapped source is never loaded whole
+            region = np.asarray(audio[lo * frame:hi * frame], dtype=np.float32).reshape(hi - lo, frame)
+            cut = (lo + int(np.argmin(np.mean(np.square(region), axis=1)))) / 10
+        else:
+            cut = target
+        cuts.append(cut)
+        target = cut + window
+    cuts.append(total)
+    return cuts
+
+def _shift(seg, offset):
+    seg = dict(seg)
+    seg["start"] += offset
+    seg["end"] += offset
+    if "words" in seg:
+        seg["words"] = [dict(w, start=w["start"] + offset, end=w["end"] + offset) for w in seg["words"]]
+    return seg
+
+def stitch_results(results, offsets, cuts):
+    """Merge per-window results into one Whisper-shaped dict.
+
+    Each window owns the span between its two cut points; a segment from the
+    overlap is kept only by the window whose span contains its midpoint.
+    """
+    segments = []
+    for result, offset, own_start, own_end in zip(results, offsets, cuts, cuts[1:]):
+        for seg in result["segments"]:
+            seg = _shift(seg, offset)
+            mid = (seg["start"] + seg["end"]) / 2
+            if own_start <= mid < own_end or (own_end == cuts[-1] and mid >= own_end):
+                segments.append(seg)
+
+    segments.sort(key=lambda s: s["start"])
+    for i, seg in enumerate(segments):
+        seg["id"] = i
+    return {
+        "text": "".join(seg["text"] for seg in segments),
+        "segments": segments,
+        "language": results[0].get("language") if results else None,
+    }
+
+def transcribe_chunked(path, model=DEFAULT_MODEL, workers=CHUNK_WORKERS, window=CHUNK_WINDOW,
+                       overlap=CHUNK_OVERLAP, **options):
+    """Transcribe a long media file as overlapping windows across ``workers`` processes."""
+    source = audio_cache.pcm_path(path)
+    pcm = audio_cache.load_pcm(path)
+
+    cuts = find_chunk_bounds(pcm, window)
+    if workers <= 1 or len(cuts) <= 2:
+        return transcribe(path, model, **options)
+
+    pool = _get_pool(workers)
+    futures, offsets = [], []
+    for own_start, own_end in zip(cuts, cuts[1:]):
+        start = max(0.0, own_start - overlap)
+        end = min(cuts[-1], own_end + overlap)
+        futures.append(pool.submit(
+            _transcribe_window, source, int(start * SAMPLE_RATE), int(end * SAMPLE_RATE), model, options
+        ))
+        offsets.append(start)
+
+    print(f"[*] Transcribing {len(futures)} window(s) on {workers} worker(s)...")
+    with tracing.span("transcribe.chunked", model=model, windows=len(futures)):
+        return stitch_results([f.result() for f in futures], offsets, cuts)
+
+def transcribe_long(path, model=DEFAULT_MODEL, workers=CHUNK_WORKERS, window=CHUNK_WINDOW, **options):
+    """Entry-point helper: chunked mode when ``workers`` > 1, otherwise the resident service."""
+    if workers > 1:
+        return transcribe_chunked(path, model, workers=workers, window=window, **options)
+    return transcribe(path, model, **options)
@@ -0,0 +1,145 @@
+import os
+import re
+import json
+import bisect
+
+import artifact_cache
+
+# --- CONFIG ---
+COVER_SLACK = 5.0  # seconds of trailing silence a transcript may end early by and still cover a range
+SEGMENT_SNAP = 2.0  # prefer a Whisper segment (sentence) boundary this close over a word boundary
+
+_TIMESTAMP = re.compile(r"^\[?\s*(?:(\d+):)?(\d+):(\d+(?:\.\d+)?)\s*\]?$")
+
+
+# --- Index over a Whisper result's word timestamps (falls back to segments) ---
+class TranscriptIndex:
+    """Sorted word/segment boundaries of one transcript, searchable with bisect."""
+
+    def __init__(self, result):
+        segments = result.get("segments", [])
+        words = [w for seg in segments for w in seg.get("words", [])]
+        units = words if words else [{"word": seg["text"], "start": seg["start"], "end": seg["end"]} for seg in segments]
+        units.sort(key=lambda u: u["start"])
+
+        self.starts = [u["start"] for u in units]
+        self.ends = [u["end"] for u in units]
+        self.texts = [u.get("word", u.get("text", "")) for u in units]
+        self.seg_starts = sorted(seg["start"] for seg in segments)
+        self.seg_ends = sorted(seg["end"] for seg in segments)
+        self.lines = sorted((seg["start"], seg["end"]) for seg in segments)  # what format_timestamped emits
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r") as f:
+            return cls(json.load(f))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def covers(self, start, end):
+        return bool(self.starts) and start >= 0 and end <= self.ends[-1] + COVER_SLACK
+
+    def span(self, start, end):
+        """Index range [i, j) of the units whose midpoint falls inside [start, end]."""
+        i = bisect.bisect_left(self.ends, start)
+        j = bisect.bisect_right(self.starts, end)
+        while i < j and (self.starts[i] + self.ends[i]) / 2 < start:
+            i += 1
+        while j > i and (self.starts[j - 1] + self.ends[j - 1]) / 2 > end:
+            j -= 1
+        return i, j
+
+    def text_between(self, start, end):
+        i, j = self.span(start, end)
+        return "".join(self.texts[i:j]).strip()
+
+    def snap(self, start, end):
+        """Move an LLM-proposed range onto real speech boundaries; None if it holds no speech.
+
+        The start moves to the nearest segment start within SEGMENT_SNAP seconds,
+        otherwise to the start of the first word ending after it; the end likewise
+        to a segment end or the end of the last word starting before it.
+        """
+        if not self.starts or end <= start:
+            return None
+        i = bisect.bisect_right(self.ends, start)
+        j = bisect.bisect_left(self.starts, end)
+        if i >= j:
+            return None
+        snapped_start = _nearest(self.seg_starts, start, SEGMENT_SNAP)
+        snapped_end = _nearest(self.seg_ends, end, SEGMENT_SNAP)
+        if snapped_start is None:
+            snapped_start = self.starts[i]
+        if snapped_end is None:
+            snapped_end = self.ends[j - 1]
+        return (snapped_start, snapped_end) if snapped_end > snapped_start else None
+
+    def line_end(self, marker):
+        """End of the line stamped ``marker`` by format_timestamped (the last one, if several share it)."""
+        second = int(marker)
+        k = bisect.bisect_left(self.lines, (second + 1,)) - 1
+        if k >= 0 and int(self.lines[k][0]) == second:
+            return self.lines[k][1]
+        return None
+
+    def snap_marked(self, start, end):
+        """``snap`` for times read off the [mm:ss] line markers: ``end`` names the last line used, so the
+        clip runs to that line's end rather than stopping where it begins."""
+        line_end = self.line_end(end)
+        return self.snap(start, line_end if line_end is not None else end)
+
+
+def _nearest(values, x, tolerance):
+    k = bisect.bisect_left(values, x)
+    best = min(values[max(k - 1, 0):k + 1], key=lambda v: abs(v - x), default=None)
+    return best if best is not None and abs(best - x) <= tolerance else None
+
+
+# --- Compact prompt format: one "[mm:ss] text" line per Whisper segment ---
+def format_timestamp(seconds):
+    seconds = int(seconds)
+    return f"[{seconds // 60:02d}:{seconds % 60:02d}]"
+
+def format_timestamped(result):
+    lines = []
+    for seg in result.get("segments", []):
+        text = seg["text"].strip()
+        if text:
+            lines.append(f"{format_timestamp(seg['start'])} {text}")
+    return "\n".join(lines)
+
+def parse_time(value):
+    """Seconds from an LLM-returned time: a number, "123.5", "mm:ss" or "[h:mm:ss]"; None if unreadable."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip()
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    match = _TIMESTAMP.match(text)
+    if not match:
+        return None
+    hours, minutes, secs = match.groups()
+    return int(hours or 0) * 3600 + int(minutes) * 60 + float(secs)
+
+
+# --- Word-timestamped transcripts in the artifact cache, keyed on source bytes + model ---
+def transcript_key(source_path, model, cache=None):
+    cache = cache or artifact_cache.default_cache()
+    return cache.key("transcript", files=[source_path], model=model, word_timestamps=True)
+
+def load_cached(source_path, model, cache=None):
+    """Return the TranscriptIndex cached for ``source_path``'s current contents and ``model``, or None."""
+    if not os.path.exists(source_path):
+        return None
+    cache = cache or artifact_cache.default_cache()
+    result = cache.get(transcript_key(source_path, model, cache))
+    if result is None:
+        return None
+    try:
+        return TranscriptIndex(result)
+    except (KeyError, TypeError) as e:
+        print(f"[!] Unreadable cached transcript for {source_path}: {e}")
+        return None
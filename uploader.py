@@ -4,18 +4,29 @@ from oauth2client import file, client, tools
 import os
 import random
 import time
-import cv2
+import json
 import shutil
-from PIL import Image, ImageDraw, ImageFont
-import whisper
+
+import audio_cache
+import job_ledger
+import media_info
+import smart_slicer
+import thumbnails
+import tracing
+import transcriber
+import transcript_index
 
 # -- CONFIG SETTINGS --
 UPLOAD_FOLDER = 'source_vid'  # Folder containing videos
 THUMBNAIL_FOLDER = 'thumbnails'  # Folder to store auto-generated thumbnails
+METADATA_FOLDER = 'metadata'  # Per-clip JSON written by smart_slicer.py
+SOURCE_FOLDER = 'harvested_raw'  # Sources smart_slicer.py cut the clips from
+TRANSCRIPT_MODEL = smart_slicer.MODEL_SIZE  # its cached source transcripts are keyed on the model
 SCOPES = ["https://www.googleapis.com/auth/youtube.upload"]
 API_SERVICE_NAME = "youtube"
 API_VERSION = "v3"
 CLIENT_SECRETS_FILE = "client_secrets.json"  # OAuth 2.0 credentials from Google Console
+STAGE = "upload"  # job ledger stage name; a clip is never uploaded twice
 
 # -- HASHTAGS BANK --
 HASHTAGS = [
@@ -36,19 +47,16 @@ COMMENTS = {
 
 os.makedirs(THUMBNAIL_FOLDER, exist_ok=True)
 
-# Load Whisper model
-model = whisper.load_model("small")
+# Whisper model size used for titles (loaded on first use by transcriber)
+TITLE_MODEL = "small"
 
 # -- Check if video is vertical (to qualify as a YouTube Short)
 def is_vertical(filepath):
-    cap = cv2.VideoCapture(filepath)
-    if not cap.isOpened():
-        print(f"[!] Failed to open video: {filepath}")
+    try:
+        return media_info.probe(filepath).is_vertical
+    except (OSError, RuntimeError, ValueError) as e:
+        print(f"[!] Failed to probe video: {filepath} ({e})")
         return False
-    width = cap.get(cv2.CAP_PROP_FRAME_WIDTH)
-    height = cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
-    cap.release()
-    return height > width
 
 def get_engagement_comment(title):
     for keyword, comment in COMMENTS.items():
@@ -56,27 +64,61 @@ def get_engagement_comment(title):
             return comment
     return "What's your take? Sound off below! 👇 #shorts"
 
+# -- Map a clip back to its source + time range (from its metadata); None if that can't be done
+def clip_source(filepath):
+    clip_base = os.path.splitext(os.path.basename(filepath))[0]
+    meta_path = os.path.join(METADATA_FOLDER, clip_base + ".json")
+    if not os.path.exists(meta_path):
+        return None
+    try:
+        with open(meta_path, "r") as f:
+            meta = json.load(f)
+        start, end = float(meta["start"]), float(meta["end"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+    # Clips sliced before source_video was recorded are named <source>_smartclipNN
+    source = meta.get("source_video") or clip_base.rsplit("_smartclip", 1)[0]
+    source_path = os.path.join(SOURCE_FOLDER, os.path.basename(source))
+    if not os.path.splitext(source_path)[1]:
+        source_path += ".mp4"
+    if not os.path.exists(source_path):
+        return None
+    return source_path, start, end
+
+# -- Read a clip's words from the cached source transcript, given clip_source()'s (source, start, end)
+def text_from_source_transcript(located):
+    if located is None:
+        return None
+    source_path, start, end = located
+    index = transcript_index.load_cached(source_path, TRANSCRIPT_MODEL)
+    if index is None or not index.covers(start, end):
+        return None
+    return index.text_between(start, end)
+
 def generate_title_from_audio(filepath):
     print(f"[*] Generating title for {filepath}")
-    result = model.transcribe(filepath, fp16=False)
-    transcript = result['text'].strip()
+    located = clip_source(filepath)
+    transcript = text_from_source_transcript(located)
+    if transcript is None:
+        # Whisper on the clip's range of the source's already-extracted audio, else on the clip file itself
+        audio = filepath
+        if located is not None and audio_cache.has_pcm(located[0]):
+            audio = audio_cache.load_audio(*located)
+        result = transcriber.transcribe(audio, model=TITLE_MODEL, fp16=False)
+        transcript = result['text']
+    else:
+        print("[*] Reused cached source transcript for title")
+    transcript = transcript.strip()
     if len(transcript) > 60:
         transcript = transcript[:57] + "..."
     return transcript + " #shorts"
 
 def generate_thumbnail(file_path, title):
-    thumb_path = os.path.join(THUMBNAIL_FOLDER, os.path.splitext(os.path.basename(file_path))[0] + ".jpg")
-    cap = cv2.VideoCapture(file_path)
-    cap.set(cv2.CAP_PROP_POS_FRAMES, 30)
-    success, frame = cap.read()
-    if success:
-        img = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-        draw = ImageDraw.Draw(img)
-        font = ImageFont.truetype("arial.ttf", 40) if os.path.exists("arial.ttf") else ImageFont.load_default()
-        draw.text((30, 30), title.split("#")[0], font=font, fill=(255, 255, 255))
-        img.save(thumb_path)
-        return thumb_path
-    else:
+    try:
+        return thumbnails.make_thumbnail(file_path, title, thumbnails.thumbnail_path(THUMBNAIL_FOLDER, file_path))
+    except (OSError, RuntimeError, ValueError) as e:
+        print(f"[!] Thumbnail failed for {file_path}: {e}")
         return None
 
 def get_authenticated_service():
@@ -87,19 +129,20 @@ def get_authenticated_service():
         creds = tools.run_flow(flow, store)
     return build(API_SERVICE_NAME, API_VERSION, credentials=creds)
 
-def upload_video(youtube, file_path):
+@tracing.traced("upload")
+def upload_video(youtube, file_path, title=None, thumbnail_path=None):
     if not is_vertical(file_path):
         print(f"[-] Skipping {file_path} — Not vertical, won't qualify as a Short.")
-        return
+        return False
 
-    title = generate_title_from_audio(file_path)
+    title = title or generate_title_from_audio(file_path)
     comment = get_engagement_comment(title)
     selected_tags = random.sample(HASHTAGS, 5)
 
     description = f"Subscribe for more brainrot. 💀🔥\n\n{comment}\n\n{' '.join(selected_tags)}"
     category_id = "22"  # People & Blogs
 
-    thumbnail_path = generate_thumbnail(file_path, title)
+    thumbnail_path = thumbnail_path or generate_thumbnail(file_path, title)
 
     body = dict(
         snippet=dict(
@@ -128,18 +171,27 @@ def upload_video(youtube, file_path):
             media_body=MediaFileUpload(thumbnail_path)
         ).execute()
         print(f"[+] Thumbnail uploaded: {thumbnail_path}")
+    return True
 
 def main():
     youtube = get_authenticated_service()
     video_files = [f for f in os.listdir(UPLOAD_FOLDER) if f.endswith((".mp4", ".mov"))]
-    random.shuffle(video_files)
-
-    for video_file in video_files:
-        full_path = os.path.join(UPLOAD_FOLDER, video_file)
-        upload_video(youtube, full_path)
+    todo = job_ledger.pending(STAGE, [os.path.join(UPLOAD_FOLDER, f) for f in video_files])
+    random.shuffle(todo)
+
+    # Titles first, then every thumbnail in one pooled batch instead of one at a time between uploads
+    titles = {p: generate_title_from_audio(p) for p in todo if is_vertical(p)}
+    thumbs = thumbnails.make_thumbnails(titles.items(), THUMBNAIL_FOLDER)
+
+    for full_path in todo:
+        with job_ledger.track(STAGE, full_path):
+            uploaded = upload_video(youtube, full_path, titles.get(full_path), thumbs.get(full_path))
+        if not uploaded:
+            continue
         wait_time = random.randint(300, 900)  # Wait 5–15 minutes between uploads
         print(f"[+] Waiting {wait_time / 60:.2f} minutes before next upload...")
         time.sleep(wait_time)
 
 if __name__ == '__main__':
+    tracing.init()
     main()